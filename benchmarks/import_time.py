@@ -0,0 +1,102 @@
+""" Import time benchmark for the top level packages.
+
+Every package is imported in a fresh interpreter with ``python -X importtime`` so nothing is shared between
+measurements.  The cumulative time of the package and the heavy third party modules it pulled in are reported.
+A Lambda cold start pays this cost on every new execution environment.
+
+.. code-block:: bash
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --output bench_output.txt
+
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+PACKAGES = [
+    "core_logging",
+    "core_framework",
+    "core_helper.aws",
+    "core_helper.aio",
+    "core_helper.magic",
+    "core_renderer",
+]
+
+# Modules that should only be imported when they are actually used
+HEAVY_MODULES = [
+    "boto3",
+    "botocore.config",
+    "pydantic",
+    "ruamel.yaml",
+    "jinja2",
+    "jmespath",
+    "netaddr",
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(package: str) -> tuple[int, list[str]]:
+    """
+    Import the package in a new interpreter.
+
+    Args:
+        package (str): The package to import
+
+    Returns:
+        tuple[int, list[str]]: The cumulative import time in microseconds and the heavy modules that were imported
+    """
+    code = (
+        "import sys, {0}; print(','.join(m for m in {1!r} if m in sys.modules))".format(
+            package, HEAVY_MODULES
+        )
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == package:
+            total = int(parts[1].strip())
+
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per package")
+    parser.add_argument("--output", help="Also append the results to this file")
+    args = parser.parse_args()
+
+    lines = [f"{'package':<20} {'best (ms)':>10} {'worst (ms)':>11}  heavy modules"]
+    for package in PACKAGES:
+        timings = []
+        loaded: list[str] = []
+        for _ in range(args.repeat):
+            total, loaded = measure(package)
+            timings.append(total)
+        lines.append(
+            f"{package:<20} {min(timings) / 1000:>10.1f} {max(timings) / 1000:>11.1f}  {', '.join(loaded) or '-'}"
+        )
+
+    report = "\n".join(lines)
+    print(report)
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+""" JSON codec benchmark for to_json and from_json.
+
+A large deployment state document (resources with timestamps, ARNs and tags) and a batch of TaskPayload
+documents are serialized and parsed with the current functions and with the previous implementation (an
+object_hook that walked every nested object again and tried ``datetime.fromisoformat`` on every string).
+
+.. code-block:: bash
+
+    python benchmarks/json_codec.py
+    JSON_ENGINE=orjson python benchmarks/json_codec.py --resources 20000
+
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core_framework as util  # noqa: E402
+
+
+def legacy_serializer(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def legacy_parser(data):
+    if isinstance(data, str):
+        try:
+            return datetime.datetime.fromisoformat(data)
+        except ValueError:
+            return data
+    elif isinstance(data, dict):
+        return {key: legacy_parser(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [legacy_parser(item) for item in data]
+    return data
+
+
+def legacy_to_json(data):
+    return json.dumps(data, default=legacy_serializer)
+
+
+def legacy_from_json(data):
+    return json.loads(data, object_hook=legacy_parser)
+
+
+def state_document(resources: int) -> dict:
+    """A CloudFormation like state document with the given number of resources"""
+    now = datetime.datetime(2025, 1, 4, 13, 30, 57, 921837)
+    return {
+        "StackName": "my-portfolio-my-app-main-build-123",
+        "LastUpdated": now,
+        "Resources": {
+            f"Resource{i}": {
+                "LogicalResourceId": f"Resource{i}",
+                "PhysicalResourceId": f"arn:aws:lambda:us-east-1:123456789012:function:fn-{i}",
+                "ResourceType": "AWS::Lambda::Function",
+                "ResourceStatus": "CREATE_COMPLETE",
+                "Timestamp": now + datetime.timedelta(seconds=i),
+                "Metadata": {
+                    "Outputs": {"Arn": f"arn:aws:lambda:::fn-{i}", "Version": str(i)},
+                    "Tags": [
+                        {"Key": "Portfolio", "Value": "my-portfolio"},
+                        {"Key": "Build", "Value": "2025"},
+                        {"Key": "Created", "Value": "2025-01-04"},
+                    ],
+                },
+                "Memory": 128 + i % 1024,
+            }
+            for i in range(resources)
+        },
+    }
+
+
+def task_payloads(count: int) -> dict:
+    """TaskPayload documents as they are sent to the lambdas"""
+    payloads = []
+    for i in range(count):
+        task_payload = util.generate_task_payload(
+            task="deploy",
+            client="my-client",
+            portfolio="my-portfolio",
+            app="my-app",
+            branch="main",
+            build=f"build-{i}",
+            automation_type="deployspec",
+        )
+        payloads.append(task_payload.model_dump())
+    return {"Payloads": payloads}
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--resources", type=int, default=5000, help="Resources in the state document"
+    )
+    parser.add_argument(
+        "--payloads", type=int, default=500, help="TaskPayload documents"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    documents = {
+        "state": state_document(args.resources),
+        "task payloads": task_payloads(args.payloads),
+    }
+
+    print(f"JSON engine: {util.get_json_engine()}")
+    print(
+        f"{'document':<15} {'operation':<26} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}"
+    )
+    for name, document in documents.items():
+        text = util.to_json(document)
+        assert util.from_json(text) == legacy_from_json(text)
+
+        rows = [
+            (
+                "to_json",
+                lambda: legacy_to_json(document),
+                lambda: util.to_json(document),
+            ),
+            ("from_json", lambda: legacy_from_json(text), lambda: util.from_json(text)),
+            (
+                "from_json(parse_dates=0)",
+                lambda: legacy_from_json(text),
+                lambda: util.from_json(text, parse_dates=False),
+            ),
+        ]
+        for operation, before, after in rows:
+            b = best(before, args.repeat)
+            a = best(after, args.repeat)
+            print(f"{name:<15} {operation:<26} {b:>12.1f} {a:>11.1f} {b / a:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+""" Log call benchmark for the core_logging module functions.
+
+Times ``log.debug`` when DEBUG is disabled (the common case in hot loops) and when it is enabled, with the
+previous implementation (inspect.getmodule() on the caller and getLogger() on every call) and the current
+one.  The enabled calls write to /dev/null.
+
+.. code-block:: bash
+
+    python benchmarks/log_calls.py
+    python benchmarks/log_calls.py --calls 20000
+
+"""
+
+import argparse
+import contextlib
+import inspect
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core_logging as log  # noqa: E402
+from core_logging.log_interface import get_logger_identity  # noqa: E402
+
+
+def legacy_debug(message=None, *args, **kwargs):
+    caller_frame = inspect.currentframe().f_back
+    module = inspect.getmodule(caller_frame)
+    module_name = module.__name__ if module else "Unknown"
+    function_name = caller_frame.f_code.co_name
+    logger = log.getLogger(
+        get_logger_identity(module=module_name, function=function_name, **kwargs)
+    )
+    logger.debug(message, *args, **kwargs)
+
+
+def loop(fn, calls: int):
+    def run():
+        for i in range(calls):
+            fn("Processing item {}", i)
+
+    return run
+
+
+def per_call(fn, calls: int, repeat: int) -> float:
+    """The best time of one call in nanoseconds"""
+    return min(timeit.repeat(loop(fn, calls), number=1, repeat=repeat)) / calls * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000, help="Calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    log.set_identity(None)  # The identity is the module and function of the caller
+
+    lines = [
+        f"{'log.debug':<10} {'legacy (ns)':>12} {'current (ns)':>13} {'speedup':>8}"
+    ]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for level, label in [("INFO", "disabled"), ("DEBUG", "enabled")]:
+            log.setLevel(level)
+            legacy = per_call(legacy_debug, args.calls, args.repeat)
+            current = per_call(log.debug, args.calls, args.repeat)
+            lines.append(
+                f"{label:<10} {legacy:>12.0f} {current:>13.0f} {legacy / current:>7.1f}x"
+            )
+
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
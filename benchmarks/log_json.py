@@ -0,0 +1,107 @@
+""" JSON log formatter benchmark for CoreLogJsonFormatter.
+
+Formats a batch of log records like the ones written with LOG_AS_JSON=true (some with status, scope and
+details) with the current formatter and with the previous implementation (an OrderedDict filled by
+set_element(), strftime() for every record and json.dumps(default=str)), and prints the records per second.
+The output of both is checked to be the same.
+
+.. code-block:: bash
+
+    python benchmarks/log_json.py
+    python benchmarks/log_json.py --records 100000
+
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import timeit
+from collections import OrderedDict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logging.log_classes import CoreLogJsonFormatter  # noqa: E402
+
+
+def legacy_format(formatter: CoreLogJsonFormatter, record: logging.LogRecord) -> str:
+    timestamp = datetime.fromtimestamp(record.created)
+    json_timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    data: dict = OrderedDict([("@timestamp", json_timestamp)])
+
+    formatter.set_element(data, record, "log.logger", "name")
+    formatter.set_element(data, record, "log.level", "levelname")
+    formatter.set_element(data, record, "status", "status")
+    formatter.set_element(data, record, "reason", "reason")
+    formatter.set_element(data, record, "message", "msg")
+    formatter.set_element(data, record, "scope", "scope")
+    formatter.set_element(data, record, "file", "filename")
+    formatter.set_element(data, record, "line", "lineno")
+    formatter.set_element(data, record, "function", "funcName")
+    formatter.set_element(data, record, "context", "details")
+
+    return json.dumps(data, default=str)
+
+
+def make_records(count: int) -> list[logging.LogRecord]:
+    """Records a few milliseconds apart, one in four with details and one in ten a status"""
+    start = 1735997457.921837
+    records = []
+    for i in range(count):
+        record = logging.LogRecord(
+            "prn:my-portfolio:my-app:main:123",
+            logging.INFO,
+            "/var/task/core_execute/actionlib/actions/deploy.py",
+            100 + i % 50,
+            "Deploying resource {} of the stack".format(i),
+            (),
+            None,
+            func="execute",
+        )
+        record.created = start + i * 0.003
+        record.scope = "build"
+        if i % 4 == 0:
+            record.details = {
+                "StackName": f"my-portfolio-my-app-main-build-{i}",
+                "Outputs": {"Arn": f"arn:aws:lambda:::fn-{i}", "Version": str(i)},
+                "Tags": ["Portfolio", "Build"],
+            }
+        if i % 10 == 0:
+            record.levelname = "STATUS"
+            record.status = "DEPLOY_IN_PROGRESS"
+            record.reason = "Deploying"
+        records.append(record)
+    return records
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000, help="Records per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    formatter = CoreLogJsonFormatter()
+    records = make_records(args.records)
+
+    for record in records:
+        if formatter.format(record) != legacy_format(formatter, record):
+            raise SystemExit(f"Different output for record {record.lineno}")
+
+    legacy = best(lambda: [legacy_format(formatter, r) for r in records], args.repeat)
+    current = best(lambda: [formatter.format(r) for r in records], args.repeat)
+
+    print(f"{'formatter':<10} {'records/s':>12}")
+    print(f"{'legacy':<10} {args.records / legacy:>12,.0f}")
+    print(f"{'current':<10} {args.records / current:>12,.0f}")
+    print(f"speedup    {legacy / current:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
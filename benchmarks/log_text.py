@@ -0,0 +1,112 @@
+""" Text log formatter benchmark for CoreLogTextFormatter.
+
+Formats a batch of records with details (Lambda invocations, stack outputs, action lists) with the current
+formatter and with the previous implementation (the scope appended to record.msg and every details
+dictionary dumped by ruamel into a new StringIO), and prints the records per second.  The output of both is
+checked to be the same.
+
+.. code-block:: bash
+
+    python benchmarks/log_text.py
+    python benchmarks/log_text.py --records 20000
+
+"""
+
+import argparse
+import copy
+import io
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logging.log_classes import CoreLogTextFormatter  # noqa: E402
+
+
+def legacy_format(formatter: CoreLogTextFormatter, record: logging.LogRecord) -> str:
+    scope = getattr(record, "scope", None)
+    if scope:
+        record.msg = f"{record.msg} ({scope})"
+
+    data = logging.Formatter.format(formatter, record)
+
+    details = getattr(record, "details", None)
+    if details and isinstance(details, (dict, list)):
+        s = io.StringIO()
+        formatter.yaml.dump(details, s)
+        data = (
+            data + "\n" + "\n".join("    " + line for line in s.getvalue().splitlines())
+        )
+
+    return data
+
+
+def make_records(count: int) -> list[logging.LogRecord]:
+    """Records with details, one in eight with a value the fast path leaves to ruamel"""
+    records = []
+    for i in range(count):
+        record = logging.LogRecord(
+            "prn:my-portfolio:my-app:main:123",
+            logging.INFO,
+            "deploy.py",
+            100,
+            "Lambda invoked response",
+            (),
+            None,
+        )
+        record.scope = "build"
+        record.details = {
+            "StatusCode": 200,
+            "FunctionName": f"arn:aws:lambda:us-east-1:123456789012:function:fn-{i}",
+            "Payload": {
+                "Status": "ok",
+                "Outputs": [
+                    {"OutputKey": "Arn", "OutputValue": f"arn:aws:s3:::bucket-{i}"},
+                    {"OutputKey": "Version", "OutputValue": i},
+                ],
+                "RunningActions": ["deploy-vpc", "deploy-subnets"],
+                "Duration": 1.25,
+                "Error": None,
+            },
+        }
+        if i % 8 == 0:
+            record.details["Message"] = "Deployed: the stack is ready"
+        records.append(record)
+    return records
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000, help="Records per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    formatter = CoreLogTextFormatter()
+    records = make_records(args.records)
+
+    for record in records:
+        if formatter.format(record) != legacy_format(formatter, copy.copy(record)):
+            raise SystemExit("Different output for a record")
+
+    # The legacy formatter changes the records
+    legacy = best(
+        lambda: [legacy_format(formatter, copy.copy(r)) for r in records], args.repeat
+    )
+    current = best(
+        lambda: [formatter.format(copy.copy(r)) for r in records], args.repeat
+    )
+
+    print(f"{'formatter':<10} {'records/s':>12}")
+    print(f"{'legacy':<10} {args.records / legacy:>12,.0f}")
+    print(f"{'current':<10} {args.records / current:>12,.0f}")
+    print(f"speedup    {legacy / current:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+""" Deep merge benchmark for core_framework.merge.
+
+Merges client, portfolio, app and zone FACTS layers with the previous implementation (deep copy of every layer
+before merging), the current deep_merge, deep_merge_shared and a LayeredView.  The layers are large and mostly
+disjoint, like shared defaults with a few overrides per layer.
+
+.. code-block:: bash
+
+    python benchmarks/merge.py
+    python benchmarks/merge.py --keys 5000
+
+"""
+
+import argparse
+import copy
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_framework.merge import (  # noqa: E402
+    deep_merge,
+    deep_merge_shared,
+    LayeredView,
+)
+
+
+def legacy_merge_into(dict1, dict2):
+    for key in dict2:
+        if key in dict1:
+            if isinstance(dict1[key], dict) and isinstance(dict2[key], dict):
+                legacy_merge_into(dict1[key], dict2[key])
+            elif dict1[key] == dict2[key]:
+                pass
+            else:
+                dict1[key] = dict2[key]
+        else:
+            dict1[key] = dict2[key]
+
+
+def legacy_deep_merge(*dicts):
+    merged = copy.deepcopy(dicts[0])
+    for d in dicts[1:]:
+        legacy_merge_into(merged, copy.deepcopy(d))
+    return merged
+
+
+def layer(name: str, keys: int, overrides: int) -> dict:
+    """A FACTS layer with its own keys and a few overrides of the shared keys"""
+    return {
+        "Tags": {"Layer": name, **{f"{name}Tag{i}": str(i) for i in range(50)}},
+        "Shared": {f"Key{i}": {"Value": name, "Layer": name} for i in range(overrides)},
+        name: {
+            f"Key{i}": {
+                "Value": i,
+                "Items": [f"item-{j}" for j in range(5)],
+                "Nested": {"A": {"B": i}},
+            }
+            for i in range(keys)
+        },
+    }
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=2000, help="Keys per layer")
+    parser.add_argument(
+        "--overrides", type=int, default=20, help="Shared keys overridden per layer"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    layers = [
+        layer(name, args.keys, args.overrides)
+        for name in ["Client", "Portfolio", "App", "Zone"]
+    ]
+    expected = legacy_deep_merge(*layers)
+    assert deep_merge(*layers) == expected
+    assert deep_merge_shared(*layers) == expected
+    assert LayeredView(*layers) == expected
+
+    def lookup():
+        view = LayeredView(*layers)
+        return [
+            view["Shared"][f"Key{i}"]["Value"] for i in range(args.overrides)
+        ], view["Tags"]["Layer"]
+
+    rows = [
+        ("legacy deep_merge", lambda: legacy_deep_merge(*layers)),
+        ("deep_merge", lambda: deep_merge(*layers)),
+        ("deep_merge_shared", lambda: deep_merge_shared(*layers)),
+        ("LayeredView lookups", lookup),
+    ]
+
+    timings = [(name, best(fn, args.repeat)) for name, fn in rows]
+    legacy = timings[0][1]
+    print(f"{'merge':<22} {'time (ms)':>10} {'speedup':>8}")
+    for name, elapsed in timings:
+        print(f"{name:<22} {elapsed:>10.2f} {legacy / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+""" Render context benchmark for Jinja2Renderer.
+
+Renders a template for many components.  Each component's context is the shared client, portfolio and app
+FACTS plus the component's own facts, built either with deep_merge() for every component (what callers do
+today) or as a LayeredView over a shared base view.
+
+.. code-block:: bash
+
+    python benchmarks/render_context.py
+    python benchmarks/render_context.py --components 500 --keys 5000
+
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_framework.merge import deep_merge, LayeredView  # noqa: E402
+from core_renderer import Jinja2Renderer  # noqa: E402
+
+TEMPLATE = """\
+Resources:
+  {{ component }}:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: {{ Portfolio }}-{{ App }}-{{ component }}
+      KMSMasterKeyID: {{ Kms.KmsKey }}
+      Region: {{ Zone.Region }}
+      Tags:
+{%- for key, value in Tags.items() %}
+        - Key: {{ key }}
+          Value: {{ value }}
+{%- endfor %}
+"""
+
+
+def facts(name: str, keys: int) -> dict:
+    """A FACTS layer with a lot of keys the template never uses"""
+    return {
+        name: name.lower(),
+        "Tags": {f"{name}Tag": name},
+        "Kms": {"KmsKey": f"{name}-key"},
+        "Zone": {"Region": "ap-southeast-1", f"{name}Setting": True},
+        f"{name}Details": {
+            f"Key{i}": {"Value": i, "Items": list(range(5))} for i in range(keys)
+        },
+    }
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--components", type=int, default=200, help="Components to render"
+    )
+    parser.add_argument(
+        "--keys", type=int, default=1000, help="Unused keys per FACTS layer"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    renderer = Jinja2Renderer(dictionary={"template.yaml.j2": TEMPLATE})
+    layers = [facts(name, args.keys) for name in ["Client", "Portfolio", "App"]]
+    components = [
+        {
+            "component": f"bucket{i}",
+            "Tags": {"Component": f"bucket{i}"},
+            "Kms": {"KmsKey": f"key-{i}"},
+        }
+        for i in range(args.components)
+    ]
+
+    def merged():
+        return [
+            renderer.render_file("template.yaml.j2", deep_merge(*layers, c))
+            for c in components
+        ]
+
+    def layered():
+        base = LayeredView(*layers)
+        return [
+            renderer.render_file("template.yaml.j2", LayeredView(base, c))
+            for c in components
+        ]
+
+    assert merged() == layered()
+
+    before = best(merged, args.repeat)
+    after = best(layered, args.repeat)
+    print(f"{'context':<12} {'time (ms)':>10}")
+    print(f"{'deep_merge':<12} {before:>10.1f}")
+    print(f"{'LayeredView':<12} {after:>10.1f}  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
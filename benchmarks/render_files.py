@@ -0,0 +1,84 @@
+""" render_files benchmark for Jinja2Renderer.
+
+Generates a files tree of templates in a temporary folder and renders it sequentially, with a thread pool and
+with a process pool.
+
+.. code-block:: bash
+
+    python benchmarks/render_files.py
+    python benchmarks/render_files.py --files 500 --workers 8
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_renderer import Jinja2Renderer  # noqa: E402
+
+TEMPLATE = """\
+Resources:
+{%- for i in range(Count) %}
+  Bucket{{ i }}:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: {{ Portfolio }}-{{ App }}-{{ i }}
+      Tags: {{ Tags | to_json }}
+      Subnets: {{ Subnets | ensure_list | to_json }}
+{%- endfor %}
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--files", type=int, default=200, help="Templates in the files tree"
+    )
+    parser.add_argument("--size", type=int, default=200, help="Resources per template")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4, help="Pool size"
+    )
+    args = parser.parse_args()
+
+    context = {
+        "Count": args.size,
+        "Portfolio": "my-portfolio",
+        "App": "my-app",
+        "Tags": {"Owner": "me", "CostCenter": "100"},
+        "Subnets": "subnet-1",
+    }
+
+    with tempfile.TemporaryDirectory() as template_path:
+        for i in range(args.files):
+            folder = os.path.join(template_path, "files", f"dir{i % 10}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"template{i}.yaml.j2"), "w") as f:
+                f.write(TEMPLATE)
+
+        expected = None
+        print(f"{'mode':<12} {'workers':>8} {'time (s)':>9}")
+        for executor, workers in [
+            ("sequential", 1),
+            ("thread", args.workers),
+            ("process", args.workers),
+        ]:
+            renderer = Jinja2Renderer(template_path)
+            start = time.perf_counter()
+            result = renderer.render_files(
+                "files",
+                context,
+                max_workers=workers,
+                executor="thread" if executor == "sequential" else executor,
+            )
+            elapsed = time.perf_counter() - start
+            expected = expected or result
+            assert result == expected
+            print(f"{executor:<12} {workers:>8} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
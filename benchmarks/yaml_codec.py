@@ -0,0 +1,144 @@
+""" YAML codec benchmark for to_yaml, from_yaml and write_yaml_all.
+
+A large state document is written and read with the current functions and with the previous implementation (a
+new ``YAML()`` instance per call and a quoted copy of the whole tree before dumping).  Many small documents show
+the per-call overhead.
+
+.. code-block:: bash
+
+    python benchmarks/yaml_codec.py
+    python benchmarks/yaml_codec.py --resources 5000
+
+"""
+
+import argparse
+import datetime
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core_framework as util  # noqa: E402
+
+from json_codec import state_document  # noqa: E402
+
+
+def legacy_quote_strings(data):
+    from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+
+    if isinstance(data, dict):
+        return {
+            k: v if k == "Label" else legacy_quote_strings(v) for k, v in data.items()
+        }
+    elif isinstance(data, list):
+        return [legacy_quote_strings(v) for v in data]
+    elif isinstance(data, str):
+        return DoubleQuotedScalarString(data)
+    elif isinstance(data, (datetime.datetime, datetime.date, datetime.time)):
+        return DoubleQuotedScalarString(data.isoformat())
+    return data
+
+
+def legacy_iso8601_constructor(loader, node):
+    value = loader.construct_scalar(node)
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+def legacy_to_yaml(data):
+    from ruamel.yaml import YAML
+
+    y = YAML(typ="rt")
+    y.default_flow_style = False
+    y.preserve_quotes = True
+    y.indent(mapping=2, sequence=4, offset=2)
+    s = io.StringIO()
+    y.dump(legacy_quote_strings(data), s)
+    return s.getvalue()
+
+
+def legacy_from_yaml(data):
+    from ruamel.yaml import YAML
+    from ruamel.yaml.constructor import RoundTripConstructor
+
+    class Constructor(RoundTripConstructor):
+        pass
+
+    y = YAML(typ="rt")
+    y.Constructor = Constructor
+    y.Constructor.add_constructor("tag:yaml.org,2002:str", legacy_iso8601_constructor)
+    return y.load(data)
+
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--resources", type=int, default=1000, help="Resources in the state document"
+    )
+    parser.add_argument(
+        "--small", type=int, default=200, help="Number of small documents"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    state = state_document(args.resources)
+    small = [
+        {"Key": f"key-{i}", "Value": "000001", "Created": "2025-01-04"}
+        for i in range(args.small)
+    ]
+
+    text = util.to_yaml(state)
+    small_text = [util.to_yaml(item) for item in small]
+    assert text == legacy_to_yaml(state)
+    assert util.from_yaml(text) == legacy_from_yaml(text)
+
+    def write_all():
+        util.write_yaml_all(iter(state["Resources"].values()), io.StringIO())
+
+    def legacy_write_all():
+        s = io.StringIO()
+        for resource in state["Resources"].values():
+            s.write("---\n" + legacy_to_yaml(resource))
+
+    rows = [
+        ("state to_yaml", lambda: legacy_to_yaml(state), lambda: util.to_yaml(state)),
+        (
+            "state from_yaml",
+            lambda: legacy_from_yaml(text),
+            lambda: util.from_yaml(text),
+        ),
+        (
+            "state from_yaml(safe)",
+            lambda: legacy_from_yaml(text),
+            lambda: util.from_yaml(text, typ="safe"),
+        ),
+        ("state write_yaml_all", legacy_write_all, write_all),
+        (
+            f"{args.small} small to_yaml",
+            lambda: [legacy_to_yaml(item) for item in small],
+            lambda: [util.to_yaml(item) for item in small],
+        ),
+        (
+            f"{args.small} small from_yaml",
+            lambda: [legacy_from_yaml(item) for item in small_text],
+            lambda: [util.from_yaml(item) for item in small_text],
+        ),
+    ]
+
+    print(f"{'operation':<24} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for operation, before, after in rows:
+        b = best(before, args.repeat)
+        a = best(after, args.repeat)
+        print(f"{operation:<24} {b:>12.1f} {a:>11.1f} {b / a:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
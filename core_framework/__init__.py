@@ -1,13 +1,10 @@
-from .merge import deep_copy, deep_merge_in_place, deep_merge, set_nested
-from .models import (
-    get_artefacts_path,
-    get_files_path,
-    get_packages_path,
-    get_artefact_key,
-    generate_task_payload,
-    generate_package_details,
-    generate_deployment_details_from_stack,
-    generate_deployment_details,
+from .merge import (
+    deep_copy,
+    deep_merge_in_place,
+    deep_merge,
+    deep_merge_shared,
+    LayeredView,
+    set_nested,
 )
 from .common import (
     split_prn,
@@ -15,6 +12,8 @@ from .common import (
     split_portfolio,
     get_prn,
     get_prn_alt,
+    get_config,
+    reset_config,
     get_region,
     get_client,
     get_client_name,
@@ -54,10 +53,14 @@ from .common import (
     from_json,
     read_json,
     write_json,
+    get_json_engine,
+    set_json_engine,
     to_yaml,
     from_yaml,
     read_yaml,
     write_yaml,
+    write_yaml_all,
+    read_yaml_all,
 )
 
 from ._version import __version__
@@ -93,6 +96,8 @@ __all__ = [
     "deep_copy",
     "deep_merge_in_place",
     "deep_merge",
+    "deep_merge_shared",
+    "LayeredView",
     "set_nested",
     "get_artefacts_path",
     "get_files_path",
@@ -107,6 +112,8 @@ __all__ = [
     "split_portfolio",
     "get_prn",
     "get_prn_alt",
+    "get_config",
+    "reset_config",
     "get_region",
     "get_client",
     "get_client_name",
@@ -146,10 +153,14 @@ __all__ = [
     "from_json",
     "read_json",
     "write_json",
+    "get_json_engine",
+    "set_json_engine",
     "to_yaml",
     "from_yaml",
     "read_yaml",
     "write_yaml",
+    "write_yaml_all",
+    "read_yaml_all",
     "get_prn_scope",
     "validate_item_prn",
     "validate_portfolio_prn",
@@ -177,5 +188,33 @@ __all__ = [
 ]
 
 
+# The model helpers need pydantic, which is expensive to import.  They are imported from .models
+# the first time they are used so that importing core_framework stays cheap on a Lambda cold start.
+_MODEL_HELPERS = (
+    "get_artefacts_path",
+    "get_files_path",
+    "get_packages_path",
+    "get_artefact_key",
+    "generate_task_payload",
+    "generate_package_details",
+    "generate_deployment_details_from_stack",
+    "generate_deployment_details",
+)
+
+
+def __getattr__(name: str):
+    if name in _MODEL_HELPERS:
+        from . import models
+
+        value = getattr(models, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_MODEL_HELPERS))
+
+
 def get_version():
     return __version__
@@ -6,19 +6,20 @@ other very commont tasks.
 """
 
 import warnings
-from typing import Any, IO
+from typing import Any, IO, Callable, Iterable, Iterator
+from functools import cache, cached_property
+from collections.abc import Mapping
 import tempfile
+import threading
 import json
 import datetime
 from decimal import Decimal
 import os
 import re
 import io
-import boto3
-from botocore.exceptions import ProfileNotFound
 
-from ruamel.yaml import YAML
-from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+# boto3 and ruamel.yaml are imported where they are used.  They are expensive to import and most
+# Lambda invocations never need them (cold start).
 
 from .constants import (
     # Environment Variables
@@ -52,6 +53,7 @@ from .constants import (
     ENV_DELIVERED_BY,
     ENV_LOG_DIR,
     ENV_USE_S3,
+    ENV_JSON_ENGINE,
     # Data Values
     V_CORE_AUTOMATION,
     V_DEFAULT_REGION,
@@ -73,6 +75,164 @@ from .constants import (
     CORE_AUTOMATION_PIPELINE_PROVISIONING_ROLE,
 )
 
+# Environment variables that the configuration snapshot depends on.  If any of these change, the snapshot is rebuilt.
+CONFIG_ENVIRONMENT = (
+    ENV_AUTOMATION_ACCOUNT,
+    ENV_AWS_PROFILE,
+    ENV_AWS_REGION,
+    ENV_CLIENT,
+    ENV_CLIENT_REGION,
+    ENV_DYNAMODB_REGION,
+    ENV_BUCKET_REGION,
+    ENV_INVOKER_LAMBDA_REGION,
+    ENV_MASTER_REGION,
+    ENV_SCOPE,
+    ENV_LOCAL_MODE,
+    ENV_USE_S3,
+    "AWS_DEFAULT_REGION",
+    "AWS_CONFIG_FILE",
+    "AWS_SHARED_CREDENTIALS_FILE",
+)
+
+
+class ConfigSnapshot:
+    """
+    A snapshot of the configuration derived from the environment variables.
+
+    Looking up the AWS profile and region requires creating a boto3 Session which is very expensive.  The snapshot
+    resolves each value once, on first use, and keeps it until the environment changes or :func:`reset_config`
+    is called.
+
+    Use :func:`get_config` to get the current snapshot.
+
+    Args:
+        environ (tuple[str | None, ...]): The values of the CONFIG_ENVIRONMENT variables when the snapshot was taken.
+
+    """
+
+    def __init__(self, environ: tuple[str | None, ...]):
+        self.environ = environ
+
+    @cached_property
+    def client(self) -> str | None:
+        """The client name from the environment variable CLIENT or AWS_PROFILE"""
+        return os.getenv(ENV_CLIENT, os.getenv(ENV_AWS_PROFILE, None))
+
+    @cached_property
+    def automation_scope(self) -> str | None:
+        """The automation scope prefix from the environment variable SCOPE"""
+        return os.getenv(ENV_SCOPE, None)
+
+    @cached_property
+    def aws_profile(self) -> str:
+        """The AWS profile.  "default" if the profile does not exist in the AWS configuration"""
+        profile = os.getenv(ENV_AWS_PROFILE, self.client or "default")
+
+        import boto3
+        from botocore.exceptions import ProfileNotFound
+
+        try:
+            # if the profile is not in the boto3.session credentials, then return "default"
+            boto3.session.Session(profile_name=profile)
+        except ProfileNotFound:
+            return "default"
+
+        return profile
+
+    @cached_property
+    def aws_region(self) -> str:
+        """The region of the AWS profile"""
+        import boto3
+        from botocore.exceptions import ProfileNotFound
+
+        try:
+            # if the profile is not in the boto3.session credentials, then return "default"
+            session = boto3.session.Session(profile_name=self.aws_profile)
+            return session.region_name
+        except ProfileNotFound:
+            return V_DEFAULT_REGION
+
+    @cached_property
+    def client_region(self) -> str:
+        """The client region from the environment variable CLIENT_REGION or the AWS profile region"""
+        region = os.getenv(ENV_CLIENT_REGION)
+        return self.aws_region if region is None else region
+
+    @cached_property
+    def master_region(self) -> str:
+        """The master region from the environment variable MASTER_REGION or the client region"""
+        region = os.getenv(ENV_MASTER_REGION)
+        return self.client_region if region is None else region
+
+    @cached_property
+    def region(self) -> str:
+        """The deployment region from the environment variable AWS_REGION or the master region"""
+        region = os.getenv(ENV_AWS_REGION)
+        return self.master_region if region is None else region
+
+    @cached_property
+    def bucket_region(self) -> str:
+        """The bucket region from the environment variable BUCKET_REGION or the master region"""
+        region = os.getenv(ENV_BUCKET_REGION)
+        return self.master_region if region is None else region
+
+    @cached_property
+    def dynamodb_region(self) -> str:
+        """The DynamoDB region from the environment variable DYNAMODB_REGION or the master region"""
+        region = os.getenv(ENV_DYNAMODB_REGION)
+        return self.master_region if region is None else region
+
+    @cached_property
+    def invoker_lambda_region(self) -> str:
+        """The invoker lambda region from the environment variable INVOKER_LAMBDA_REGION or the master region"""
+        region = os.getenv(ENV_INVOKER_LAMBDA_REGION)
+        return self.master_region if region is None else region
+
+    @cached_property
+    def automation_account(self) -> str | None:
+        """The automation account from the environment variable AUTOMATION_ACCOUNT"""
+        return os.getenv(ENV_AUTOMATION_ACCOUNT, None)
+
+    @cached_property
+    def local_mode(self) -> bool:
+        """True if the environment variable LOCAL_MODE is 'true'"""
+        return os.getenv(ENV_LOCAL_MODE, V_FALSE).lower() == V_TRUE
+
+    @cached_property
+    def use_s3(self) -> bool:
+        """True if the environment variable USE_S3 is 'true'.  Defaults to 'not LOCAL_MODE'"""
+        return os.getenv(ENV_USE_S3, str(not self.local_mode)).lower() == V_TRUE
+
+
+__config: ConfigSnapshot | None = None
+
+
+def get_config() -> ConfigSnapshot:
+    """
+    Return the configuration snapshot.  The snapshot is rebuilt automatically if any of the environment
+    variables it depends on have changed.
+
+    Returns:
+        ConfigSnapshot: The current configuration snapshot
+    """
+    global __config
+
+    environ = tuple(map(os.environ.get, CONFIG_ENVIRONMENT))
+
+    config = __config
+    if config is None or config.environ != environ:
+        config = __config = ConfigSnapshot(environ)
+
+    return config
+
+
+def reset_config() -> None:
+    """
+    Discard the configuration snapshot.  Call this if the AWS configuration files have changed.
+    """
+    global __config
+    __config = None
+
 
 def generate_branch_short_name(branch: str | None) -> str | None:
     """
@@ -210,6 +370,8 @@ def load_deployspec(app_dir: str | None = None) -> Any:
 
         fn = os.path.join(app_dir, V_DEPLOYSPEC_FILE_YAML)
         if os.path.exists(fn):
+            from ruamel.yaml import YAML
+
             with open(fn, "r") as f:
                 data = YAML(typ="safe").load(f)
         else:
@@ -374,7 +536,7 @@ def get_automation_scope() -> str | None:
     Returns:
         str | None: The prefix for all automation objects
     """
-    return os.getenv(ENV_SCOPE, None)
+    return get_config().automation_scope
 
 
 def get_provisioning_role_arn(account: str) -> str:
@@ -404,7 +566,7 @@ def is_use_s3() -> bool:
     Returns:
         bool: True if the deployment is using S3 for storage
     """
-    return os.getenv(ENV_USE_S3, str(not is_local_mode())).lower() == V_TRUE
+    return get_config().use_s3
 
 
 def is_local_mode() -> bool:
@@ -417,7 +579,7 @@ def is_local_mode() -> bool:
     Returns:
         bool: True of the mode is local
     """
-    return os.getenv(ENV_LOCAL_MODE, V_FALSE).lower() == V_TRUE
+    return get_config().local_mode
 
 
 def get_storage_volume(region: str | None = None) -> str:
@@ -487,7 +649,7 @@ def get_client() -> str | None:
     Returns:
         str | None: The client name
     """
-    return os.getenv(ENV_CLIENT, os.getenv(ENV_AWS_PROFILE, None))
+    return get_config().client
 
 
 def get_client_name() -> str | None:
@@ -530,15 +692,7 @@ def get_aws_profile() -> str:
     Returns:
         str: Value of the environment variable or client name or default
     """
-    profile = os.getenv(ENV_AWS_PROFILE, get_client() or "default")
-
-    try:
-        # if the profile is not in the boto3.session credentials, then return "default"
-        boto3.session.Session(profile_name=profile)
-    except ProfileNotFound:
-        return "default"
-
-    return profile
+    return get_config().aws_profile
 
 
 def get_aws_region() -> str:
@@ -548,14 +702,7 @@ def get_aws_region() -> str:
     Returns:
         str: The AWS region
     """
-    profile = get_aws_profile()
-
-    try:
-        # if the profile is not in the boto3.session credentials, then return "default"
-        session = boto3.session.Session(profile_name=profile)
-        return session.region_name
-    except ProfileNotFound:
-        return V_DEFAULT_REGION
+    return get_config().aws_region
 
 
 def get_client_region() -> str:
@@ -567,7 +714,7 @@ def get_client_region() -> str:
     Returns:
         str: The AWS region for the client
     """
-    return os.getenv(ENV_CLIENT_REGION, get_aws_region())
+    return get_config().client_region
 
 
 def get_master_region() -> str:
@@ -578,7 +725,7 @@ def get_master_region() -> str:
     Returns:
         str: The AWS region for the Core Automation Engine
     """
-    return os.getenv(ENV_MASTER_REGION, get_client_region())
+    return get_config().master_region
 
 
 def get_region() -> str:
@@ -589,7 +736,7 @@ def get_region() -> str:
     Returns:
         str: THe AWS region for the deployment
     """
-    return os.getenv(ENV_AWS_REGION, get_master_region())
+    return get_config().region
 
 
 def get_bucket_region() -> str:
@@ -599,7 +746,7 @@ def get_bucket_region() -> str:
     Returns:
         str: The AWS region for the bucket where core automation objects are stored.
     """
-    return os.environ.get(ENV_BUCKET_REGION, get_master_region())
+    return get_config().bucket_region
 
 
 def get_dynamodb_region() -> str:
@@ -609,7 +756,7 @@ def get_dynamodb_region() -> str:
     Returns:
         str: The AWS region for the DynamoDB table
     """
-    return os.getenv(ENV_DYNAMODB_REGION, get_master_region())
+    return get_config().dynamodb_region
 
 
 def get_invoker_lambda_region() -> str:
@@ -619,7 +766,7 @@ def get_invoker_lambda_region() -> str:
     Returns:
         str: The AWS region for the invoker lambda
     """
-    return os.getenv(ENV_INVOKER_LAMBDA_REGION, get_master_region())
+    return get_config().invoker_lambda_region
 
 
 def get_automation_account() -> str | None:
@@ -629,7 +776,7 @@ def get_automation_account() -> str | None:
     Returns:
         str | None: The AWS account number for the automation account where the core automation is installed or None
     """
-    return os.getenv(ENV_AUTOMATION_ACCOUNT, None)
+    return get_config().automation_account
 
 
 def get_dynamodb_host() -> str:
@@ -797,6 +944,15 @@ def get_environment() -> str:
     return os.getenv(ENV_ENVIRONMENT, "prod")
 
 
+JSON_ENGINES = ("json", "orjson", "msgspec")
+""" The JSON libraries that can be used by to_json and from_json """
+
+__json_engine: str | None = None
+__json_dumps: Callable[[Any, int | None], str] | None = None
+__json_loads: Callable[[str | bytes], Any] | None = None
+__json_encoders: dict[int | None, json.JSONEncoder] = {}
+
+
 def __custom_serializer(obj: Any) -> Any:
     """
     Handy tool for deserializing json objects that contain datetime objects as for SOME reason
@@ -817,10 +973,154 @@ def __custom_serializer(obj: Any) -> Any:
         return obj.isoformat()
     elif isinstance(obj, Decimal):
         return float(obj)  # or str(obj) if precision is important
+    elif isinstance(obj, Mapping):
+        return dict(obj)  # e.g. a LayeredView
     # No need to handle strings, ints, lists, dicts, etc. as they are already supported
     raise TypeError(f"Type {type(obj)} not serializable")
 
 
+def __stdlib_dumps(data: Any, pretty: int | None) -> str:
+    # json.dumps() builds a new encoder on every call when any option is given.  Same output.
+    encoder = __json_encoders.get(pretty)
+    if encoder is None:
+        encoder = json.JSONEncoder(indent=pretty, default=__custom_serializer)
+        __json_encoders[pretty] = encoder
+    return encoder.encode(data)
+
+
+def __orjson_engine() -> tuple[Callable, Callable]:
+    import orjson
+
+    def dumps(data: Any, pretty: int | None) -> str:
+        if pretty not in (None, 2):
+            # orjson can only indent by 2
+            return __stdlib_dumps(data, pretty)
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(
+                data, default=__custom_serializer, option=option
+            ).decode()
+        except TypeError:
+            # Integers larger than 64 bits, etc.  Let the json module serialize it (or raise the error)
+            return __stdlib_dumps(data, pretty)
+
+    def loads(data: str | bytes) -> Any:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # NaN, Infinity, etc.  Let the json module parse it (or raise the error)
+            return json.loads(data)
+
+    return dumps, loads
+
+
+def __msgspec_engine() -> tuple[Callable, Callable]:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(
+        enc_hook=__custom_serializer, decimal_format="number"
+    )
+    decoder = msgspec.json.Decoder()
+
+    def dumps(data: Any, pretty: int | None) -> str:
+        try:
+            result = encoder.encode(data)
+        except (TypeError, ValueError, OverflowError):
+            return __stdlib_dumps(data, pretty)
+        if pretty is not None:
+            result = msgspec.json.format(result, indent=pretty)
+        return result.decode()
+
+    def loads(data: str | bytes) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError:
+            return json.loads(data)
+
+    return dumps, loads
+
+
+def set_json_engine(name: str | None = None) -> str:
+    """
+    Select the JSON library used by to_json, write_json, from_json and read_json.
+
+    * "json" - the standard library.
+    * "orjson" or "msgspec" - a native library.  Must be installed.  The output of to_json is compact
+      (no spaces after the separators) and only an indent of 2 is supported by orjson.
+    * "auto" - parse with orjson or msgspec if either is installed, serialize with the json module so the output
+      does not change depending on what is installed.
+
+    Args:
+        name (str | None, optional): The name of the library.  Defaults to the JSON_ENGINE environment variable
+            or "auto".
+
+    Raises:
+        ValueError: If the library is not known or is not installed
+
+    Returns:
+        str: The name of the library used to parse JSON
+    """
+    global __json_engine, __json_dumps, __json_loads
+
+    explicit = name is not None
+    name = (name or os.getenv(ENV_JSON_ENGINE) or "auto").lower()
+    if name != "auto" and name not in JSON_ENGINES:
+        raise ValueError(
+            f"Unknown JSON engine '{name}'.  Use one of {JSON_ENGINES} or 'auto'"
+        )
+
+    engines = {"orjson": __orjson_engine, "msgspec": __msgspec_engine}
+
+    dumps: Callable = __stdlib_dumps
+    loads: Callable = json.loads
+    engine = "json"
+    if name == "auto":
+        for candidate in ("orjson", "msgspec"):
+            try:
+                _, loads = engines[candidate]()
+                engine = candidate
+                break
+            except ImportError:
+                continue
+    elif name != "json":
+        try:
+            dumps, loads = engines[name]()
+            engine = name
+        except ImportError:
+            if explicit:
+                raise ValueError(f"JSON engine '{name}' is not installed")
+            warnings.warn(
+                f"JSON engine '{name}' is not installed.  Using the json module."
+            )
+
+    __json_engine, __json_dumps, __json_loads = engine, dumps, loads
+    return engine
+
+
+def get_json_engine() -> str:
+    """
+    Return the name of the JSON library used to parse JSON ("json", "orjson" or "msgspec").
+
+    See :func:`set_json_engine`.
+
+    Returns:
+        str: The name of the library
+    """
+    return __json_engine or set_json_engine()
+
+
+def __dumps(data: Any, pretty: int | None) -> str:
+    if __json_dumps is None:
+        set_json_engine()
+    return __json_dumps(data, pretty)
+
+
+def __loads(data: str | bytes) -> Any:
+    if __json_loads is None:
+        set_json_engine()
+    return __json_loads(data)
+
+
 def to_json(data: Any, pretty: int | None = None) -> str:
     """
     The Json serializer for the data object.  This will serialize datetime objects and other objects that are not
@@ -840,7 +1140,7 @@ def to_json(data: Any, pretty: int | None = None) -> str:
     if data is None:
         return V_EMPTY  # or should we return "[]" or "{}"?
 
-    return json.dumps(data, indent=pretty, default=__custom_serializer)
+    return __dumps(data, pretty)
 
 
 def write_json(data: Any, output_stream: IO, pretty: int | None = None) -> None:
@@ -856,24 +1156,55 @@ def write_json(data: Any, output_stream: IO, pretty: int | None = None) -> None:
         pretty (int, optional): The pretty print indent level. Defaults to None
 
     """
-    json.dump(data, output_stream, indent=pretty, default=__custom_serializer)
+    output_stream.write(__dumps(data, pretty))
 
 
 def __iso8601_parser(data: Any) -> Any:
+    """
+    Convert the ISO8601 strings in the decoded JSON data to datetime objects.  The data is modified in place.
 
-    if isinstance(data, str):
-        try:
-            return datetime.datetime.fromisoformat(data)
-        except ValueError:
-            return data
-    elif isinstance(data, dict):
-        return {key: __iso8601_parser(value) for key, value in data.items()}
+    Only the strings inside objects (and inside lists inside objects) are converted.  That is what the old
+    object_hook did, so a top level list of strings stays a list of strings.
+
+    Every container is visited once.  fromisoformat() is only tried on strings that can be a date: at least
+    7 characters ("2025W01") starting with a 4 digit year.
+
+    Args:
+        data (Any): The decoded JSON data
+
+    Returns:
+        Any: The data
+    """
+    if isinstance(data, dict):
+        stack: list[tuple[Any, bool]] = [(data, True)]
     elif isinstance(data, list):
-        return [__iso8601_parser(item) for item in data]
+        stack = [(data, False)]
+    else:
+        return data
+
+    fromisoformat = datetime.datetime.fromisoformat
+    while stack:
+        node, in_object = stack.pop()
+        if type(node) is dict:
+            in_object = True
+            items: Any = node.items()
+        else:
+            items = enumerate(node)
+        for key, value in items:
+            kind = type(value)
+            if kind is str:
+                if in_object and len(value) >= 7 and value[:4].isdigit():
+                    try:
+                        node[key] = fromisoformat(value)
+                    except ValueError:
+                        pass
+            elif kind is dict or kind is list:
+                stack.append((value, in_object))
+
     return data
 
 
-def from_json(data: str) -> Any:
+def from_json(data: str | bytes, parse_dates: bool = True) -> Any:
     """
     The Json deserializer for the data object.  This will deserialize
     datetime objects and other objects that are not standard JSON objects.
@@ -882,52 +1213,216 @@ def from_json(data: str) -> Any:
 
     This function will convert date time strings in the json data to datetime objects.
 
-    If you want strings, you will have to reconvert them back to strings yourself.
+    If you want strings, set parse_dates to False.
 
     Args:
-        data (str): The JSON string to deserialize
+        data (str | bytes): The JSON string to deserialize
+        parse_dates (bool, optional): Convert ISO8601 strings to datetime objects. Defaults to True.
 
     Returns:
         dict: The deserialized data object
     """
-    return json.loads(data, object_hook=__iso8601_parser)
+    result = __loads(data)
+    return __iso8601_parser(result) if parse_dates else result
 
 
-def read_json(input_stream: IO) -> Any:
+def read_json(input_stream: IO, parse_dates: bool = True) -> Any:
     """Load the json data from the input stream. and respond with a dict or list object.
 
     !!! WARNING !!!
 
     This function will convert date time strings in the json data to datetime objects.
 
-    If you want strings, you will have to reconvert them back to strings yourself.
+    If you want strings, set parse_dates to False.
 
     Args:
         input_stream (Any): The input stream to read the json data from
+        parse_dates (bool, optional): Convert ISO8601 strings to datetime objects. Defaults to True.
 
     Returns:
         Any: The json data as a dict or list object
 
     """
-    return json.load(input_stream, object_hook=__iso8601_parser)
+    return from_json(input_stream.read(), parse_dates)
 
 
-def __quote_strings(data: Any):
-    """Recursively quote all strings in the data."""
-    if isinstance(data, dict):
-        return {k: v if k == "Label" else __quote_strings(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [__quote_strings(v) for v in data]
-    elif isinstance(data, str):
-        return DoubleQuotedScalarString(data)
-    elif isinstance(data, datetime.datetime):
-        return DoubleQuotedScalarString(data.isoformat())
-    elif isinstance(data, datetime.date):
-        return DoubleQuotedScalarString(data.isoformat())
-    elif isinstance(data, datetime.time):
-        return DoubleQuotedScalarString(data.isoformat())
-    else:
-        return data
+YAML_TYPES = ("rt", "safe")
+""" The YAML parsers that can be used by from_yaml and read_yaml """
+
+# ruamel YAML instances are expensive to create and are not thread safe.  Each thread keeps its own.
+__yaml_local = threading.local()
+
+
+def __to_datetime(value: str) -> Any:
+    # Cheap check first.  Nothing shorter than "2025W01" or without a 4 digit year is an ISO8601 date.
+    if len(value) >= 7 and value[:4].isdigit():
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+def __iso8601_constructor(loader, node):
+    return __to_datetime(loader.construct_scalar(node))
+
+
+@cache
+def __yaml_classes() -> dict[str, type]:
+    """
+    Create the ruamel constructor and representer classes.  Done on first use so ruamel is only imported
+    when YAML is used.
+
+    Returns:
+        dict[str, type]: The "rt" and "safe" constructors and the "representer"
+    """
+    from ruamel.yaml.constructor import RoundTripConstructor, SafeConstructor
+    from ruamel.yaml.representer import RoundTripRepresenter
+
+    class Iso8601RoundTripConstructor(RoundTripConstructor):
+        pass
+
+    class Iso8601SafeConstructor(SafeConstructor):
+        pass
+
+    class Unquoted:
+        __slots__ = ("value",)
+
+        def __init__(self, value: Any):
+            self.value = value
+
+    class QuotedRepresenter(RoundTripRepresenter):
+        """
+        Double quotes all the strings (except the values of the "Label" keys) and the dates so you won't
+        run into issues with string "000001" being converted to an integer "1".
+
+        Everything else is written the way the round-trip representer writes it.  Mapping keys are
+        not quoted and nothing is ever written as an anchor and alias.
+        """
+
+        quote = True
+        nested = False
+
+        def represent(self, data: Any) -> None:
+            self.quote = True
+            self.nested = False
+            super().represent(data)
+
+        def represent_key(self, data: Any) -> Any:
+            quote, self.quote = self.quote, False
+            try:
+                return super().represent_key(data)
+            finally:
+                self.quote = quote
+
+        def represent_none(self, data: Any) -> Any:
+            if self.nested:
+                return self.represent_scalar("tag:yaml.org,2002:null", "")
+            return super().represent_none(data)
+
+        def represent_data(self, data: Any) -> Any:  # noqa: C901
+            if not self.quote:
+                return super().represent_data(data)
+
+            self.alias_key = None
+            if isinstance(data, str):
+                return self.represent_scalar(
+                    "tag:yaml.org,2002:str", str(data), style='"'
+                )
+            if isinstance(data, (datetime.date, datetime.time)):
+                return self.represent_scalar(
+                    "tag:yaml.org,2002:str", data.isoformat(), style='"'
+                )
+            if isinstance(data, (dict, Mapping)):
+                self.nested = True
+                if type(data) is not dict or "Label" in data:
+                    data = dict(data.items())
+                    if "Label" in data:
+                        data["Label"] = Unquoted(data["Label"])
+                return self.represent_mapping("tag:yaml.org,2002:map", data)
+            if isinstance(data, list):
+                self.nested = True
+                if type(data) is not list:
+                    data = list(data)
+                return self.represent_sequence("tag:yaml.org,2002:seq", data)
+
+            # The values of "Label" keys and everything else are written as they are
+            if isinstance(data, Unquoted):
+                data = data.value
+            self.quote = False
+            try:
+                return super().represent_data(data)
+            finally:
+                self.quote = True
+
+    Iso8601RoundTripConstructor.add_constructor(
+        "tag:yaml.org,2002:str", __iso8601_constructor
+    )
+    Iso8601SafeConstructor.add_constructor(
+        "tag:yaml.org,2002:str", __iso8601_constructor
+    )
+    QuotedRepresenter.add_representer(type(None), QuotedRepresenter.represent_none)
+
+    return {
+        "rt": Iso8601RoundTripConstructor,
+        "safe": Iso8601SafeConstructor,
+        "representer": QuotedRepresenter,
+    }
+
+
+def __create_yaml(typ: str) -> Any:
+    """
+    Create a ruamel YAML instance.
+
+    Args:
+        typ (str): "rt" or "safe" to load, "dump" to dump
+
+    Returns:
+        YAML: The YAML instance
+    """
+    from ruamel.yaml import YAML
+
+    classes = __yaml_classes()
+
+    if typ == "dump":
+        y = YAML(typ="rt")
+        y.Representer = classes["representer"]
+        y.default_flow_style = False
+        y.preserve_quotes = True
+        y.indent(mapping=2, sequence=4, offset=2)
+        return y
+
+    if typ not in YAML_TYPES:
+        raise ValueError(f"Unknown YAML type '{typ}'.  Use one of {YAML_TYPES}")
+
+    # The safe loader uses libyaml (the C parser) when it is available
+    y = YAML(typ=typ)
+    y.Constructor = classes[typ]
+    return y
+
+
+def __get_yaml(typ: str) -> Any:
+    y = getattr(__yaml_local, typ, None)
+    if y is None:
+        y = __create_yaml(typ)
+        setattr(__yaml_local, typ, y)
+    return y
+
+
+def __dump_yaml(data: Any, stream: IO) -> None:
+    y = __get_yaml("dump")
+    try:
+        y.dump(data, stream)
+    except Exception:
+        # ruamel does not clean up after a failed dump.  Don't reuse it.
+        delattr(__yaml_local, "dump")
+        raise
+
+
+def __load_yaml(data: str | IO, typ: str) -> Any:
+    y = __get_yaml(typ)
+    y.doc_infos.clear()  # grows by one on every load
+    return y.load(data)
 
 
 def to_yaml(data: Any) -> str:
@@ -936,15 +1431,8 @@ def to_yaml(data: Any) -> str:
     Strings are "Quoted" so you won't run into issues with string "000001" being converted to an integer "1".
 
     """
-    quoted_data = __quote_strings(data)
-
-    y = YAML(typ="rt")
-    y.default_flow_style = False
-    y.preserve_quotes = True
-    y.indent(mapping=2, sequence=4, offset=2)
-
     s = io.StringIO()
-    y.dump(quoted_data, s)
+    __dump_yaml(data, s)
     return s.getvalue()
 
 
@@ -960,26 +1448,27 @@ def write_yaml(data: Any, stream: IO) -> None:
         stream (Any): The output stream to write the data to.
 
     """
+    __dump_yaml(data, stream)
 
-    quoted_data = __quote_strings(data)
 
-    y = YAML(typ="rt")
-    y.default_flow_style = False
-    y.preserve_quotes = True
-    y.indent(mapping=2, sequence=4, offset=2)
+def write_yaml_all(documents: Iterable[Any], stream: IO) -> None:
+    """Write the documents to the output stream as a multi-document YAML stream.
 
-    y.dump(quoted_data, stream)
+    Each document is written as soon as the iterable produces it so the documents of large
+    state and actions files don't need to be in memory at the same time.  Strings are quoted
+    the same way as :func:`write_yaml`.
 
+    Args:
+        documents (Iterable[Any]): The documents (a generator is fine)
+        stream (IO): The output stream to write the documents to
 
-def __iso8601_constructor(loader, node):
-    value = loader.construct_scalar(node)
-    try:
-        return datetime.datetime.fromisoformat(value)
-    except ValueError:
-        return value
+    """
+    # Not the thread's shared instance.  The iterable may call to_yaml() while we are half way through.
+    y = __create_yaml("dump")
+    y.dump_all(documents, stream)
 
 
-def from_yaml(data: str) -> Any:
+def from_yaml(data: str, typ: str = "rt") -> Any:
     """Convert yaml str to a dict or list.
 
     # TODO - compare this to the from_yaml in the yamlmerge object and
@@ -996,17 +1485,17 @@ def from_yaml(data: str) -> Any:
 
     Args:
         data (str): The yaml string to convert to a dict or list
+        typ (str, optional): "rt" for the round-trip parser or "safe" for the much faster libyaml parser
+            that returns plain dicts and lists (no comments or key order information). Defaults to "rt".
 
     Returns:
         Any: The yaml data as a dict or list object
 
     """
-    y = YAML(typ="rt")
-    y.Constructor.add_constructor("tag:yaml.org,2002:str", __iso8601_constructor)
-    return y.load(data)
+    return __load_yaml(data, typ)
 
 
-def read_yaml(input_stream: IO) -> Any:
+def read_yaml(input_stream: IO, typ: str = "rt") -> Any:
     """Load the yaml data from the input stream.
 
     This uses the "rount-trip" yaml parser. so you will get an OrderedDict
@@ -1022,10 +1511,27 @@ def read_yaml(input_stream: IO) -> Any:
 
     Args:
         input_stream (Any): The input stream to read the yaml data from
+        typ (str, optional): "rt" for the round-trip parser or "safe" for the much faster libyaml parser.
+            Defaults to "rt".
 
     Returns:
         Any: The yaml data is a dict or list object
     """
-    y = YAML(typ="rt")
-    y.Constructor.add_constructor("tag:yaml.org,2002:str", __iso8601_constructor)
-    return y.load(input_stream)
+    return __load_yaml(input_stream, typ)
+
+
+def read_yaml_all(input_stream: IO, typ: str = "rt") -> Iterator[Any]:
+    """Load the documents of a multi-document YAML stream one at a time.
+
+    Dates are converted to datetime objects like :func:`read_yaml`.
+
+    Args:
+        input_stream (IO): The input stream to read the documents from
+        typ (str, optional): "rt" for the round-trip parser or "safe" for the much faster libyaml parser.
+            Defaults to "rt".
+
+    Returns:
+        Iterator[Any]: The documents
+    """
+    # Not the thread's shared instance.  The caller may call from_yaml() between documents.
+    yield from __create_yaml(typ).load_all(input_stream)
@@ -108,6 +108,8 @@ V_LOCAL = "local"
 """ \\- "local" """
 V_FULL = "full"
 """ \\- "full" """
+V_INCREMENTAL = "incremental"
+""" \\- "incremental" """
 V_PLATFORM = "platform"
 """ \\- "platform" """
 V_CREATE_STACK = "create_stack"
@@ -467,8 +469,34 @@ ENV_DELIVERED_BY = "DELIVERED_BY"
 """ \\- "DELIVERED_BY". The name of the person, team, or system that ran a Task.  Defaults to 'automation'. """
 ENV_LOG_DIR = "LOG_DIR"
 """ \\- "LOG_DIR". if LOCAL_MODE=true, the LOG_DIR is where logs are stored.  Defaults to f"{os.getcwd()}/local/logs" """
+ENV_LOG_ASYNC = "LOG_ASYNC"
+""" \\- "LOG_ASYNC". If set to True, log messages are formatted and written by a background thread.  Defaults to False """
+ENV_LOG_QUEUE_SIZE = "LOG_QUEUE_SIZE"
+""" \\- "LOG_QUEUE_SIZE". The maximum number of log messages waiting for the background thread.  Defaults to 10000 """
+ENV_LOG_QUEUE_POLICY = "LOG_QUEUE_POLICY"
+""" \\- "LOG_QUEUE_POLICY". What happens when the log queue is full: "block", "drop-oldest" or "drop-below-level".  Defaults to "block" """
+ENV_LOG_MAX_DETAIL_LENGTH = "LOG_MAX_DETAIL_LENGTH"
+""" \\- "LOG_MAX_DETAIL_LENGTH". Strings in the details of log messages are cut to this length.  Defaults to 0 (no limit) """
+ENV_LOG_MAX_DETAIL_ITEMS = "LOG_MAX_DETAIL_ITEMS"
+""" \\- "LOG_MAX_DETAIL_ITEMS". Lists and dictionaries in the details of log messages keep only this many items.  Defaults to 0 (no limit) """
 ENV_USE_S3 = "USE_S3"
 """ \\- "USE_S3". If set to True, the automation will use S3 for artefacts.  Defaults to "not LOCAL_MODE" """
+ENV_CREDENTIAL_REFRESH_MARGIN = "CREDENTIAL_REFRESH_MARGIN"
+""" \\- "CREDENTIAL_REFRESH_MARGIN". Seconds before assumed role credentials expire that they are refreshed in the background.  Defaults to 300 """
+ENV_AIO_MAX_CONCURRENCY = "AIO_MAX_CONCURRENCY"
+""" \\- "AIO_MAX_CONCURRENCY". The maximum number of concurrent AWS calls made by core_helper.aio.  Defaults to 32 """
+ENV_ETAG_SIDECAR = "ETAG_SIDECAR"
+""" \\- "ETAG_SIDECAR". If set to True, local mode keeps the ETags of the stored files in a database in the storage volume.  Defaults to False """
+ENV_TRANSFER_PART_SIZE = "TRANSFER_PART_SIZE"
+""" \\- "TRANSFER_PART_SIZE". The size in bytes of the parts of multipart uploads and ranged downloads.  Defaults to 8 MiB """
+ENV_TRANSFER_MAX_CONCURRENCY = "TRANSFER_MAX_CONCURRENCY"
+""" \\- "TRANSFER_MAX_CONCURRENCY". The maximum number of parts transferred at the same time.  Defaults to 8 """
+ENV_JSON_ENGINE = "JSON_ENGINE"
+""" \\- "JSON_ENGINE". The JSON library used by to_json and from_json: "json", "orjson", "msgspec" or "auto".  Defaults to "auto" """
+ENV_TEMPLATE_CACHE_DIR = "TEMPLATE_CACHE_DIR"
+""" \\- "TEMPLATE_CACHE_DIR". If set, the directory where the compiled Jinja2 templates are kept between runs.  Defaults to None (not kept) """
+ENV_RENDER_MAX_WORKERS = "RENDER_MAX_WORKERS"
+""" \\- "RENDER_MAX_WORKERS". The number of files Jinja2Renderer.render_files renders at the same time.  Defaults to 1 """
 
 # Jina2 Context Fitler Constants
 CTX_TAGS = "tags"
@@ -1,10 +1,37 @@
-""" Methods to perform deep merging of dictionaries with options of excluding keys, copy, or in-place modifications. """
+""" Methods to perform deep merging of dictionaries with options of excluding keys, copy, or in-place modifications.
 
-from typing import Any
+Three ways to merge layers (e.g. client, portfolio, app and zone FACTS) where later layers win:
 
-from collections.abc import Callable
+* :func:`deep_merge` and :func:`deep_merge_in_place` return a merged dictionary that shares nothing with the
+  later layers.  Only the values that end up in the result are copied.
+* :func:`deep_merge_shared` copies only the dictionaries that two layers both contribute to.  Everything else
+  is shared with the layers, so treat the result as read-only.
+* :class:`LayeredView` does not merge anything.  Keys are looked up through the layers when they are read.
+
+None of them are recursive so deeply nested documents can't hit the recursion limit.
+
+"""
+
+from typing import Any, Iterator
+
+from collections.abc import Callable, Mapping
 
 import copy
+import datetime
+import functools
+
+# Values that never need to be copied
+IMMUTABLE_TYPES = (
+    str,
+    int,
+    float,
+    bool,
+    type(None),
+    bytes,
+    datetime.datetime,
+    datetime.date,
+    datetime.time,
+)
 
 
 def deep_copy(obj: Any) -> Any:
@@ -24,10 +51,110 @@ def __default_should_merge(key: str) -> bool:
     return True
 
 
+def __copy_value(value: Any, memo: dict[int, Any] | None = None) -> Any:
+    """
+    Deep copy a value.  Dicts and lists are copied without recursion, anything else that is not immutable is
+    copied with copy.deepcopy().
+
+    Like copy.deepcopy(), a dict or list that is reached more than once (a shared or a self-referential one)
+    is copied once and the copy is used everywhere.
+
+    Args:
+        value (Any): The value to copy
+        memo (dict[int, Any] | None, optional): The copies by the id() of their original, to share between
+            calls.  Defaults to None.
+
+    Returns:
+        Any: The copy
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    if memo is None:
+        memo = {}
+    if id(value) in memo:
+        return memo[id(value)]
+    if type(value) is dict:
+        result: Any = {}
+    elif type(value) is list:
+        result = [None] * len(value)
+    else:
+        return copy.deepcopy(value, memo)
+    memo[id(value)] = result
+
+    stack = [(value, result)]
+    while stack:
+        source, target = stack.pop()
+        items = source.items() if type(source) is dict else enumerate(source)
+        for key, item in items:
+            if isinstance(item, IMMUTABLE_TYPES):
+                target[key] = item
+            elif id(item) in memo:
+                target[key] = memo[id(item)]
+            elif type(item) is dict:
+                target[key] = memo[id(item)] = {}
+                stack.append((item, target[key]))
+            elif type(item) is list:
+                target[key] = memo[id(item)] = [None] * len(item)
+                stack.append((item, target[key]))
+            else:
+                target[key] = copy.deepcopy(item, memo)
+    return result
+
+
+def __merge_into(
+    target: dict[str, Any],
+    source: dict[str, Any],
+    merge_lists: bool,
+    should_merge: Callable[[str], bool],
+    owned: set[int] | None = None,
+) -> None:
+    """
+    Merge the source dictionary into the target dictionary.
+
+    If owned is None the target is modified in place and the values taken from the source are copied.
+
+    Otherwise the values taken from the source are shared and the nested dictionaries of the target are only
+    modified if their id() is in owned.  The others are copied first (copy on write).
+
+    Args:
+        target (dict[str, Any]): The dictionary to merge into
+        source (dict[str, Any]): The dictionary to merge
+        merge_lists (bool): True to concatenate lists
+        should_merge (Callable[[str], bool]): Check if a value should be replaced
+        owned (set[int] | None, optional): The ids of the dictionaries that can be modified. Defaults to None.
+    """
+    # One memo for the layer, so the values it shares stay shared in the result
+    take = functools.partial(__copy_value, memo={}) if owned is None else None
+
+    stack = [(target, source)]
+    while stack:
+        dict1, dict2 = stack.pop()
+        for key, value in dict2.items():
+            if key not in dict1:
+                dict1[key] = take(value) if take else value
+                continue
+
+            current = dict1[key]
+            if isinstance(current, dict) and isinstance(value, dict):
+                if owned is not None and id(current) not in owned:
+                    current = dict1[key] = dict(current)
+                    owned.add(id(current))
+                stack.append((current, value))
+
+            elif merge_lists and isinstance(current, list) and isinstance(value, list):
+                dict1[key] = current + (take(value) if take else value)
+
+            elif current is value or current == value:
+                pass
+
+            elif should_merge(key):
+                dict1[key] = take(value) if take else value
+
+
 def deep_merge_in_place(
     *dicts: dict[str, Any],
     merge_lists: bool = False,
-    should_merge: Callable[[str], bool] = __default_should_merge
+    should_merge: Callable[[str], bool] = __default_should_merge,
 ) -> dict[str, Any]:
     """
     Merge multiple dictionaries into the first dictionary in place.  Mutates the first dictionary.
@@ -43,66 +170,168 @@ def deep_merge_in_place(
     """
     merged_dict = dicts[0]
     for d in dicts[1:]:
-        __deep_merge(
-            merged_dict,
-            deep_copy(d),
-            merge_lists=merge_lists,
-            should_merge=should_merge,
-        )
+        __merge_into(merged_dict, d, merge_lists, should_merge)
     return merged_dict
 
 
 def deep_merge(
     *dicts: dict[str, Any],
     merge_lists: bool = False,
-    should_merge: Callable[[str], bool] = __default_should_merge
+    should_merge: Callable[[str], bool] = __default_should_merge,
 ) -> dict[str, Any]:
     """
     Merges multiple dictionaries into a new dictionary.  Does not mutate the original dictionaries.
 
     Args:
         *dicts (dict[str, Any]): the dictionaries to merge
-        merge_lists (bool, optional): _description_. Defaults to False.
-        should_merge (Callable[[str], bool], optional): _description_. Defaults to __default_should_merge.
+        merge_lists (bool, optional): True to merge lists. Defaults to False.
+        should_merge (Callable[[str], bool], optional): supply a function to check if a particular.
+            key should be marged or not.  Defaults to merge all keys.
 
     Returns:
         dict[str, Any]: A new merged dictionary
     """
-    first_dict = deep_copy(dicts[0])
+    first_dict = __copy_value(dicts[0])
     return deep_merge_in_place(
         first_dict, *dicts[1:], merge_lists=merge_lists, should_merge=should_merge
     )
 
 
-def __deep_merge(
-    dict1: dict[str, Any],
-    dict2: dict[str, Any],
+def deep_merge_shared(
+    *dicts: dict[str, Any],
     merge_lists: bool = False,
     should_merge: Callable[[str], bool] = __default_should_merge,
-) -> None:
-    for key in dict2:
-        if key in dict1:
-            if isinstance(dict1[key], dict) and isinstance(dict2[key], dict):
-                __deep_merge(
-                    dict1[key],
-                    dict2[key],
-                    merge_lists=merge_lists,
-                    should_merge=should_merge,
-                )
+) -> dict[str, Any]:
+    """
+    Merges multiple dictionaries into a new dictionary without copying the values that don't change.
+
+    Only the dictionaries that more than one layer contributes to are copied.  The rest of the result is
+    shared with the layers, so modifying the result can modify the layers (and the other way around).  Use
+    this when the result is only read, e.g. the context of a template.
+
+    Args:
+        *dicts (dict[str, Any]): the dictionaries to merge
+        merge_lists (bool, optional): True to merge lists. Defaults to False.
+        should_merge (Callable[[str], bool], optional): supply a function to check if a particular.
+            key should be marged or not.  Defaults to merge all keys.
+
+    Returns:
+        dict[str, Any]: A new merged dictionary
+    """
+    merged_dict = dict(dicts[0])
+    owned = {id(merged_dict)}
+    for d in dicts[1:]:
+        __merge_into(merged_dict, d, merge_lists, should_merge, owned)
+    return merged_dict
+
+
+class LayeredView(Mapping):
+    """
+    A read-only view of dictionaries merged the same way as :func:`deep_merge`, like a ChainMap that
+    also merges the nested dictionaries.
+
+    Nothing is merged up front.  A key is looked up through the layers when it is read and the result is
+    kept, so the layers must not change while the view is in use.  Nested dictionaries that more than one
+    layer contributes to are returned as a LayeredView.
+
+    .. code-block:: python
+
+        facts = LayeredView(client_facts, portfolio_facts, app_facts, zone_facts)
+        region = facts["Zone"]["Region"]
+
+    Args:
+        *layers (dict[str, Any]): The dictionaries.  Later layers win.
+        merge_lists (bool, optional): True to concatenate lists. Defaults to False.
+        should_merge (Callable[[str], bool], optional): supply a function to check if a particular.
+            key should be marged or not.  Defaults to merge all keys.
+    """
+
+    def __init__(
+        self,
+        *layers: Mapping[str, Any],
+        merge_lists: bool = False,
+        should_merge: Callable[[str], bool] | None = None,
+    ):
+        # Private so they don't hide keys from Jinja2 (foo.layers tries the attribute first)
+        self._layers = layers
+        self._merge_lists = merge_lists
+        self._should_merge = should_merge
+        self._cache: dict[str, Any] = {}
+        self._keys: list[str] | None = None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        found = False
+        value: Any = None
+        nested: list[Mapping] | None = None
+        for layer in self._layers:
+            if key not in layer:
+                continue
+            item = layer[key]
+            if not found:
+                found = True
+                value, nested = item, [item] if isinstance(item, Mapping) else None
+            elif nested is not None and isinstance(item, Mapping):
+                nested.append(item)
             elif (
-                merge_lists
-                and isinstance(dict1[key], list)
-                and isinstance(dict2[key], list)
+                self._merge_lists and isinstance(value, list) and isinstance(item, list)
             ):
-                dict1[key] = dict1[key] + dict2[key]
-
-            elif dict1[key] == dict2[key]:
+                value = value + item
+            elif nested is None and (value is item or value == item):
                 pass
+            elif self._should_merge is None or self._should_merge(key):
+                value, nested = item, [item] if isinstance(item, Mapping) else None
 
-            elif should_merge(key):
-                dict1[key] = dict2[key]
-        else:
-            dict1[key] = dict2[key]
+        if not found:
+            raise KeyError(key)
+
+        if nested is not None and len(nested) > 1:
+            value = LayeredView(
+                *nested, merge_lists=self._merge_lists, should_merge=self._should_merge
+            )
+
+        self._cache[key] = value
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._cache or any(key in layer for layer in self._layers)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._key_list())
+
+    def __len__(self) -> int:
+        return len(self._key_list())
+
+    def _key_list(self) -> list[str]:
+        if self._keys is None:
+            # The same order as deep_merge()
+            self._keys = list(dict.fromkeys(k for layer in self._layers for k in layer))
+        return self._keys
+
+    def __repr__(self) -> str:
+        # The same text as the merged dictionary, e.g. for {{ facts }} in a template
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Merge the layers into a new dictionary.
+
+        Returns:
+            dict[str, Any]: The same result as deep_merge() of the layers
+        """
+        layers = [
+            layer.to_dict() if isinstance(layer, LayeredView) else layer
+            for layer in self._layers
+        ]
+        return deep_merge(
+            *layers,
+            merge_lists=self._merge_lists,
+            should_merge=self._should_merge or (lambda key: True),
+        )
 
 
 def set_nested(dic: dict, keys: list, value: Any) -> None:
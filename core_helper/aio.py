@@ -0,0 +1,236 @@
+""" Asyncio versions of the AWS Helper functions in core_helper.aws
+
+All functions run the blocking boto3 calls of :mod:`core_helper.aws` in a shared thread pool, so they share the same
+session, credential and client caches.  The number of calls in flight at the same time is bounded by the
+AIO_MAX_CONCURRENCY environment variable (or :func:`set_max_concurrency`).
+
+.. code-block:: python
+
+    import core_helper.aio as aio
+
+    client = await aio.cfn_client(region="us-east-1")
+    stacks = await asyncio.gather(
+        *[aio.call(client.describe_stacks, StackName=name) for name in stack_names]
+    )
+
+"""
+
+from typing import Any
+from collections.abc import Callable
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from core_framework.constants import ENV_AIO_MAX_CONCURRENCY
+
+from . import aws
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+__lock = threading.Lock()
+__executor: ThreadPoolExecutor | None = None
+__max_concurrency: int | None = None
+__semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_max_concurrency() -> int:
+    """
+    Return the maximum number of AWS calls that may be in flight at the same time.
+
+    Returns:
+        int: The value set with set_max_concurrency() or the AIO_MAX_CONCURRENCY environment variable.  Defaults to 32
+    """
+    if __max_concurrency is not None:
+        return __max_concurrency
+    try:
+        return max(
+            int(os.getenv(ENV_AIO_MAX_CONCURRENCY, str(DEFAULT_MAX_CONCURRENCY))), 1
+        )
+    except ValueError:
+        return DEFAULT_MAX_CONCURRENCY
+
+
+def set_max_concurrency(max_concurrency: int) -> None:
+    """
+    Set the maximum number of AWS calls that may be in flight at the same time.
+
+    The thread pool is recreated on the next call.  Calls already in flight are not affected.
+
+    Args:
+        max_concurrency (int): The maximum number of concurrent calls
+    """
+    global __executor, __max_concurrency, __semaphores
+
+    with __lock:
+        __max_concurrency = max(int(max_concurrency), 1)
+        executor, __executor = __executor, None
+        __semaphores = weakref.WeakKeyDictionary()
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the thread pool used to run the blocking boto3 calls.
+
+    Returns:
+        ThreadPoolExecutor: The shared thread pool
+    """
+    global __executor
+
+    with __lock:
+        if __executor is None:
+            __executor = ThreadPoolExecutor(
+                max_workers=get_max_concurrency(), thread_name_prefix="core_aio"
+            )
+        return __executor
+
+
+def __get_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore that limits the concurrency on the running event loop"""
+    loop = asyncio.get_running_loop()
+    with __lock:
+        semaphore = __semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(get_max_concurrency())
+            __semaphores[loop] = semaphore
+        return semaphore
+
+
+async def call(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking function (typically a boto3 client method) in the thread pool and wait for the result.
+
+    .. code-block:: python
+
+        response = await aio.call(client.describe_stacks, StackName="my-stack")
+
+    Args:
+        func (Callable[..., Any]): The function to call
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        Any: The result of the function
+    """
+    async with __get_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+
+async def get_session(**kwargs) -> Any:
+    """Async version of :func:`core_helper.aws.get_session`"""
+    return await call(aws.get_session, **kwargs)
+
+
+async def get_session_credentials(**kwargs) -> dict | None:
+    """Async version of :func:`core_helper.aws.get_session_credentials`"""
+    return await call(aws.get_session_credentials, **kwargs)
+
+
+async def assume_role(**kwargs) -> dict[str, str] | None:
+    """Async version of :func:`core_helper.aws.assume_role`"""
+    return await call(aws.assume_role, **kwargs)
+
+
+async def get_identity() -> dict[str, str] | None:
+    """Async version of :func:`core_helper.aws.get_identity`"""
+    return await call(aws.get_identity)
+
+
+async def get_client(service: str, **kwargs) -> Any:
+    """Async version of :func:`core_helper.aws.get_client`"""
+    return await call(aws.get_client, service, **kwargs)
+
+
+async def get_resource(service: str, **kwargs) -> Any:
+    """Async version of :func:`core_helper.aws.get_resource`"""
+    return await call(aws.get_resource, service, **kwargs)
+
+
+async def sts_client(**kwargs) -> Any:
+    return await get_client("sts", **kwargs)
+
+
+async def cfn_client(**kwargs) -> Any:
+    return await get_client("cloudformation", **kwargs)
+
+
+async def cloudwatch_client(**kwargs) -> Any:
+    return await get_client("cloudwatch", **kwargs)
+
+
+async def cloudfront_client(**kwargs) -> Any:
+    return await get_client("cloudfront", **kwargs)
+
+
+async def ec2_client(**kwargs) -> Any:
+    return await get_client("ec2", **kwargs)
+
+
+async def ecr_client(**kwargs) -> Any:
+    return await get_client("ecr", **kwargs)
+
+
+async def elb_client(**kwargs) -> Any:
+    return await get_client("elb", **kwargs)
+
+
+async def elbv2_client(**kwargs) -> Any:
+    return await get_client("elbv2", **kwargs)
+
+
+async def iam_client(**kwargs) -> Any:
+    return await get_client("iam", **kwargs)
+
+
+async def kms_client(**kwargs) -> Any:
+    return await get_client("kms", **kwargs)
+
+
+async def lambda_client(**kwargs) -> Any:
+    return await get_client("lambda", **kwargs)
+
+
+async def rds_client(**kwargs) -> Any:
+    return await get_client("rds", **kwargs)
+
+
+async def s3_client(**kwargs) -> Any:
+    return await get_client("s3", **kwargs)
+
+
+async def org_client(**kwargs) -> Any:
+    return await get_client("organizations", **kwargs)
+
+
+async def step_functions_client(**kwargs) -> Any:
+    return await get_client("stepfunctions", **kwargs)
+
+
+async def s3_resource(**kwargs) -> Any:
+    return await call(aws.s3_resource, **kwargs)
+
+
+async def dynamodb_resource(**kwargs) -> Any:
+    return await call(aws.dynamodb_resource, **kwargs)
+
+
+async def invoke_lambda(
+    arn: str, request_payload: dict[str, Any], **kwargs
+) -> dict[str, Any]:
+    """Async version of :func:`core_helper.aws.invoke_lambda`"""
+    return await call(aws.invoke_lambda, arn, request_payload, **kwargs)
+
+
+async def invoke_lambdas(
+    invocations: list[tuple[str, dict[str, Any]]], **kwargs
+) -> list[dict[str, Any]]:
+    """Async version of :func:`core_helper.aws.invoke_lambdas`"""
+    return await call(aws.invoke_lambdas, invocations, **kwargs)
@@ -1,13 +1,10 @@
 """ AWS Helper functions that provide Automation Role switching for all deployment functions and Lambda's """
 
-from typing import Any
+from typing import Any, TYPE_CHECKING
 
 import json
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 
-from boto3.session import Session
-
-from botocore.config import Config
 from botocore.exceptions import ClientError
 
 import core_framework as util
@@ -19,10 +16,46 @@ from core_framework.constants import (
 
 import core_logging as log
 
-from .cache import InsecureEnclave
+from .cache import InsecureEnclave, ClientCache
+from .credentials import CredentialManager, get_credentials_expiration
+
+if TYPE_CHECKING:
+    from boto3.session import Session
+    from botocore.config import Config
+
+INVOCATION_TYPE_REQUEST_RESPONSE = "RequestResponse"
+INVOCATION_TYPE_EVENT = "Event"
+DEFAULT_MAX_IN_FLIGHT = 10
 
 store = InsecureEnclave()
 
+clients = ClientCache()
+
+credential_manager = CredentialManager(store)
+
+# A single Config is shared by all clients.  Clients are cached, so this is only used on a cache miss.
+# It is created on first use because importing boto3/botocore is a large part of a Lambda cold start.
+__client_config: "Config | None" = None
+
+
+def get_client_config() -> "Config":
+    """
+    Return the botocore Config shared by all clients and resources.
+
+    Returns:
+        Config: 15 second connect and read timeouts and up to 10 retries
+    """
+    global __client_config
+
+    if __client_config is None:
+        from botocore.config import Config
+
+        __client_config = Config(
+            connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
+        )
+
+    return __client_config
+
 
 def transform_stack_parameter_dict(keyvalues: dict[str, str]) -> dict[str, str]:
     rv = {}
@@ -63,11 +96,11 @@ def transform_tag_hash(keyvalues: dict[str, str]) -> list[dict[str, str]]:
     return __transform_keyvalues_to_array(keyvalues, "Key", "Value")
 
 
-def get_session_key(session: Session) -> str | None:
+def get_session_key(session: "Session") -> str | None:
     return f"session:{session.profile_name}-{session.region_name}"
 
 
-def get_session(**kwargs) -> Session:
+def get_session(**kwargs) -> "Session":
 
     region = kwargs.get("region", util.get_region())
     profile_name = kwargs.get("aws_profile", util.get_aws_profile())
@@ -78,6 +111,8 @@ def get_session(**kwargs) -> Session:
     session = store.retrieve_session(key)
 
     if session is None:
+        import boto3.session
+
         session = boto3.session.Session(region_name=region, profile_name=profile_name)
         store.store_session(key, session, ttl=300)  # 5 minutes
 
@@ -170,6 +205,9 @@ def assume_role(**kwargs) -> dict[str, str] | None:
 
     If the role is None, the function will return the current session credentials.
 
+    Credentials are cached until shortly before the "Expiration" returned by STS and are refreshed
+    in the background before they expire.  Concurrent callers for the same role share a single STS call.
+
     Args:
         role (str | None, optional): A role to assume. Defaults to None.
 
@@ -182,10 +220,25 @@ def assume_role(**kwargs) -> dict[str, str] | None:
     if role is None:
         return get_session_credentials()
 
-    credentials = store.retrieve_data(role)
+    credentials = credential_manager.get(role, lambda: __sts_assume_role(**kwargs))
     if credentials:
         return credentials
 
+    return get_session_credentials()
+
+
+def __sts_assume_role(**kwargs) -> dict[str, str] | None:
+    """
+    Call STS to assume the role.  Use assume_role() instead.  It caches and refreshes the credentials.
+
+    Args:
+        role (str): The role to assume
+
+    Returns:
+        dict[str, str] | None: The "Credentials" returned by STS or None if the role could not be assumed
+    """
+    role = kwargs.get("role", None)
+
     try:
         # Assume the role if no role credentials exist or existing credentials have expired
 
@@ -197,14 +250,9 @@ def assume_role(**kwargs) -> dict[str, str] | None:
         session_name = f"{CORE_AUTOMATION_SESSION_ID_PREFIX}-{key}"
 
         # Assume / re-assume the role to get new credentials
-        log.debug("Assuming role [{}] session namae [{}]", role)
+        log.debug("Assuming role [{}] session namae [{}]", role, session_name)
 
-        client = session.client(
-            "sts",
-            config=Config(
-                connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
-            ),
-        )
+        client = session.client("sts", config=get_client_config())
 
         sts_response = client.assume_role(RoleArn=role, RoleSessionName=session_name)
         if (
@@ -213,13 +261,12 @@ def assume_role(**kwargs) -> dict[str, str] | None:
         ):
             credentials = sts_response["Credentials"]
             if isinstance(credentials, dict):
-                store.store_data(role, credentials, ttl=300)  # 5 minutes
                 return credentials
 
     except ClientError as e:
         log.error("Failed to assume role {}: {}", role, e)
 
-    return get_session_credentials()
+    return None
 
 
 def get_identity() -> dict[str, str] | None:
@@ -241,30 +288,70 @@ def get_identity() -> dict[str, str] | None:
 
 
 def get_client(service, **kwargs) -> Any:
+    """
+    Return a boto3 client for the service.  Clients are cached by service, region, profile, role and credentials
+    so repeated calls return the same client and reuse its HTTP connections.
+
+    When the assumed role credentials expire, the cached client is discarded and a new one is created.
 
+    Args:
+        service (str): The name of the AWS service (e.g. "s3", "cloudformation")
+        region (str, optional): The region of the client
+        role (str, optional): The role to assume for the client
+        read_timeout (float, optional): Override the default read timeout of 15 seconds
+
+    Returns:
+        Any: The boto3 client
+    """
     session = get_session(**kwargs)
 
     # you better have "role" paramter in kwargs!
     credentials = assume_role(**kwargs)
 
-    if credentials is None:
-        client = session.client(
-            service,
-            config=Config(
-                connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
-            ),
-        )
-    else:
-        client = session.client(
+    read_timeout = kwargs.get("read_timeout", None)
+
+    access_key = credentials["AccessKeyId"] if credentials else None
+    key = (
+        service,
+        session.region_name,
+        session.profile_name,
+        kwargs.get("role", None),
+        access_key,
+        read_timeout,
+    )
+
+    def create_client() -> Any:
+        config = get_client_config()
+        if read_timeout is not None:
+            from botocore.config import Config
+
+            config = config.merge(Config(read_timeout=read_timeout))
+        if credentials is None:
+            return session.client(service, config=config)
+        return session.client(
             service,
             aws_access_key_id=credentials["AccessKeyId"],
             aws_secret_access_key=credentials["SecretAccessKey"],
             aws_session_token=credentials["SessionToken"],
-            config=Config(
-                connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
-            ),
+            config=config,
         )
-    return client
+
+    return clients.get(key, create_client, get_credentials_expiration(credentials))
+
+
+def get_client_cache_stats() -> dict[str, int]:
+    """
+    Return the hit/miss/eviction counters of the client cache so the reuse rate can be confirmed.
+
+    Returns:
+        dict[str, int]: The client cache statistics
+    """
+    return clients.stats()
+
+
+def clear_client_cache() -> None:
+    """Discard all cached clients and reset the client cache statistics."""
+    clients.clear()
 
 
 def sts_client(**kwargs) -> Any:
@@ -334,21 +421,14 @@ def get_resource(service, **kwargs) -> Any:
     credentials = assume_role(**kwargs)
 
     if credentials is None:
-        resource = session.resource(
-            service,
-            config=Config(
-                connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
-            ),
-        )
+        resource = session.resource(service, config=get_client_config())
     else:
         resource = session.resource(
             service,
             aws_access_key_id=credentials["AccessKeyId"],
             aws_secret_access_key=credentials["SecretAccessKey"],
             aws_session_token=credentials["SessionToken"],
-            config=Config(
-                connect_timeout=15, read_timeout=15, retries=dict(max_attempts=10)
-            ),
+            config=get_client_config(),
         )
     return resource
 
@@ -366,11 +446,89 @@ def dynamodb_resource(**kwargs) -> Any:
 def invoke_lambda(
     arn: str, request_payload: dict[str, Any], **kwargs
 ) -> dict[str, Any]:
+    """
+    Invoke a Lambda function and return its response.
+
+    Args:
+        arn (str): The ARN of the Lambda function
+        request_payload (dict[str, Any]): The payload (event) to send to the function
+        region (str, optional): The region of the function.  Defaults to the region in the ARN.
+        role (str, optional): The role to assume to invoke the function
+        invocation_type (str, optional): "RequestResponse" (default), "Event" or "DryRun"
+
+    Returns:
+        dict[str, Any]: A dictionary with the TR_STATUS ("ok" or "error") and the TR_RESPONSE
+    """
+    invocation_type = kwargs.pop("invocation_type", INVOCATION_TYPE_REQUEST_RESPONSE)
 
     kwargs["region"] = kwargs.get("region", arn.split(":")[3])
 
     client = lambda_client(**kwargs)
 
+    return __invoke_lambda_client(client, arn, request_payload, invocation_type)
+
+
+def invoke_lambdas(
+    invocations: list[tuple[str, dict[str, Any]]],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    timeout: float | None = None,
+    **kwargs,
+) -> list[dict[str, Any]]:
+    """
+    Invoke many Lambda functions concurrently.
+
+    One client is used for each region.  At most max_in_flight invocations run at the same time.
+    The results are returned in the same order as the invocations.
+
+    .. code-block:: python
+
+        results = aws.invoke_lambdas(
+            [(compiler_arn, payload1), (compiler_arn, payload2)], max_in_flight=5
+        )
+        failed = [r for r in results if r[TR_STATUS] == "error"]
+
+    Args:
+        invocations (list[tuple[str, dict[str, Any]]]): A list of (arn, payload) pairs
+        max_in_flight (int, optional): The maximum number of concurrent invocations. Defaults to DEFAULT_MAX_IN_FLIGHT.
+        timeout (float | None, optional): The read timeout in seconds for each invocation. Defaults to None (15 seconds).
+        region (str, optional): The region of the functions.  Defaults to the region in each ARN.
+        role (str, optional): The role to assume to invoke the functions
+        invocation_type (str, optional): "RequestResponse" (default), "Event" (fire-and-forget) or "DryRun"
+
+    Returns:
+        list[dict[str, Any]]: A dictionary with the TR_STATUS and TR_RESPONSE for each invocation
+    """
+    if not invocations:
+        return []
+
+    invocation_type = kwargs.pop("invocation_type", INVOCATION_TYPE_REQUEST_RESPONSE)
+
+    if timeout is not None:
+        kwargs["read_timeout"] = timeout
+
+    # Get the clients in this thread so that credentials are resolved once per region
+    region_clients: dict[str, Any] = {}
+    targets: list[tuple[Any, str, dict[str, Any]]] = []
+    for arn, payload in invocations:
+        region = kwargs.get("region", arn.split(":")[3])
+        if region not in region_clients:
+            region_clients[region] = lambda_client(**{**kwargs, "region": region})
+        targets.append((region_clients[region], arn, payload))
+
+    workers = max(min(max_in_flight, len(targets)), 1)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invoke") as pool:
+        futures = [
+            pool.submit(__invoke_lambda_client, client, arn, payload, invocation_type)
+            for client, arn, payload in targets
+        ]
+        return [future.result() for future in futures]
+
+
+def __invoke_lambda_client(
+    client: Any, arn: str, request_payload: dict[str, Any], invocation_type: str
+) -> dict[str, Any]:
+
     log.trace(
         "Invoking Lambda", details={"FunctionName": arn, "Payload": request_payload}
     )
@@ -378,7 +536,9 @@ def invoke_lambda(
     try:
 
         request = json.dumps(request_payload)
-        response = client.invoke(FunctionName=arn, Payload=request)
+        response = client.invoke(
+            FunctionName=arn, Payload=request, InvocationType=invocation_type
+        )
 
     except Exception as e:
 
@@ -391,6 +551,7 @@ def invoke_lambda(
 
     status_code = int(response.get("StatusCode")) if "StatusCode" in response else 0
 
+    decoded_data = None
     if "Payload" in response:
         raw_data = response.get("Payload").read()
         decoded_data = raw_data.decode("utf-8")
@@ -423,11 +584,8 @@ def invoke_lambda(
     else:
         status = "ok"
 
-    log.debug(
-        "Invoked Lambda: status ({})",
-        status,
-        details={"FunctionName": arn, "Payload": response_payload},
-    )
+    # The response payload has already been traced above.  Don't log it again.
+    log.debug("Invoked Lambda {}: status ({})", arn, status)
 
     return {TR_STATUS: status, TR_RESPONSE: response_payload}
 
@@ -1,9 +1,129 @@
-from typing import Any
+from typing import Any, TYPE_CHECKING
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import heapq
+import itertools
 import time
 import threading
-import boto3
+
+if TYPE_CHECKING:
+    import boto3
 
 MAX_SESSION_TIME = 3600  # 1 hour
+MAX_CLIENTS = 64
+MAX_ENTRIES = 1024
+
+
+class ExpiringStorage:
+    """
+    Storage where every item has a time to live.  Used by the InsecureEnclave and SecureEnclave.
+
+    Deadlines are kept in a heap and expired items are purged lazily whenever the storage is accessed,
+    so no threads are created no matter how many items are stored.  Every store creates a new version of
+    the item, so the deadline of an overwritten value can never remove the new value early.
+
+    When the storage holds more than max_entries items, the least recently used item is evicted.
+
+    This class is not thread safe.  The owner must hold its own lock.
+
+    Args:
+        max_entries (int): The maximum number of items to hold.  Defaults to MAX_ENTRIES.
+
+    """
+
+    items: OrderedDict[str, tuple[int, float, Any]]
+    deadlines: list[tuple[float, int, str]]
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.items = OrderedDict()
+        self.deadlines = []
+        self.versions = itertools.count()
+
+    def set(self, key: str, data: Any, ttl: float) -> None:
+        """
+        Store the data with the key provided.  Replaces any existing value and its deadline.
+
+        Args:
+            key (str): The key to store the data
+            data (Any): The data to store
+            ttl (float): The time to live in seconds
+        """
+        self.purge_expired()
+
+        version = next(self.versions)
+        deadline = time.monotonic() + ttl
+
+        self.items[key] = (version, deadline, data)
+        self.items.move_to_end(key)
+        heapq.heappush(self.deadlines, (deadline, version, key))
+
+        while len(self.items) > self.max_entries:
+            self.items.popitem(last=False)
+
+        # Overwritten and evicted items leave stale deadlines behind.  Don't let them pile up.
+        if len(self.deadlines) > 2 * len(self.items) + 64:
+            self.deadlines = [(d, v, k) for k, (v, d, _) in self.items.items()]
+            heapq.heapify(self.deadlines)
+
+    def get(self, key: str) -> Any | None:
+        """
+        Return the data stored with the key provided or None if it doesn't exist or has expired.
+
+        Args:
+            key (str): The key of the data
+
+        Returns:
+            Any | None: The data or None
+        """
+        self.purge_expired()
+
+        item = self.items.get(key)
+        if item is None:
+            return None
+
+        self.items.move_to_end(key)
+        return item[2]
+
+    def delete(self, key: str) -> None:
+        """
+        Remove the data stored with the key provided.
+
+        Args:
+            key (str): The key of the data
+        """
+        self.items.pop(key, None)
+
+    def purge_expired(self) -> int:
+        """
+        Remove all items whose deadline has passed.
+
+        Returns:
+            int: The number of items removed
+        """
+        now = time.monotonic()
+        count = 0
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, version, key = heapq.heappop(self.deadlines)
+            item = self.items.get(key)
+            # Only remove the item if it's the same version that was scheduled
+            if item is not None and item[0] == version:
+                del self.items[key]
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        """Remove all items"""
+        self.items.clear()
+        self.deadlines.clear()
+
+    def __contains__(self, key: str) -> bool:
+        self.purge_expired()
+        return key in self.items
+
+    def __len__(self) -> int:
+        self.purge_expired()
+        return len(self.items)
 
 
 class InsecureEnclave:
@@ -14,16 +134,16 @@ class InsecureEnclave:
     Args:
         key: str: The key to encrypt and decrypt the data
         cipher_suite: Fernet: The cipher suite to encrypt and decrypt the data
-        storage: dict[str, dict[str, Any]]: The storage to store the data
+        storage: ExpiringStorage: The storage to store the data
         lock: threading.Lock: The lock to prevent
 
     """
 
-    storage: dict[str, Any]
+    storage: ExpiringStorage
     lock: threading.Lock
 
-    def __init__(self):
-        self.storage = {}
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.storage = ExpiringStorage(max_entries)
         self.lock = threading.Lock()
 
     def store(self, key: str, data: Any, ttl: int = MAX_SESSION_TIME) -> str:
@@ -39,11 +159,7 @@ class InsecureEnclave:
             str: The key to retrieve the data (the value of the key provided)
         """
         with self.lock:
-            self.storage[key] = data
-        purge_thread = threading.Thread(target=self._purge_expired, args=(key, ttl))
-        purge_thread.name = f"purge_expired_{key}"
-        purge_thread.daemon = True
-        purge_thread.start()
+            self.storage.set(key, data, ttl)
 
         return key
 
@@ -63,15 +179,28 @@ class InsecureEnclave:
             item = self.storage.get(key)
             return item
 
-    def _purge_expired(self, key: str, ttl: int):
-        """Automatically purge data fro the store after the ttl has expired"""
-        time.sleep(ttl)
+    def delete(self, key: str) -> None:
+        """
+        Remove the data from the storage with the key provided.
+
+        Args:
+            key: str: The key of the data to remove
+        """
+        with self.lock:
+            self.storage.delete(key)
+
+    def clear(self) -> None:
+        """Remove all data from the storage"""
         with self.lock:
-            if key in self.storage:
-                del self.storage[key]
+            self.storage.clear()
+
+    def purge_expired(self) -> int:
+        """Purge all data from the store whose ttl has expired"""
+        with self.lock:
+            return self.storage.purge_expired()
 
     def store_session(
-        self, key: str, session: boto3.Session, ttl: int = MAX_SESSION_TIME
+        self, key: str, session: "boto3.Session", ttl: int = MAX_SESSION_TIME
     ) -> str:
         """Store the boto3 session in the storage with the key provided
 
@@ -92,7 +221,7 @@ class InsecureEnclave:
 
         return key
 
-    def retrieve_session(self, key: str) -> boto3.Session | None:
+    def retrieve_session(self, key: str) -> "boto3.Session | None":
         """
         Retrieve the boto3 session from the storage with the key provided.
 
@@ -141,3 +270,120 @@ class InsecureEnclave:
         """
         serialized_data = self.retrieve(key)
         return serialized_data if serialized_data else None
+
+
+class ClientCache:
+    """
+    A keyed LRU cache of boto3 clients so that repeated helper calls reuse the same warm client
+    (and its HTTP keep-alive connection pool) instead of re-loading the service model every time.
+
+    Each entry may carry an expiry time.  When the credentials a client was built with expire, the entry
+    is dropped on the next lookup and a new client is created.
+
+    Args:
+        max_size (int): The maximum number of clients to hold before the least recently used is evicted.
+
+    Attributes:
+        hits (int): Number of lookups that returned a cached client
+        misses (int): Number of lookups that had to create a new client
+        evictions (int): Number of clients removed because the cache was full
+        expirations (int): Number of clients removed because their credentials expired
+
+    """
+
+    clients: OrderedDict[Hashable, tuple[Any, float | None]]
+    lock: threading.Lock
+
+    def __init__(self, max_size: int = MAX_CLIENTS):
+        self.max_size = max_size
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        expires_at: float | None = None,
+    ) -> Any:
+        """
+        Return the client stored with the key provided.  If there is no client, or the client has expired,
+        the factory is called to create one and the result is cached.
+
+        Args:
+            key (Hashable): The key of the client.  Typically (service, region, profile, role, access key)
+            factory (Callable[[], Any]): Function that creates the client on a cache miss
+            expires_at (float | None, optional): Epoch time when the new client's credentials expire. Defaults to None.
+
+        Returns:
+            Any: The cached or newly created client
+        """
+        with self.lock:
+            entry = self.clients.get(key)
+            if entry is not None:
+                client, client_expires_at = entry
+                if client_expires_at is None or time.time() < client_expires_at:
+                    self.clients.move_to_end(key)
+                    self.hits += 1
+                    return client
+                del self.clients[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Create the client outside of the lock.  Creating a client can be slow.
+        client = factory()
+
+        with self.lock:
+            self.clients[key] = (client, expires_at)
+            self.clients.move_to_end(key)
+            while len(self.clients) > self.max_size:
+                self.clients.popitem(last=False)
+                self.evictions += 1
+
+        return client
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] | None = None) -> int:
+        """
+        Remove clients from the cache.
+
+        Args:
+            predicate (Callable[[Hashable], bool] | None, optional): Remove only the keys for which this
+                returns True.  Defaults to None (remove everything).
+
+        Returns:
+            int: The number of clients removed
+        """
+        with self.lock:
+            keys = [k for k in self.clients if predicate is None or predicate(k)]
+            for k in keys:
+                del self.clients[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all clients and reset the statistics"""
+        with self.lock:
+            self.clients.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the cache statistics so the reuse rate can be monitored.
+
+        Returns:
+            dict[str, int]: size, max_size, hits, misses, evictions and expirations
+        """
+        with self.lock:
+            return {
+                "size": len(self.clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,226 @@
+""" Refresh-ahead credential management for assumed roles so deployment steps never wait on STS """
+
+from collections.abc import Callable
+from datetime import datetime
+import os
+import threading
+import time
+
+from core_framework.constants import ENV_CREDENTIAL_REFRESH_MARGIN
+
+import core_logging as log
+
+from .cache import InsecureEnclave
+
+DEFAULT_REFRESH_MARGIN = 300  # 5 minutes
+DEFAULT_EXPIRY_MARGIN = 30  # 30 seconds
+DEFAULT_CREDENTIALS_TTL = 300  # 5 minutes.  Used if STS did not return an Expiration
+REFRESH_WAIT_TIMEOUT = 60
+DEFAULT_RETRY_INTERVAL = 15  # Seconds between background refreshes after one failed
+
+
+def get_credentials_expiration(credentials: dict | None) -> float | None:
+    """
+    Return the epoch time when the credentials expire.  STS returns the "Expiration" field as a datetime
+    when a role is assumed.  Session credentials do not have an expiration.
+
+    Args:
+        credentials (dict | None): The credentials returned by assume_role()
+
+    Returns:
+        float | None: The expiration time in seconds since the epoch or None if the credentials do not expire
+    """
+    if not credentials:
+        return None
+
+    expiration = credentials.get("Expiration")
+
+    if isinstance(expiration, str):
+        try:
+            expiration = datetime.fromisoformat(expiration)
+        except ValueError:
+            return None
+
+    if isinstance(expiration, datetime):
+        return expiration.timestamp()
+
+    return None
+
+
+def get_refresh_margin() -> float:
+    """
+    Return the number of seconds before expiry that credentials are refreshed in the background.
+    This is specified in the environment variable CREDENTIAL_REFRESH_MARGIN.
+
+    Returns:
+        float: The refresh margin in seconds.  Defaults to 300
+    """
+    try:
+        return float(
+            os.getenv(ENV_CREDENTIAL_REFRESH_MARGIN, str(DEFAULT_REFRESH_MARGIN))
+        )
+    except ValueError:
+        return DEFAULT_REFRESH_MARGIN
+
+
+class CredentialManager:
+    """
+    Keeps the credentials of assumed roles fresh.
+
+    Credentials are stored in the enclave until they expire.  The Expiration returned by STS is used to decide
+    when to refresh them:
+
+    * Before the refresh margin, the cached credentials are returned.
+    * Inside the refresh margin, the cached credentials are returned and a refresh is started in the background.
+    * Inside the expiry margin (or if there are no credentials), the caller waits for new credentials.
+
+    Only one refresh per role is ever in flight.  Other threads asking for the same role wait for that
+    refresh instead of calling STS themselves.  After a background refresh fails the next one is started
+    retry_interval seconds later, so a failing STS is not called on every request.
+
+    Args:
+        store (InsecureEnclave): The enclave where the credentials are stored
+        refresh_margin (float | None, optional): Seconds before expiry to refresh in the background.
+            Defaults to the CREDENTIAL_REFRESH_MARGIN environment variable.
+        expiry_margin (float, optional): Seconds before expiry after which credentials are no longer served.
+            Defaults to DEFAULT_EXPIRY_MARGIN.
+        retry_interval (float, optional): Seconds to wait before refreshing again after a refresh failed.
+            Defaults to DEFAULT_RETRY_INTERVAL.
+
+    """
+
+    store: InsecureEnclave
+    expirations: dict[str, tuple[float, float]]
+    inflight: dict[str, threading.Event]
+    lock: threading.Lock
+
+    def __init__(
+        self,
+        store: InsecureEnclave,
+        refresh_margin: float | None = None,
+        expiry_margin: float = DEFAULT_EXPIRY_MARGIN,
+        retry_interval: float = DEFAULT_RETRY_INTERVAL,
+    ):
+        self.store = store
+        self.refresh_margin = (
+            get_refresh_margin() if refresh_margin is None else refresh_margin
+        )
+        self.expiry_margin = expiry_margin
+        self.retry_interval = retry_interval
+        self.expirations = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def get(self, role: str, fetch: Callable[[], dict | None]) -> dict | None:
+        """
+        Return the credentials for the role.  The fetch function is called to assume the role when the
+        credentials must be refreshed.
+
+        Args:
+            role (str): The role ARN
+            fetch (Callable[[], dict | None]): Function that calls STS and returns the "Credentials" or None
+
+        Returns:
+            dict | None: The credentials or None if the role could not be assumed
+        """
+        credentials = self.store.retrieve_data(role)
+
+        if credentials:
+            now = time.time()
+            with self.lock:
+                refresh_at, expires_at = self.expirations.get(role, (0, 0))
+
+            if now < expires_at - self.expiry_margin:
+                if now >= refresh_at:
+                    self.refresh(role, fetch, background=True)
+                return credentials
+
+        return self.refresh(role, fetch)
+
+    def refresh(
+        self, role: str, fetch: Callable[[], dict | None], background: bool = False
+    ) -> dict | None:
+        """
+        Refresh the credentials for the role.  If a refresh is already in flight, wait for it
+        (or, in the background, do nothing).
+
+        Args:
+            role (str): The role ARN
+            fetch (Callable[[], dict | None]): Function that calls STS and returns the "Credentials" or None
+            background (bool, optional): Refresh in a background thread and return immediately. Defaults to False.
+
+        Returns:
+            dict | None: The new credentials.  None if refreshing in the background or the refresh failed.
+        """
+        with self.lock:
+            event = self.inflight.get(role)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self.inflight[role] = event
+
+        if not leader:
+            if background:
+                return None
+            event.wait(REFRESH_WAIT_TIMEOUT)
+            return self.store.retrieve_data(role)
+
+        if background:
+            thread = threading.Thread(
+                target=self._fetch, args=(role, fetch, event), daemon=True
+            )
+            thread.name = f"refresh_credentials_{role}"
+            thread.start()
+            return None
+
+        return self._fetch(role, fetch, event)
+
+    def invalidate(self, role: str) -> None:
+        """
+        Forget the credentials for the role so the next call assumes the role again.
+
+        Args:
+            role (str): The role ARN
+        """
+        with self.lock:
+            self.expirations.pop(role, None)
+        self.store.delete(role)
+
+    def _fetch(
+        self, role: str, fetch: Callable[[], dict | None], event: threading.Event
+    ) -> dict | None:
+        try:
+            credentials = fetch()
+            if credentials:
+                now = time.time()
+                expires_at = get_credentials_expiration(credentials)
+                if expires_at is None:
+                    expires_at = now + DEFAULT_CREDENTIALS_TTL
+                # Short lived credentials are refreshed half way through their life
+                lifetime = max(expires_at - now, 0)
+                refresh_at = expires_at - min(self.refresh_margin, lifetime / 2)
+                with self.lock:
+                    self.expirations[role] = (refresh_at, expires_at)
+                self.store.store_data(role, credentials, ttl=max(expires_at - now, 0))
+            else:
+                self._retry_later(role)
+            return credentials
+        except Exception as e:
+            log.error("Failed to refresh credentials for role {}: {}", role, e)
+            self._retry_later(role)
+            return None
+        finally:
+            with self.lock:
+                self.inflight.pop(role, None)
+            event.set()
+
+    def _retry_later(self, role: str) -> None:
+        # Keep serving the current credentials and try again after the retry interval (but no later than the
+        # expiry margin, where callers wait for a refresh anyway)
+        with self.lock:
+            if role in self.expirations:
+                refresh_at, expires_at = self.expirations[role]
+                retry_at = min(
+                    time.time() + self.retry_interval, expires_at - self.expiry_margin
+                )
+                self.expirations[role] = (max(refresh_at, retry_at), expires_at)
@@ -1,12 +1,15 @@
-from typing import Any
-import time
+from typing import TYPE_CHECKING
 import threading
 from cryptography.fernet import Fernet
-import boto3
 import pickle
 
 import core_framework as util
 
+from .cache import ExpiringStorage, MAX_ENTRIES
+
+if TYPE_CHECKING:
+    import boto3
+
 MAX_SESSION_TIME = 3600  # 1 hour
 
 
@@ -18,20 +21,20 @@ class SecureEnclave:
     Args:
         key: str: The key to encrypt and decrypt the data
         cipher_suite: Fernet: The cipher suite to encrypt and decrypt the data
-        storage: dict[str, dict[str, Any]]: The storage to store the data
+        storage: ExpiringStorage: The storage to store the data
         lock: threading.Lock: The lock to prevent
 
     """
 
     key: str
     cipher_suite: Fernet
-    storage: dict[str, Any]
+    storage: ExpiringStorage
     lock: threading.Lock
 
-    def __init__(self):
+    def __init__(self, max_entries: int = MAX_ENTRIES):
         self.key = Fernet.generate_key()
         self.cipher_suite = Fernet(self.key)
-        self.storage = {}
+        self.storage = ExpiringStorage(max_entries)
         self.lock = threading.Lock()
 
     def store(self, key: str, data: bytes, ttl: int = MAX_SESSION_TIME) -> str:
@@ -48,8 +51,7 @@ class SecureEnclave:
         """
         encrypted_data = self.cipher_suite.encrypt(data)
         with self.lock:
-            self.storage[key] = encrypted_data
-        threading.Thread(target=self._purge_expired, args=(key, ttl)).start()
+            self.storage.set(key, encrypted_data, ttl)
 
         return key
 
@@ -69,15 +71,28 @@ class SecureEnclave:
             item = self.storage.get(key)
             return self.cipher_suite.decrypt(item) if item else None
 
-    def _purge_expired(self, key: str, ttl: int):
-        """Automatically purge data fro the store after the ttl has expired"""
-        time.sleep(ttl)
+    def delete(self, key: str) -> None:
+        """
+        Remove the data from the storage with the key provided.
+
+        Args:
+            key: str: The key of the data to remove
+        """
         with self.lock:
-            if key in self.storage:
-                del self.storage[key]
+            self.storage.delete(key)
+
+    def clear(self) -> None:
+        """Remove all data from the storage"""
+        with self.lock:
+            self.storage.clear()
+
+    def purge_expired(self) -> int:
+        """Purge all data from the store whose ttl has expired"""
+        with self.lock:
+            return self.storage.purge_expired()
 
     def store_session(
-        self, key: str, session: boto3.Session, ttl: int = MAX_SESSION_TIME
+        self, key: str, session: "boto3.Session", ttl: int = MAX_SESSION_TIME
     ) -> str:
         """Store the boto3 session in the storage with the key provided
 
@@ -113,13 +128,15 @@ class SecureEnclave:
 
         return key
 
-    def __create_session(self, data: dict) -> boto3.Session:
+    def __create_session(self, data: dict) -> "boto3.Session":
         """Create a boto3 session from the data provided
 
         Args:
             data: dict: The data to create the boto3 session. Creditentials and region, etc.
 
         """
+        import boto3
+
         region_name = data.get("region_name", util.get_region())
         profile_name = data.get("profile_name", util.get_aws_profile())
 
@@ -147,7 +164,7 @@ class SecureEnclave:
             aws_session_token=token,
         )
 
-    def retrieve_session(self, key: str) -> boto3.Session | None:
+    def retrieve_session(self, key: str) -> "boto3.Session | None":
         """
         Retrieve the boto3 session from the storage with the key provided.
 
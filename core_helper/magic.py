@@ -1,14 +1,28 @@
 """ Magic module for emulating the boto3 S3 client and Buckets so we can elect to store files locally instead of in S3 """
 
 from typing import Any, Self, IO
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 import os
+import stat
+import sys
+import mmap
 import shutil
+import sqlite3
+import tempfile
+import threading
 import mimetypes
 import hashlib
-from datetime import datetime
+import base64
+import bisect
+import json
+import uuid
+from datetime import datetime, timezone
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from core_framework.constants import ENV_ETAG_SIDECAR, V_FALSE, V_TRUE
 from core_framework.common import (
     get_storage_volume,
     get_bucket_name,
@@ -16,12 +30,661 @@ from core_framework.common import (
     is_use_s3,
 )
 
+import core_logging as log
+
 import core_helper.aws as aws
 
+# Size of the buffer used when a stream has to be copied through user space
+BUFFER_SIZE = 1024 * 1024  # 1 MiB
+
+# Copy between files in the kernel.  Like shutil, only on Linux: elsewhere sendfile() needs a socket.
+KERNEL_COPY = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+ETAG_ALGORITHM = "sha256"
+ETAG_INDEX_FILE = ".etag_index.db"
+# The database and the files SQLite keeps next to it
+ETAG_INDEX_FILES = (
+    ETAG_INDEX_FILE,
+    ETAG_INDEX_FILE + "-wal",
+    ETAG_INDEX_FILE + "-shm",
+    ETAG_INDEX_FILE + "-journal",
+)
+MAX_ETAGS = 4096
+
+# Multipart uploads are staged in this folder of the storage volume.  It is not a bucket.
+MULTIPART_DIR = ".multipart"
+MULTIPART_UPLOAD_FILE = "upload.json"
+MAX_PARTS = 10000
+MAX_KEYS = 1000
+
+
+def __fileno(stream: Any) -> int | None:
+    """Return the file descriptor of a stream that is backed by a regular file or None"""
+    try:
+        fd = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    try:
+        return fd if stat.S_ISREG(os.fstat(fd).st_mode) else None
+    except OSError:
+        return None
+
+
+def __copy_fd(source_fd: int, target_fd: int) -> int | None:
+    """
+    Copy from the current position of source_fd to the end of the file in the kernel.  Returns None if the
+    kernel can't copy between these files (nothing was copied).
+    """
+    copied = 0
+    remaining = os.fstat(source_fd).st_size - os.lseek(source_fd, 0, os.SEEK_CUR)
+    copy_file_range = getattr(os, "copy_file_range", None)
+    while remaining > 0:
+        count = min(remaining, 1 << 30)
+        try:
+            if copy_file_range is not None:
+                n = copy_file_range(source_fd, target_fd, count)
+            else:
+                n = os.sendfile(target_fd, source_fd, None, count)
+        except OSError:
+            if copied:
+                raise
+            if copy_file_range is None:
+                return None
+            # copy_file_range is not supported between these filesystems.  Fall back to sendfile
+            copy_file_range = None
+            continue
+        if n == 0:
+            break
+        copied += n
+        remaining -= n
+    return copied
+
+
+def copy_stream(source: Any, target: Any, digest: Any = None) -> int:
+    """
+    Copy everything from the current position of the source stream to the target stream.
+
+    When both streams are regular files the data is copied by the kernel with copy_file_range() or sendfile()
+    and never enters user space (on Linux).  Otherwise it is copied in BUFFER_SIZE chunks.
+
+    Args:
+        source (Any): A readable binary stream
+        target (Any): A writable binary stream
+        digest (Any, optional): A hashlib object that is updated with the data.  The data has to pass
+            through user space so the kernel copy is not used.  Defaults to None.
+
+    Returns:
+        int: The number of bytes copied
+    """
+    source_fd = __fileno(source)
+    target_fd = __fileno(target)
+
+    if (
+        KERNEL_COPY
+        and digest is None
+        and source_fd is not None
+        and target_fd is not None
+    ):
+        # Line the file descriptors up with the positions of the (buffered) python streams
+        target.flush()
+        os.lseek(source_fd, source.tell(), os.SEEK_SET)
+        os.lseek(target_fd, target.tell(), os.SEEK_SET)
+        try:
+            kernel_copied = __copy_fd(source_fd, target_fd)
+        finally:
+            source.seek(os.lseek(source_fd, 0, os.SEEK_CUR))
+            target.seek(os.lseek(target_fd, 0, os.SEEK_CUR))
+        if kernel_copied is not None:
+            return kernel_copied
+
+    copied = 0
+    while True:
+        chunk = source.read(BUFFER_SIZE)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if digest is not None:
+            digest.update(chunk)
+        target.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+# The umask of the process.  Read once: reading it means changing it, which is not thread safe.
+__umask = os.umask(0o022)
+os.umask(__umask)
+
+
+@contextmanager
+def atomic_write(fn: str) -> Iterator[IO[bytes]]:
+    """
+    Open a temporary file next to fn for writing.  When the block completes the temporary file is
+    renamed to fn, so readers either see the old object or the complete new one and never a partial write.
+    If the block raises, the temporary file is removed and fn is not touched.
+
+    The file gets the mode of the file it replaces, or the mode open() would give a new file (0o666 without
+    the umask).
+
+    .. code-block:: python
+
+        with atomic_write(fn) as f:
+            copy_stream(body, f)
+
+    Args:
+        fn (str): The file to write
+
+    Returns:
+        Iterator[IO[bytes]]: The temporary file opened for binary writing
+    """
+    dirname = os.path.dirname(fn)
+    os.makedirs(dirname, exist_ok=True)
+
+    fd, temp_fn = tempfile.mkstemp(
+        dir=dirname, prefix=f".{os.path.basename(fn)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb", buffering=BUFFER_SIZE) as f:
+            yield f
+            # mkstemp() creates the file with 0o600
+            if hasattr(os, "fchmod"):
+                try:
+                    mode = stat.S_IMODE(os.stat(fn).st_mode)
+                except FileNotFoundError:
+                    mode = 0o666 & ~__umask
+                os.fchmod(fd, mode)
+        os.replace(temp_fn, fn)
+    except BaseException:
+        try:
+            os.unlink(temp_fn)
+        except OSError:
+            pass
+        raise
+
+
+def file_hash(fn: str, hash_algorithm: str = ETAG_ALGORITHM) -> str:
+    """
+    Hash the contents of a file with large reads.
+
+    Args:
+        fn (str): The path to the file
+        hash_algorithm (str, optional): The hash algorithm. Defaults to "sha256".
+
+    Returns:
+        str: The hexadecimal hash of the file
+    """
+    with open(fn, "rb", buffering=0) as f:
+        return hashlib.file_digest(f, hash_algorithm).hexdigest()
+
+
+class ETagIndex:
+    """
+    Remembers the ETag (hash) of the files in a storage volume so that unchanged files are not hashed again.
+
+    An ETag is valid as long as the size, modification time (in nanoseconds) and inode of the file are unchanged.
+    Objects are always written to a new file and renamed (see atomic_write), so a rewritten object always has a
+    new inode.
+
+    The index is kept in memory.  With the sidecar enabled it is also kept in a SQLite database at the root of
+    the storage volume so that it survives restarts.
+
+    Args:
+        data_path (str): The storage volume
+        sidecar (bool | None, optional): Keep the index in a database in the storage volume.
+            Defaults to the ETAG_SIDECAR environment variable.
+        max_entries (int, optional): The maximum number of ETags kept in memory. Defaults to MAX_ETAGS.
+
+    """
+
+    data_path: str
+    entries: OrderedDict[tuple[str, str], tuple[tuple[int, int, int], str]]
+    lock: threading.Lock
+    db: sqlite3.Connection | None
+
+    def __init__(
+        self, data_path: str, sidecar: bool | None = None, max_entries: int = MAX_ETAGS
+    ):
+        self.data_path = data_path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+
+        if sidecar is None:
+            sidecar = os.getenv(ENV_ETAG_SIDECAR, V_FALSE).lower() == V_TRUE
+        if sidecar:
+            self.db = self._open_sidecar()
+
+    @staticmethod
+    def signature(st: os.stat_result) -> tuple[int, int, int]:
+        """The part of the file status that must be unchanged for an ETag to be valid"""
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def get(
+        self,
+        fn: str,
+        hash_algorithm: str = ETAG_ALGORITHM,
+        st: os.stat_result | None = None,
+    ) -> str:
+        """
+        Return the ETag of the file.  The file is only hashed if it changed since it was last seen.
+
+        Args:
+            fn (str): The path to the file
+            hash_algorithm (str, optional): The hash algorithm. Defaults to "sha256".
+            st (os.stat_result | None, optional): The status of the file if the caller already has it.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+
+        Returns:
+            str: The hexadecimal hash of the file
+        """
+        if st is None:
+            st = os.stat(fn)
+        signature = self.signature(st)
+        key = (os.path.relpath(fn, self.data_path), hash_algorithm)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                entry = self._load(key)
+            if entry is not None and entry[0] == signature:
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        etag = file_hash(fn, hash_algorithm)
+
+        # Don't remember the hash if the file was modified while it was being hashed
+        if self.signature(os.stat(fn)) == signature:
+            self._store(key, signature, etag)
+
+        return etag
+
+    def record(
+        self,
+        fn: str,
+        etag: str,
+        hash_algorithm: str = ETAG_ALGORITHM,
+        st: os.stat_result | None = None,
+    ) -> None:
+        """
+        Remember the ETag of a file that was just written.  Use this when the hash was computed while writing.
+
+        Args:
+            fn (str): The path to the file
+            etag (str): The hexadecimal hash of the file
+            hash_algorithm (str, optional): The hash algorithm. Defaults to "sha256".
+            st (os.stat_result | None, optional): The status of the file if the caller already has it.
+        """
+        if st is None:
+            st = os.stat(fn)
+        key = (os.path.relpath(fn, self.data_path), hash_algorithm)
+        self._store(key, self.signature(st), etag)
+
+    def invalidate(self, fn: str) -> None:
+        """
+        Forget the ETags of the file.
+
+        Args:
+            fn (str): The path to the file
+        """
+        path = os.path.relpath(fn, self.data_path)
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == path]:
+                del self.entries[key]
+            if self.db is not None:
+                self._execute("DELETE FROM etags WHERE path = ?", (path,))
+
+    def clear(self) -> None:
+        """Forget all ETags and reset the statistics"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self.db is not None:
+                self._execute("DELETE FROM etags")
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the hit/miss counters.  A miss means the file was hashed.
+
+        Returns:
+            dict[str, int]: The size, hits and misses of the index
+        """
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+    def _store(
+        self, key: tuple[str, str], signature: tuple[int, int, int], etag: str
+    ) -> None:
+        with self.lock:
+            self.entries[key] = (signature, etag)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            if self.db is not None:
+                self._execute(
+                    "INSERT OR REPLACE INTO etags VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, *signature, etag),
+                )
+
+    def _load(self, key: tuple[str, str]) -> tuple[tuple[int, int, int], str] | None:
+        try:
+            row = self.db.execute(
+                "SELECT size, mtime_ns, inode, etag FROM etags WHERE path = ? AND algorithm = ?",
+                key,
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warn("Failed to read the ETag index: {}", e)
+            return None
+        if row is None:
+            return None
+        return (tuple(row[:3]), row[3])
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> None:
+        try:
+            self.db.execute(sql, parameters)
+            self.db.commit()
+        except sqlite3.Error as e:
+            log.warn("Failed to update the ETag index: {}", e)
+
+    def _open_sidecar(self) -> sqlite3.Connection | None:
+        try:
+            os.makedirs(self.data_path, exist_ok=True)
+            db = sqlite3.connect(
+                os.path.join(self.data_path, ETAG_INDEX_FILE), check_same_thread=False
+            )
+            # The index is only a cache.  Don't wait for the disk.
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS etags (path TEXT, algorithm TEXT, size INTEGER, "
+                "mtime_ns INTEGER, inode INTEGER, etag TEXT, PRIMARY KEY (path, algorithm))"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            log.warn("Failed to open the ETag index in {}: {}", self.data_path, e)
+            return None
+
+
+__etag_indexes: dict[tuple[str, bool | None], ETagIndex] = {}
+__etag_lock = threading.Lock()
+
+
+def get_etag_index(data_path: str, sidecar: bool | None = None) -> ETagIndex:
+    """
+    Return the ETag index of the storage volume.
+
+    Args:
+        data_path (str): The storage volume (or any directory)
+        sidecar (bool | None, optional): Keep the index in a database in the directory.  False for a directory
+            that must not get extra files (e.g. a build directory that is synced).  Defaults to the
+            ETAG_SIDECAR environment variable.
+
+    Returns:
+        ETagIndex: The (shared) ETag index
+    """
+    key = (os.path.abspath(data_path), sidecar)
+    with __etag_lock:
+        index = __etag_indexes.get(key)
+        if index is None:
+            index = ETagIndex(key[0], sidecar)
+            __etag_indexes[key] = index
+        return index
+
+
+def clear_etag_indexes() -> None:
+    """Forget the ETag indexes of all storage volumes.  The sidecar databases are not modified."""
+    with __etag_lock:
+        for index in __etag_indexes.values():
+            if index.db is not None:
+                index.db.close()
+        __etag_indexes.clear()
+
+
+class KeyIndex:
+    """
+    A sorted list of the keys in a bucket on the local filesystem so that list_objects_v2() can page through
+    the keys with a binary search instead of walking the directory tree for every page.
+
+    The index is rebuilt when a directory in the bucket was modified (added, removed or renamed entries
+    change the modification time of the directory) or when it is invalidated after a write.
+
+    Args:
+        root (str): The directory of the bucket
+
+    """
+
+    root: str
+    keys: list[str]
+    directories: dict[str, int]
+    lock: threading.Lock
+
+    def __init__(self, root: str):
+        self.root = root
+        self.keys = []
+        self.directories = {}
+        self.valid = False
+        self.lock = threading.Lock()
+
+    def get_keys(self) -> list[str]:
+        """
+        Return the sorted keys of the bucket.
+
+        Returns:
+            list[str]: The keys.  Do not modify the list.
+        """
+        with self.lock:
+            if not self.valid or self._modified():
+                self._scan()
+            return self.keys
+
+    def invalidate(self) -> None:
+        """Rebuild the index on the next call to get_keys()"""
+        with self.lock:
+            self.valid = False
+
+    def _modified(self) -> bool:
+        for directory, mtime_ns in self.directories.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _scan(self) -> None:
+        keys: list[str] = []
+        directories: dict[str, int] = {}
+
+        stack = [(self.root, "")]
+        while stack:
+            directory, prefix = stack.pop()
+            try:
+                directories[directory] = os.stat(directory).st_mtime_ns
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, prefix + entry.name + "/"))
+                        elif not is_temporary_file(entry.name):
+                            keys.append(prefix + entry.name)
+            except FileNotFoundError:
+                continue
+
+        keys.sort()
+        self.keys = keys
+        self.directories = directories
+        self.valid = True
+
+
+__key_indexes: dict[str, KeyIndex] = {}
+__key_lock = threading.Lock()
+
+
+def get_key_index(bucket_path: str) -> KeyIndex:
+    """
+    Return the key index of the bucket.
+
+    Args:
+        bucket_path (str): The directory of the bucket
+
+    Returns:
+        KeyIndex: The (shared) key index
+    """
+    bucket_path = os.path.abspath(bucket_path)
+    with __key_lock:
+        index = __key_indexes.get(bucket_path)
+        if index is None:
+            index = KeyIndex(bucket_path)
+            __key_indexes[bucket_path] = index
+        return index
+
+
+def is_temporary_file(name: str) -> bool:
+    """True if the file is a temporary file created by atomic_write()"""
+    return name.startswith(".") and name.endswith(".tmp")
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Return the smallest string that is greater than every string starting with the prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def parse_range(range_header: str, size: int) -> tuple[int, int]:
+    """
+    Parse a HTTP Range header ("bytes=0-99", "bytes=100-" or "bytes=-100").
+
+    Args:
+        range_header (str): The Range header
+        size (int): The size of the object
+
+    Raises:
+        ValueError: If the range is not valid or cannot be satisfied.  The message starts with "InvalidRange:",
+            the S3 error code.
+
+    Returns:
+        tuple[int, int]: The first and last (inclusive) byte of the range
+    """
+    unit, _, spec = range_header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip() != "bytes" or not sep or "," in spec:
+        raise ValueError("InvalidRange: Invalid Range '{}'".format(range_header))
+
+    try:
+        if first == "":
+            # The last N bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError("InvalidRange: Invalid Range '{}'".format(range_header))
+
+    if start > end or start >= size:
+        raise ValueError(
+            "InvalidRange: The requested range '{}' is not satisfiable".format(
+                range_header
+            )
+        )
+
+    return start, end
+
+
+class MagicStreamingBody:
+    """
+    Emulates the botocore StreamingBody returned by get_object().  The object is read from the file as the
+    body is read and is never loaded into memory all at once.
+
+    Args:
+        fileobj (IO[bytes]): The open file positioned at the start of the range
+        length (int): The number of bytes that can be read
+
+    """
+
+    def __init__(self, fileobj: IO[bytes], length: int):
+        self._fileobj = fileobj
+        self._remaining = length
+
+    def read(self, amt: int | None = None) -> bytes:
+        """Read at most amt bytes.  Read everything that is left if amt is None"""
+        if self._remaining <= 0:
+            return b""
+        if amt is None or amt < 0 or amt > self._remaining:
+            amt = self._remaining
+        data = self._fileobj.read(amt)
+        self._remaining -= len(data)
+        return data
+
+    def iter_chunks(self, chunk_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+        """Return the body in chunks of chunk_size bytes"""
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_chunks()
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._fileobj.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class MagicPaginator:
+    """
+    Emulates the boto3 paginator for list_objects_v2.
+
+    .. code-block:: python
+
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix="files/"):
+            for item in page.get("Contents", []):
+                print(item["Key"])
+
+    Args:
+        method (Callable[..., dict]): The list method that is called for each page
+
+    """
+
+    def __init__(self, method: Callable[..., dict]):
+        self.method = method
+
+    def paginate(self, **kwargs) -> Iterator[dict]:
+        """Return the pages until the listing is no longer truncated"""
+        kwargs = dict(kwargs)
+        pagination = kwargs.pop("PaginationConfig", {}) or {}
+        if "PageSize" in pagination:
+            kwargs["MaxKeys"] = pagination["PageSize"]
+        if "StartingToken" in pagination:
+            kwargs["ContinuationToken"] = pagination["StartingToken"]
+
+        while True:
+            page = self.method(**kwargs)
+            yield page
+            if "Error" in page or not page.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
 
 class MagicObject(BaseModel):
     """
-    MagicObject class to emulate an S3 Object.  Currently only emulates the "copy_from" method.
+    MagicObject class to emulate an S3 Object.
 
     The purpose is to copy objects from the local filesystem instead of S3 using s3 api.
 
@@ -46,10 +709,15 @@ class MagicObject(BaseModel):
 
             fn = os.path.join(self.data_path, self.bucket_name, self.key)
 
-            if os.path.exists(fn):
+            try:
+                st = os.stat(fn)
+            except FileNotFoundError:
+                st = None
+
+            if st is not None:
                 # get the timestamp of the file
-                self.version_id = str(int(os.stat(fn).st_mtime))
-                self.etag = self.generate_file_hash(fn)
+                self.version_id = str(int(st.st_mtime))
+                self.etag = get_etag_index(self.data_path).get(fn, st=st)
             else:
                 self.version_id = None
                 self.etag = None
@@ -72,13 +740,7 @@ class MagicObject(BaseModel):
         Returns:
             str: The hexadecimal hash of the file.
         """
-        hash_func = hashlib.new(hash_algorithm)
-
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_func.update(chunk)
-
-        return hash_func.hexdigest()
+        return file_hash(file_path, hash_algorithm)
 
     def copy_from(self, **kwargs) -> dict:  # noqa: C901
         """Copies the artefact on the local filessystem instead of S3
@@ -117,8 +779,21 @@ class MagicObject(BaseModel):
             target_fn = os.path.join(self.data_path, self.bucket_name, self.key)
 
             if source_key and self.key:
-                os.makedirs(os.path.dirname(target_fn), exist_ok=True)
-                shutil.copy(source_fn, target_fn)
+                index = get_etag_index(self.data_path)
+                source_st = os.stat(source_fn)
+                etag = index.get(source_fn, st=source_st)
+
+                with open(source_fn, "rb") as source_file, atomic_write(
+                    target_fn
+                ) as target_file:
+                    copy_stream(source_file, target_file)
+                shutil.copymode(source_fn, target_fn)
+
+                # The copy has the same ETag as the source unless the source changed during the copy
+                if index.signature(os.stat(source_fn)) == index.signature(source_st):
+                    index.record(target_fn, etag)
+
+                self._modified(target_fn)
             else:
                 raise ValueError("Source and destination keys are required")
 
@@ -166,9 +841,10 @@ class MagicObject(BaseModel):
 
             # extra_args = kwargs.get("ExtraArgs")
             if os.path.exists(key):
-                with open(key, "rb") as file:
-                    fileobj.write(file.read())
-                fileobj.seek(0)
+                with open(key, "rb", buffering=BUFFER_SIZE) as file:
+                    copy_stream(file, fileobj)
+                if fileobj.seekable():
+                    fileobj.seek(0)
 
             self.head_object()
 
@@ -187,28 +863,13 @@ class MagicObject(BaseModel):
 
             body = kwargs.get("Body")
 
-            if not body:
+            if body is None:
                 raise ValueError("Body is required")
 
             fn = os.path.join(self.data_path, self.bucket_name, self.key)
 
-            # get the directory of the file fn
-            dirname = os.path.dirname(fn)
-            os.makedirs(dirname, exist_ok=True)
-            if isinstance(body, IO):
-                with open(fn, "wb") as file:
-                    while True:
-                        chunk = body.read(1024)
-                        if not chunk:
-                            break
-                        file.write(chunk)
-            elif isinstance(body, str):
-                body = body.encode("utf-8")
-                with open(fn, "wb") as file:
-                    file.write(body)
-            elif isinstance(body, bytes):
-                with open(fn, "wb") as file:
-                    file.write(body)
+            self._write(fn, body)
+            self._modified(fn)
 
             self.head_object()
 
@@ -217,6 +878,411 @@ class MagicObject(BaseModel):
 
         return self
 
+    def get_object(self, **kwargs) -> dict:
+        """
+        Emulate the S3 get_object() API method.  The Body is streamed from the file.
+
+        .. code-block:: python
+
+            response = bucket.Object("files/package.zip").get_object(Range="bytes=0-1023")
+            with response["Body"] as body:
+                header = body.read()
+
+        Args:
+            Key (str): The key of the object
+            Range (str, optional): Only return this range of bytes, e.g. "bytes=0-1023"
+            IfMatch (str, optional): Only return the object if its ETag matches
+
+        Returns:
+            dict: A dictionary emulating what S3 would return for a get_object() call.  "Error" is set if the
+                object could not be read.
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            if not self.key:
+                raise ValueError("Key is required")
+
+            fn = os.path.join(self.data_path, self.bucket_name, self.key)
+
+            file = open(fn, "rb", buffering=BUFFER_SIZE)
+            try:
+                st = os.fstat(file.fileno())
+                size = st.st_size
+
+                range_header = kwargs.get("Range")
+                if range_header:
+                    start, end = parse_range(range_header, size)
+                    rv["ContentRange"] = f"bytes {start}-{end}/{size}"
+                else:
+                    start, end = 0, size - 1
+                file.seek(start)
+            except Exception:
+                file.close()
+                raise
+
+            self.head_object()
+
+            if_match = kwargs.get("IfMatch")
+            if if_match and if_match.strip('"') != self.etag:
+                file.close()
+                raise ValueError(
+                    "PreconditionFailed: The ETag of '{}' does not match '{}'".format(
+                        self.key, if_match
+                    )
+                )
+
+            length = end - start + 1
+            rv.update(
+                {
+                    "Body": MagicStreamingBody(file, length),
+                    "ContentLength": length,
+                    "AcceptRanges": "bytes",
+                    "LastModified": datetime.fromtimestamp(st.st_mtime, timezone.utc),
+                    "ETag": self.etag,
+                    "VersionId": self.version_id,
+                }
+            )
+            if self.content_type:
+                rv["ContentType"] = self.content_type
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def delete_object(self, **kwargs) -> dict:
+        """
+        Emulate the S3 delete_object() API method.  Deleting an object that does not exist is not an error.
+
+        Args:
+            Key (str): The key of the object
+
+        Returns:
+            dict: A dictionary emulating what S3 would return for a delete_object() call
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            if not self.key:
+                raise ValueError("Key is required")
+
+            fn = os.path.join(self.data_path, self.bucket_name, self.key)
+
+            try:
+                os.unlink(fn)
+            except FileNotFoundError:
+                pass
+
+            # S3 has no directories.  Remove the empty ones so they don't show up in the listings.
+            bucket_path = os.path.join(self.data_path, self.bucket_name)
+            dirname = os.path.dirname(fn)
+            while os.path.abspath(dirname) != os.path.abspath(bucket_path):
+                try:
+                    os.rmdir(dirname)
+                except OSError:
+                    break
+                dirname = os.path.dirname(dirname)
+
+            get_etag_index(self.data_path).invalidate(fn)
+            self._modified(fn)
+
+            self.version_id = None
+            self.etag = None
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def create_multipart_upload(self, **kwargs) -> dict:
+        """
+        Emulate the S3 create_multipart_upload() API method.
+
+        The parts are stored in the MULTIPART_DIR folder of the storage volume until the upload is completed.
+
+        Args:
+            Key (str): The key of the object
+
+        Returns:
+            dict: The Bucket, Key and UploadId
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            if not self.key:
+                raise ValueError("Key is required")
+
+            upload_id = uuid.uuid4().hex
+            upload_dir = self._upload_dir(upload_id)
+            os.makedirs(upload_dir)
+            with open(os.path.join(upload_dir, MULTIPART_UPLOAD_FILE), "w") as f:
+                json.dump({"Bucket": self.bucket_name, "Key": self.key}, f)
+
+            rv = {"Bucket": self.bucket_name, "Key": self.key, "UploadId": upload_id}
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def upload_part(self, **kwargs) -> dict:
+        """
+        Emulate the S3 upload_part() API method.  Uploading a part number again replaces the part.
+
+        Args:
+            Key (str): The key of the object
+            UploadId (str): The UploadId returned by create_multipart_upload()
+            PartNumber (int): The part number (1 to 10000)
+            Body (str | bytes | IO): The data of the part
+            ChecksumSHA256 (str, optional): The base64 encoded SHA256 of the part.  The part is rejected if it
+                does not match.
+
+        Returns:
+            dict: The ETag and ChecksumSHA256 of the part
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            upload_dir = self._check_upload(kwargs.get("UploadId"))
+
+            part_number = int(kwargs.get("PartNumber", 0))
+            if part_number < 1 or part_number > MAX_PARTS:
+                raise ValueError(
+                    "PartNumber must be between 1 and {}".format(MAX_PARTS)
+                )
+
+            body = kwargs.get("Body")
+            if body is None:
+                raise ValueError("Body is required")
+
+            part_fn = os.path.join(upload_dir, str(part_number))
+            etag = self._write(part_fn, body)
+            checksum = base64.b64encode(bytes.fromhex(etag)).decode()
+
+            # Like S3, reject the part if it doesn't match the checksum sent by the client
+            expected = kwargs.get("ChecksumSHA256")
+            if expected and expected != checksum:
+                os.unlink(part_fn)
+                raise ValueError(
+                    "BadDigest: The SHA256 checksum of part {} does not match".format(
+                        part_number
+                    )
+                )
+
+            rv = {"ETag": etag, "ChecksumSHA256": checksum}
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def complete_multipart_upload(self, **kwargs) -> dict:
+        """
+        Emulate the S3 complete_multipart_upload() API method.
+
+        The parts are concatenated in the kernel (copy_file_range) without being read again.  Like S3,
+        the ETag of the object is the hash of the part hashes followed by the number of parts.
+
+        Args:
+            Key (str): The key of the object
+            UploadId (str): The UploadId returned by create_multipart_upload()
+            MultipartUpload (dict): {"Parts": [{"ETag": "...", "PartNumber": 1}, ...]}
+
+        Returns:
+            dict: The Bucket, Key and ETag of the object
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            upload_id = kwargs.get("UploadId")
+            upload_dir = self._check_upload(upload_id)
+
+            parts = kwargs.get("MultipartUpload", {}).get("Parts", [])
+            if not parts:
+                raise ValueError("MultipartUpload Parts are required")
+
+            index = get_etag_index(self.data_path)
+            digest = hashlib.new(ETAG_ALGORITHM)
+            part_fns = []
+            previous = 0
+            for part in parts:
+                part_number = int(part.get("PartNumber", 0))
+                if part_number <= previous:
+                    raise ValueError("Parts must be in ascending order of PartNumber")
+                previous = part_number
+
+                part_fn = os.path.join(upload_dir, str(part_number))
+                if not os.path.exists(part_fn):
+                    raise ValueError(
+                        "Part {} has not been uploaded".format(part_number)
+                    )
+
+                etag = index.get(part_fn)
+                if part.get("ETag", etag).strip('"') != etag:
+                    raise ValueError(
+                        "The ETag of part {} does not match".format(part_number)
+                    )
+
+                digest.update(bytes.fromhex(etag))
+                part_fns.append(part_fn)
+
+            fn = os.path.join(self.data_path, self.bucket_name, self.key)
+            with atomic_write(fn) as target:
+                for part_fn in part_fns:
+                    with open(part_fn, "rb") as source:
+                        copy_stream(source, target)
+
+            etag = "{}-{}".format(digest.hexdigest(), len(part_fns))
+            index.record(fn, etag)
+            self._modified(fn)
+
+            self._remove_upload(upload_id)
+
+            self.head_object()
+
+            rv = {"Bucket": self.bucket_name, "Key": self.key, "ETag": self.etag}
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def abort_multipart_upload(self, **kwargs) -> dict:
+        """
+        Emulate the S3 abort_multipart_upload() API method.  The uploaded parts are deleted.
+
+        Args:
+            Key (str): The key of the object
+            UploadId (str): The UploadId returned by create_multipart_upload()
+
+        Returns:
+            dict: An empty dictionary.  "Error" is set if the upload does not exist.
+        """
+        rv: dict[str, Any] = {}
+        try:
+            self.key = kwargs.get("Key", self.key)
+            upload_id = kwargs.get("UploadId")
+            self._check_upload(upload_id)
+            self._remove_upload(upload_id)
+
+        except Exception as e:
+            self.error = "\n".join([self.error or "", str(e)])
+
+        if self.error:
+            rv["Error"] = self.error
+
+        return rv
+
+    def _write(self, fn: str, body: Any) -> str:
+        """Write the body to the file and return its ETag"""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        # Hash the body while it is written so head_object() doesn't have to read it again
+        digest = hashlib.new(ETAG_ALGORITHM)
+
+        # Write to a temporary file and rename it so readers never see a partial object
+        with atomic_write(fn) as file:
+            if isinstance(body, (bytes, bytearray, memoryview)):
+                digest.update(body)
+                file.write(body)
+            elif hasattr(body, "read"):
+                copy_stream(body, file, digest)
+            else:
+                raise ValueError(
+                    "Body must be str, bytes or a file-like object, not {}".format(
+                        type(body).__name__
+                    )
+                )
+
+        etag = digest.hexdigest()
+        get_etag_index(self.data_path).record(fn, etag)
+        return etag
+
+    def _modified(self, fn: str) -> None:
+        """Let the key index know that the bucket has changed"""
+        get_key_index(os.path.join(self.data_path, self.bucket_name)).invalidate()
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.data_path, MULTIPART_DIR, upload_id)
+
+    def _check_upload(self, upload_id: str | None) -> str:
+        """Return the folder of the upload.  Raise a ValueError if it's not an upload of this object"""
+        if not upload_id or not upload_id.isalnum():
+            raise ValueError("UploadId is required")
+
+        upload_dir = self._upload_dir(upload_id)
+        try:
+            with open(os.path.join(upload_dir, MULTIPART_UPLOAD_FILE), "r") as f:
+                upload = json.load(f)
+        except FileNotFoundError:
+            raise ValueError("The upload '{}' does not exist".format(upload_id))
+
+        if upload.get("Bucket") != self.bucket_name or upload.get("Key") != self.key:
+            raise ValueError(
+                "The upload '{}' is not for {}/{}".format(
+                    upload_id, self.bucket_name, self.key
+                )
+            )
+        return upload_dir
+
+    def _remove_upload(self, upload_id: str) -> None:
+        upload_dir = self._upload_dir(upload_id)
+        index = get_etag_index(self.data_path)
+        for name in os.listdir(upload_dir):
+            index.invalidate(os.path.join(upload_dir, name))
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    @contextmanager
+    def open_mmap(self, **kwargs) -> Iterator[mmap.mmap | bytes]:
+        """
+        Memory map the object for random access without reading it into memory.
+
+        .. code-block:: python
+
+            with bucket.Object("files/package.zip").open_mmap() as data:
+                header = data[:4]
+
+        Args:
+            Key (str): The key of the object
+
+        Raises:
+            ValueError: If the Key is missing
+            FileNotFoundError: If the object does not exist
+
+        Returns:
+            Iterator[mmap.mmap | bytes]: A read-only memory map of the object (empty bytes for an empty object)
+        """
+        self.key = kwargs.get("Key", self.key)
+        if not self.key:
+            raise ValueError("Key is required")
+
+        fn = os.path.join(self.data_path, self.bucket_name, self.key)
+
+        with open(fn, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # An empty file cannot be mapped
+                yield b""
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
 
 class MagicBucket(BaseModel):
     """
@@ -263,6 +1329,190 @@ class MagicBucket(BaseModel):
 
         return object.put_object(**kwargs)
 
+    def get_object(self, **kwargs) -> dict:
+        """Emulate the S3 get_object() API method.  See MagicObject.get_object()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).get_object(**kwargs)
+
+    def delete_object(self, **kwargs) -> dict:
+        """Emulate the S3 delete_object() API method.  See MagicObject.delete_object()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).delete_object(**kwargs)
+
+    def delete_objects(self, **kwargs) -> dict:
+        """
+        Emulate the S3 delete_objects() API method to delete a batch of objects.
+
+        Args:
+            Delete (dict): {"Objects": [{"Key": "..."}, ...], "Quiet": False}
+
+        Returns:
+            dict: The "Deleted" keys (unless Quiet) and the "Errors"
+        """
+        delete = kwargs.get("Delete", {})
+        quiet = delete.get("Quiet", False)
+
+        deleted = []
+        errors = []
+        for item in delete.get("Objects", []):
+            key = item.get("Key")
+            result = self.Object(key).delete_object()
+            if "Error" in result:
+                errors.append(
+                    {"Key": key, "Code": "InternalError", "Message": result["Error"]}
+                )
+            elif not quiet:
+                deleted.append({"Key": key})
+
+        rv: dict[str, Any] = {}
+        if deleted:
+            rv["Deleted"] = deleted
+        if errors:
+            rv["Errors"] = errors
+        return rv
+
+    def list_objects_v2(self, **kwargs) -> dict:  # noqa: C901
+        """
+        Emulate the S3 list_objects_v2() API method.
+
+        The keys come from a KeyIndex so each page is found with a binary search.  Only the objects on the
+        page are read from the filesystem.
+
+        Args:
+            Prefix (str, optional): Only list keys that start with the prefix
+            Delimiter (str, optional): Group the keys that contain the delimiter after the prefix in CommonPrefixes
+            MaxKeys (int, optional): The maximum number of keys and common prefixes returned. Defaults to 1000.
+            ContinuationToken (str, optional): The NextContinuationToken of the previous page
+            StartAfter (str, optional): Only list keys after this key
+
+        Returns:
+            dict: A dictionary emulating what S3 would return for a list_objects_v2() call
+        """
+        prefix = kwargs.get("Prefix", "")
+        delimiter = kwargs.get("Delimiter", "")
+        max_keys = int(kwargs.get("MaxKeys", MAX_KEYS))
+        token = kwargs.get("ContinuationToken")
+        start_after = kwargs.get("StartAfter", "")
+
+        rv: dict[str, Any] = {
+            "Name": self.name,
+            "Prefix": prefix,
+            "MaxKeys": max_keys,
+        }
+        if delimiter:
+            rv["Delimiter"] = delimiter
+        if token:
+            rv["ContinuationToken"] = token
+        if start_after:
+            rv["StartAfter"] = start_after
+
+        try:
+            data_path = self.data_path or get_storage_volume()
+            bucket_path = os.path.join(data_path, self.name)
+            keys = get_key_index(bucket_path).get_keys()
+
+            start = start_after
+            if token:
+                start = base64.urlsafe_b64decode(token.encode()).decode()
+
+            i = bisect.bisect_left(keys, prefix)
+            if start:
+                i = max(i, bisect.bisect_right(keys, start))
+                # Continue after the common prefix that ended the previous page
+                if delimiter and start.endswith(delimiter) and start.startswith(prefix):
+                    i = max(i, bisect.bisect_left(keys, prefix_upper_bound(start)))
+
+            contents = []
+            common_prefixes = []
+            last = None
+            truncated = False
+            while i < len(keys) and keys[i].startswith(prefix):
+                if len(contents) + len(common_prefixes) >= max_keys:
+                    truncated = True
+                    break
+
+                key = keys[i]
+                if delimiter:
+                    pos = key.find(delimiter, len(prefix))
+                    if pos >= 0:
+                        common_prefix = key[: pos + len(delimiter)]
+                        common_prefixes.append({"Prefix": common_prefix})
+                        last = common_prefix
+                        i = bisect.bisect_left(
+                            keys, prefix_upper_bound(common_prefix), i
+                        )
+                        continue
+
+                i += 1
+                fn = os.path.join(bucket_path, key)
+                try:
+                    st = os.stat(fn)
+                except FileNotFoundError:
+                    continue
+
+                contents.append(
+                    {
+                        "Key": key,
+                        "LastModified": datetime.fromtimestamp(
+                            st.st_mtime, timezone.utc
+                        ),
+                        "ETag": get_etag_index(data_path).get(fn, st=st),
+                        "Size": st.st_size,
+                        "StorageClass": "STANDARD",
+                    }
+                )
+                last = key
+
+            if contents:
+                rv["Contents"] = contents
+            if common_prefixes:
+                rv["CommonPrefixes"] = common_prefixes
+            rv["KeyCount"] = len(contents) + len(common_prefixes)
+            rv["IsTruncated"] = truncated
+            if truncated and last is not None:
+                rv["NextContinuationToken"] = base64.urlsafe_b64encode(
+                    last.encode()
+                ).decode()
+
+        except Exception as e:
+            rv["KeyCount"] = 0
+            rv["IsTruncated"] = False
+            rv["Error"] = str(e)
+
+        return rv
+
+    def create_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 create_multipart_upload() API method.  See MagicObject.create_multipart_upload()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).create_multipart_upload(**kwargs)
+
+    def upload_part(self, **kwargs) -> dict:
+        """Emulate the S3 upload_part() API method.  See MagicObject.upload_part()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).upload_part(**kwargs)
+
+    def complete_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 complete_multipart_upload() API method.  See MagicObject.complete_multipart_upload()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).complete_multipart_upload(**kwargs)
+
+    def abort_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 abort_multipart_upload() API method.  See MagicObject.abort_multipart_upload()"""
+
+        key = kwargs.pop("Key", None)
+
+        return self.Object(key).abort_multipart_upload(**kwargs)
+
     def Object(self, key: str | None) -> MagicObject:
         """
         Emulate the S3 Object() API method to return a MagicObject instead of an S3 Object
@@ -281,7 +1531,8 @@ class MagicBucket(BaseModel):
 
 class MagicS3Client(BaseModel):
     """
-    MagicS3Client class to emulate an S3 client.  Currently only emulates the "download_fileobj" and "put_object" methods.
+    MagicS3Client class to emulate an S3 client.  Emulates the object (get, put, head, delete, download_fileobj),
+    listing (list_objects_v2) and multipart upload methods.
 
     The purpose is to read and write objects to the local filesystem instead of S3 using s3 api.
     """
@@ -340,6 +1591,90 @@ class MagicS3Client(BaseModel):
 
         return bucket.put_object(**kwargs)
 
+    def get_object(self, **kwargs) -> dict:
+        """
+        Emulate the S3 get_object() API method.  The Body is streamed from the file.
+
+        Args:
+            Bucket (str): The name of the bucket
+            Key (str): The key of the object
+            Range (str, optional): Only return this range of bytes, e.g. "bytes=0-1023"
+
+        Returns:
+            dict: A dictionary emulating what S3 would return for a get_object() call
+        """
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).get_object(**kwargs)
+
+    def delete_object(self, **kwargs) -> dict:
+        """Emulate the S3 delete_object() API method.  See MagicObject.delete_object()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).delete_object(**kwargs)
+
+    def delete_objects(self, **kwargs) -> dict:
+        """Emulate the S3 delete_objects() API method.  See MagicBucket.delete_objects()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).delete_objects(**kwargs)
+
+    def list_objects_v2(self, **kwargs) -> dict:
+        """Emulate the S3 list_objects_v2() API method.  See MagicBucket.list_objects_v2()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).list_objects_v2(**kwargs)
+
+    def create_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 create_multipart_upload() API method.  See MagicObject.create_multipart_upload()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).create_multipart_upload(**kwargs)
+
+    def upload_part(self, **kwargs) -> dict:
+        """Emulate the S3 upload_part() API method.  See MagicObject.upload_part()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).upload_part(**kwargs)
+
+    def complete_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 complete_multipart_upload() API method.  See MagicObject.complete_multipart_upload()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).complete_multipart_upload(**kwargs)
+
+    def abort_multipart_upload(self, **kwargs) -> dict:
+        """Emulate the S3 abort_multipart_upload() API method.  See MagicObject.abort_multipart_upload()"""
+
+        bucket_name = kwargs.pop("Bucket", None)
+
+        return self.Bucket(bucket_name).abort_multipart_upload(**kwargs)
+
+    def get_paginator(self, operation_name: str) -> "MagicPaginator":
+        """
+        Emulate the S3 get_paginator() API method.  Only "list_objects_v2" can be paginated.
+
+        Args:
+            operation_name (str): The name of the operation
+
+        Raises:
+            ValueError: If the operation cannot be paginated
+
+        Returns:
+            MagicPaginator: A paginator that behaves like the boto3 paginator
+        """
+        if operation_name != "list_objects_v2":
+            raise ValueError(
+                "Operation '{}' cannot be paginated".format(operation_name)
+            )
+        return MagicPaginator(self.list_objects_v2)
+
     def Bucket(self, bucket_name: str) -> MagicBucket:
         """
         Emulate the S3 Bucket() API method to return a MagicBucket instead of an S3 Bucket
@@ -392,3 +1727,22 @@ class MagicS3Client(BaseModel):
             client = MagicS3Client(Region=Region, DataPath=DataPath)
 
         return client
+
+    @staticmethod
+    def get_transfer_manager(Region: str, DataPath: str | None = None, **kwargs) -> Any:
+        """
+        Get a TransferManager for parallel multipart uploads and downloads.  Uses the S3 client or the
+        MagicS3Client returned by get_client().
+
+        Args:
+            Region (str): The region of the bucket
+            DataPath (str): The path to the bucket
+            part_size (int, optional): The size of the parts
+            max_concurrency (int, optional): The number of parts transferred at the same time
+
+        Returns:
+            TransferManager: A TransferManager (see core_helper.transfer)
+        """
+        from .transfer import TransferManager
+
+        return TransferManager(MagicS3Client.get_client(Region, DataPath), **kwargs)
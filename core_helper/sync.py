@@ -0,0 +1,326 @@
+""" Directory sync for the files, packages and artefacts of a deployment
+
+Like ``aws s3 sync``, only the files that are new or changed are uploaded.  The local files are compared
+with a listing of the remote prefix by size and ETag, so redeploying a mostly unchanged build only moves the
+changed files.  Works with S3 and with the local Magic S3 emulation.
+
+.. code-block:: python
+
+    from core_helper.sync import sync_deployment
+
+    summary = sync_deployment(deployment_details, OBJ_FILES, "/tmp/build/files", delete=True)
+    log.info("Uploaded {} files, {} unchanged", len(summary["Uploaded"]), summary["Unchanged"])
+
+"""
+
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import mimetypes
+import os
+
+import core_framework as util
+from core_framework.constants import OBJ_ARTEFACTS
+
+import core_logging as log
+
+from .magic import (
+    MagicS3Client,
+    ETAG_INDEX_FILES,
+    get_etag_index,
+    is_temporary_file,
+)
+from .transfer import TransferManager, get_max_concurrency, MAX_PARTS
+
+MAX_DELETE_KEYS = 1000  # The maximum number of keys in a delete_objects() request
+
+
+def get_local_manifest(source_dir: str) -> dict[str, os.stat_result]:
+    """
+    Return the files below the directory.  Symbolic links are followed, except the ones to a directory
+    that contains them (a loop).
+
+    Args:
+        source_dir (str): The directory
+
+    Returns:
+        dict[str, os.stat_result]: The status of each file by its relative path (with / separators)
+    """
+    manifest: dict[str, os.stat_result] = {}
+
+    st = os.stat(source_dir)
+    stack = [(source_dir, "", frozenset([(st.st_dev, st.st_ino)]))]
+    while stack:
+        directory, prefix, parents = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.is_symlink():
+                        st = entry.stat()
+                        if (st.st_dev, st.st_ino) in parents:
+                            log.warning(
+                                "Skipping the symbolic link loop {}", entry.path
+                            )
+                            continue
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                    stack.append(
+                        (
+                            entry.path,
+                            prefix + entry.name + "/",
+                            parents | {(st.st_dev, st.st_ino)},
+                        )
+                    )
+                elif entry.name not in ETAG_INDEX_FILES and not is_temporary_file(
+                    entry.name
+                ):
+                    manifest[prefix + entry.name] = entry.stat()
+
+    return manifest
+
+
+def __key_prefix(prefix: str) -> str:
+    """The prefix of the keys below the prefix (without the trailing /), "" for the top of the bucket"""
+    return prefix + "/" if prefix else ""
+
+
+def get_remote_manifest(client: Any, bucket: str, prefix: str) -> dict[str, dict]:
+    """
+    Return the objects below the prefix.
+
+    Args:
+        client (Any): A boto3 S3 client or a MagicS3Client
+        bucket (str): The name of the bucket
+        prefix (str): The prefix of the objects (without the trailing /), "" for the whole bucket
+
+    Returns:
+        dict[str, dict]: The listing (Key, Size, ETag...) of each object by its key relative to the prefix
+    """
+    manifest: dict[str, dict] = {}
+
+    key_prefix = __key_prefix(prefix)
+
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=key_prefix):
+        if "Error" in page:
+            raise ValueError(
+                "Failed to list {}/{}: {}".format(bucket, prefix, page["Error"])
+            )
+        for item in page.get("Contents", []):
+            manifest[item["Key"][len(key_prefix) :]] = item
+
+    return manifest
+
+
+def get_local_etag(
+    source_dir: str, name: str, remote_etag: str, part_size: int
+) -> str | None:
+    """
+    Calculate the ETag of the local file in the same format as the remote ETag so they can be compared.
+
+    S3 ETags are the MD5 of the object (or of the MD5s of the parts followed by "-<parts>" for multipart
+    uploads).  The Magic emulation uses SHA256 in the same way.
+
+    Args:
+        source_dir (str): The directory being synced
+        name (str): The path of the file relative to the directory
+        remote_etag (str): The ETag of the remote object
+        part_size (int): The part size used for multipart uploads
+
+    Returns:
+        str | None: The ETag or None if the format of the remote ETag is not known (e.g. SSE-KMS objects)
+    """
+    fn = os.path.join(source_dir, name)
+    etag, _, parts = remote_etag.strip('"').partition("-")
+
+    if len(etag) == 64:
+        algorithm = "sha256"
+    elif len(etag) == 32:
+        algorithm = "md5"
+    else:
+        return None
+
+    if not parts:
+        # Unchanged files are not hashed again on the next sync.  Only in memory: a sidecar database would
+        # be synced with the files.
+        return get_etag_index(source_dir, sidecar=False).get(fn, algorithm)
+
+    size = os.stat(fn).st_size
+    if size > part_size * MAX_PARTS:
+        part_size = -(-size // MAX_PARTS)
+    if not parts.isdigit() or -(-size // part_size) != int(parts):
+        # Uploaded with a different part size
+        return None
+
+    digest = hashlib.new(algorithm)
+    with open(fn, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(part_size)
+            if not chunk:
+                break
+            digest.update(hashlib.new(algorithm, chunk).digest())
+
+    return "{}-{}".format(digest.hexdigest(), parts)
+
+
+def sync_directory(  # noqa: C901
+    client: Any,
+    source_dir: str,
+    bucket: str,
+    prefix: str,
+    delete: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int | None = None,
+    transfer: TransferManager | None = None,
+) -> dict[str, Any]:
+    """
+    Upload the files of the directory that are not in the bucket or have changed.
+
+    Args:
+        client (Any): A boto3 S3 client or a MagicS3Client
+        source_dir (str): The directory to upload
+        bucket (str): The name of the bucket
+        prefix (str): The prefix of the objects (e.g. from DeploymentDetails.get_object_key)
+        delete (bool, optional): Delete the objects that are not in the directory. Defaults to False.
+        dry_run (bool, optional): Only report what would change. Defaults to False.
+        max_concurrency (int | None, optional): The number of files uploaded at the same time.
+            Defaults to the TRANSFER_MAX_CONCURRENCY environment variable.
+        transfer (TransferManager | None, optional): The TransferManager used to upload the files.
+            Defaults to a TransferManager for the client.
+
+    Returns:
+        dict[str, Any]: A summary with the Bucket, Prefix, the Uploaded and Deleted keys, the number of
+            Unchanged objects, the number of BytesUploaded and the Errors
+    """
+    prefix = prefix.strip("/")
+    key_prefix = __key_prefix(prefix)
+    transfer = transfer or TransferManager(client)
+    max_concurrency = max_concurrency or get_max_concurrency()
+
+    local = get_local_manifest(source_dir)
+    remote = get_remote_manifest(client, bucket, prefix)
+
+    changed: list[str] = []
+    unchanged = 0
+    for name, st in sorted(local.items()):
+        item = remote.get(name)
+        if item is None or item.get("Size") != st.st_size:
+            changed.append(name)
+            continue
+        remote_etag = item.get("ETag", "")
+        local_etag = get_local_etag(source_dir, name, remote_etag, transfer.part_size)
+        if local_etag != remote_etag.strip('"'):
+            changed.append(name)
+        else:
+            unchanged += 1
+
+    stale = sorted(name for name in remote if name not in local) if delete else []
+
+    summary: dict[str, Any] = {
+        "Bucket": bucket,
+        "Prefix": prefix,
+        "Uploaded": [key_prefix + name for name in changed],
+        "Deleted": [key_prefix + name for name in stale],
+        "Unchanged": unchanged,
+        "BytesUploaded": sum(local[name].st_size for name in changed),
+        "Errors": [],
+        "DryRun": dry_run,
+    }
+
+    if dry_run:
+        return summary
+
+    def upload(name: str) -> None:
+        key = key_prefix + name
+        content_type, _ = mimetypes.guess_type(name)
+        extra_args = {"ContentType": content_type} if content_type else None
+        transfer.upload_file(os.path.join(source_dir, name), bucket, key, extra_args)
+
+    failed: set[str] = set()
+    with ThreadPoolExecutor(
+        max_workers=max(min(max_concurrency, len(changed)), 1),
+        thread_name_prefix="sync",
+    ) as pool:
+        futures = {name: pool.submit(upload, name) for name in changed}
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log.error("Failed to upload {}: {}", name, e)
+                failed.add(key_prefix + name)
+                summary["Errors"].append({"Key": key_prefix + name, "Error": str(e)})
+
+    for i in range(0, len(stale), MAX_DELETE_KEYS):
+        batch = [{"Key": key_prefix + name} for name in stale[i : i + MAX_DELETE_KEYS]]
+        response = client.delete_objects(
+            Bucket=bucket, Delete={"Objects": batch, "Quiet": True}
+        )
+        for error in response.get("Errors", []):
+            failed.add(error["Key"])
+            summary["Errors"].append(
+                {"Key": error["Key"], "Error": error.get("Message", "")}
+            )
+
+    summary["Uploaded"] = [key for key in summary["Uploaded"] if key not in failed]
+    summary["Deleted"] = [key for key in summary["Deleted"] if key not in failed]
+    summary["BytesUploaded"] = sum(
+        local[key[len(key_prefix) :]].st_size for key in summary["Uploaded"]
+    )
+
+    log.debug(
+        "Synced {} to {}/{}",
+        source_dir,
+        bucket,
+        prefix,
+        details={k: v for k, v in summary.items() if k not in ["Bucket", "Prefix"]},
+    )
+
+    return summary
+
+
+def sync_deployment(
+    deployment_details: Any,
+    object_type: str,
+    source_dir: str,
+    name: str | None = None,
+    scope: str | None = None,
+    bucket: str | None = None,
+    region: str | None = None,
+    data_path: str | None = None,
+    **kwargs,
+) -> dict[str, Any]:
+    """
+    Sync a directory to the files, packages or artefacts folder of the deployment.
+
+    The prefix is DeploymentDetails.get_object_key(object_type, name, scope).  Uses S3 or the local storage
+    volume depending on the USE_S3 environment variable.
+
+    Args:
+        deployment_details (DeploymentDetails): The deployment details
+        object_type (str): OBJ_FILES, OBJ_PACKAGES or OBJ_ARTEFACTS
+        source_dir (str): The directory to upload
+        name (str | None, optional): The name of a sub folder of the object type. Defaults to None.
+        scope (str | None, optional): Override the scope of the deployment details. Defaults to None.
+        bucket (str | None, optional): The bucket.  Defaults to the artefact bucket for artefacts or the
+            core automation bucket.
+        region (str | None, optional): The region of the bucket.  Defaults to the region of the bucket.
+        data_path (str | None, optional): The storage volume in local mode. Defaults to None.
+        delete (bool, optional): Delete the objects that are not in the directory. Defaults to False.
+        dry_run (bool, optional): Only report what would change. Defaults to False.
+        max_concurrency (int, optional): The number of files uploaded at the same time.
+
+    Returns:
+        dict[str, Any]: The summary returned by sync_directory()
+    """
+    prefix = deployment_details.get_object_key(object_type, name, scope, s3=True)
+
+    if object_type == OBJ_ARTEFACTS:
+        bucket = bucket or util.get_artefact_bucket_name()
+        region = region or util.get_artefact_bucket_region()
+    else:
+        bucket = bucket or util.get_bucket_name()
+        region = region or util.get_bucket_region()
+
+    client = MagicS3Client.get_client(region, data_path)
+
+    return sync_directory(client, source_dir, bucket, prefix, **kwargs)
@@ -0,0 +1,504 @@
+""" Parallel multipart transfers for S3 and the local Magic S3 emulation
+
+The TransferManager works with a boto3 S3 client or a MagicS3Client, so the same code uploads and downloads
+packages and artefacts in both modes.  Get one with :meth:`core_helper.magic.MagicS3Client.get_transfer_manager`.
+
+.. code-block:: python
+
+    transfer = MagicS3Client.get_transfer_manager(Region=region)
+    transfer.upload_file("package.zip", bucket_name, package_key)
+    transfer.download_file(bucket_name, package_key, "/tmp/package.zip")
+
+Objects larger than the part size are uploaded as multipart uploads and downloaded with ranged GETs.
+The parts are transferred concurrently.  Every uploaded part carries a SHA256 checksum that is verified by
+the server.  Downloaded parts are requested with the ETag of the first part (If-Match) so all parts come
+from the same version of the object.
+
+"""
+
+from typing import Any, IO
+from concurrent.futures import Future, ThreadPoolExecutor
+import base64
+import hashlib
+import os
+import stat
+
+from core_framework.constants import (
+    ENV_TRANSFER_PART_SIZE,
+    ENV_TRANSFER_MAX_CONCURRENCY,
+)
+
+import core_logging as log
+
+from .magic import atomic_write, BUFFER_SIZE
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # 5 MiB. The S3 minimum for all parts but the last one
+DEFAULT_PART_SIZE = 8 * 1024 * 1024  # 8 MiB
+DEFAULT_MAX_CONCURRENCY = 8
+MAX_PARTS = 10000
+
+# The S3 error for a Range that is not valid or can't be satisfied (e.g. any range of an empty object)
+INVALID_RANGE = "InvalidRange"
+
+
+class TransferError(Exception):
+    """Raised when a transfer fails"""
+
+
+def get_part_size() -> int:
+    """
+    Return the part size for multipart transfers.  This is specified in the environment variable TRANSFER_PART_SIZE.
+
+    Returns:
+        int: The part size in bytes.  Defaults to 8 MiB.  Never smaller than 5 MiB
+    """
+    try:
+        part_size = int(os.getenv(ENV_TRANSFER_PART_SIZE, str(DEFAULT_PART_SIZE)))
+    except ValueError:
+        part_size = DEFAULT_PART_SIZE
+    return max(part_size, MIN_PART_SIZE)
+
+
+def get_max_concurrency() -> int:
+    """
+    Return the number of parts transferred at the same time.  This is specified in the environment
+    variable TRANSFER_MAX_CONCURRENCY.
+
+    Returns:
+        int: The maximum concurrency.  Defaults to 8
+    """
+    try:
+        return max(
+            int(os.getenv(ENV_TRANSFER_MAX_CONCURRENCY, str(DEFAULT_MAX_CONCURRENCY))),
+            1,
+        )
+    except ValueError:
+        return DEFAULT_MAX_CONCURRENCY
+
+
+def sha256_checksum(data: bytes) -> str:
+    """Return the base64 encoded SHA256 checksum of the data as used in the S3 ChecksumSHA256 fields"""
+    return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class TransferManager:
+    """
+    Uploads and downloads objects in parallel parts.
+
+    Args:
+        client (Any): A boto3 S3 client or a MagicS3Client
+        part_size (int | None, optional): The size of the parts.  Never smaller than MIN_PART_SIZE.
+            Defaults to the TRANSFER_PART_SIZE environment variable.
+        max_concurrency (int | None, optional): The number of parts transferred at the same time.
+            Defaults to the TRANSFER_MAX_CONCURRENCY environment variable.
+
+    """
+
+    client: Any
+    part_size: int
+    max_concurrency: int
+
+    def __init__(
+        self,
+        client: Any,
+        part_size: int | None = None,
+        max_concurrency: int | None = None,
+    ):
+        self.client = client
+        self.part_size = (
+            get_part_size() if part_size is None else max(part_size, MIN_PART_SIZE)
+        )
+        self.max_concurrency = (
+            get_max_concurrency()
+            if max_concurrency is None
+            else max(max_concurrency, 1)
+        )
+
+    def upload_file(
+        self, filename: str, bucket: str, key: str, extra_args: dict | None = None
+    ) -> dict:
+        """
+        Upload a file.
+
+        Args:
+            filename (str): The file to upload
+            bucket (str): The name of the bucket
+            key (str): The key of the object
+            extra_args (dict | None, optional): Extra arguments for put_object/create_multipart_upload
+                such as ContentType. Defaults to None.
+
+        Returns:
+            dict: The Bucket, Key, ETag, Size and number of Parts of the object
+        """
+        with open(filename, "rb", buffering=0) as f:
+            return self.upload_fileobj(f, bucket, key, extra_args)
+
+    def upload_fileobj(
+        self, fileobj: IO[bytes], bucket: str, key: str, extra_args: dict | None = None
+    ) -> dict:
+        """
+        Upload everything from the current position of a binary stream.
+
+        Args:
+            fileobj (IO[bytes]): The stream to upload
+            bucket (str): The name of the bucket
+            key (str): The key of the object
+            extra_args (dict | None, optional): Extra arguments for put_object/create_multipart_upload
+                such as ContentType. Defaults to None.
+
+        Raises:
+            TransferError: If the upload fails
+
+        Returns:
+            dict: The Bucket, Key, ETag, Size and number of Parts of the object
+        """
+        extra_args = extra_args or {}
+        part_size = self._part_size(self._remaining(fileobj))
+
+        data = self._read(fileobj, part_size)
+        if len(data) < part_size:
+            # It fits in a single request
+            response = self._check(
+                self.client.put_object(
+                    Bucket=bucket,
+                    Key=key,
+                    Body=data,
+                    ChecksumSHA256=sha256_checksum(data),
+                    **extra_args,
+                ),
+                "upload",
+                key,
+            )
+            return {
+                "Bucket": bucket,
+                "Key": key,
+                "ETag": response.get("ETag"),
+                "Size": len(data),
+                "Parts": 1,
+            }
+
+        response = self._check(
+            self.client.create_multipart_upload(
+                Bucket=bucket, Key=key, ChecksumAlgorithm="SHA256", **extra_args
+            ),
+            "upload",
+            key,
+        )
+        upload_id = response["UploadId"]
+
+        try:
+            size = 0
+            parts: list[dict] = []
+            with ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="upload"
+            ) as pool:
+                # Only read a few parts ahead of the uploads so memory stays bounded
+                pending: list[Future] = []
+                part_number = 1
+                while data:
+                    if len(pending) > self.max_concurrency:
+                        parts.append(pending.pop(0).result())
+                    pending.append(
+                        pool.submit(
+                            self._upload_part, bucket, key, upload_id, part_number, data
+                        )
+                    )
+                    size += len(data)
+                    part_number += 1
+                    if part_number > MAX_PARTS:
+                        break
+                    data = self._read(fileobj, part_size)
+                parts.extend(future.result() for future in pending)
+
+            if self._read(fileobj, 1):
+                raise TransferError(
+                    "Object {} has more than {} parts".format(key, MAX_PARTS)
+                )
+
+            response = self._check(
+                self.client.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                ),
+                "upload",
+                key,
+            )
+
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(
+                    Bucket=bucket, Key=key, UploadId=upload_id
+                )
+            except Exception as e:
+                log.warn("Failed to abort the upload of {}: {}", key, e)
+            raise
+
+        return {
+            "Bucket": bucket,
+            "Key": key,
+            "ETag": response.get("ETag"),
+            "Size": size,
+            "Parts": len(parts),
+        }
+
+    def download_file(self, bucket: str, key: str, filename: str) -> dict:
+        """
+        Download an object to a file.  The file is replaced when the download is complete, so it never
+        contains a partial object.
+
+        Args:
+            bucket (str): The name of the bucket
+            key (str): The key of the object
+            filename (str): The file to write
+
+        Returns:
+            dict: The Bucket, Key, ETag, Size and number of Parts of the object
+        """
+        with atomic_write(filename) as f:
+            return self.download_fileobj(bucket, key, f)
+
+    def download_fileobj(self, bucket: str, key: str, fileobj: IO[bytes]) -> dict:
+        """
+        Download an object and write it at the current position of a binary stream.
+
+        Parts are written to a regular file in place (pwrite) as they arrive.  Other streams receive
+        the parts in order.
+
+        Args:
+            bucket (str): The name of the bucket
+            key (str): The key of the object
+            fileobj (IO[bytes]): The stream to write to
+
+        Raises:
+            TransferError: If the download fails
+
+        Returns:
+            dict: The Bucket, Key, ETag, Size and number of Parts of the object
+        """
+        first, size = self._get_first_part(bucket, key)
+        etag = first.get("ETag")
+
+        ranges = [
+            (start, min(start + self.part_size, size) - 1)
+            for start in range(self.part_size, size, self.part_size)
+        ]
+
+        fd = self._fileno(fileobj)
+        if fd is not None:
+            fileobj.flush()
+            base = fileobj.tell()
+            os.ftruncate(fd, max(base + size, os.fstat(fd).st_size))
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="download"
+        ) as pool:
+            if fd is not None:
+                futures = [
+                    pool.submit(
+                        self._download_part, bucket, key, etag, start, end, fd, base
+                    )
+                    for start, end in ranges
+                ]
+                self._pwrite_body(first["Body"], fd, base)
+                for future in futures:
+                    future.result()
+                fileobj.seek(base + size)
+            else:
+                fileobj.write(self._read_body(first["Body"]))
+                # Keep a few parts in flight and write them in order
+                pending: list[Future] = []
+                for start, end in ranges:
+                    if len(pending) >= self.max_concurrency:
+                        fileobj.write(pending.pop(0).result())
+                    pending.append(
+                        pool.submit(self._download_part, bucket, key, etag, start, end)
+                    )
+                for future in pending:
+                    fileobj.write(future.result())
+
+        return {
+            "Bucket": bucket,
+            "Key": key,
+            "ETag": etag,
+            "Size": size,
+            "Parts": len(ranges) + 1,
+        }
+
+    def _part_size(self, size: int | None) -> int:
+        """Grow the part size if the object would have more than MAX_PARTS parts"""
+        part_size = self.part_size
+        if size is not None and size > part_size * MAX_PARTS:
+            part_size = -(-size // MAX_PARTS)
+        return part_size
+
+    def _upload_part(
+        self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes
+    ) -> dict:
+        checksum = sha256_checksum(data)
+        response = self._check(
+            self.client.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data,
+                ChecksumAlgorithm="SHA256",
+                ChecksumSHA256=checksum,
+            ),
+            "upload",
+            key,
+        )
+        if response.get("ChecksumSHA256", checksum) != checksum:
+            raise TransferError(
+                "The checksum of part {} of {} does not match".format(part_number, key)
+            )
+        return {
+            "PartNumber": part_number,
+            "ETag": response["ETag"],
+            "ChecksumSHA256": checksum,
+        }
+
+    def _get_first_part(self, bucket: str, key: str) -> tuple[dict, int]:
+        """Get the first part of the object and the size of the whole object"""
+        try:
+            response = self._check(
+                self.client.get_object(
+                    Bucket=bucket, Key=key, Range=f"bytes=0-{self.part_size - 1}"
+                ),
+                "download",
+                key,
+            )
+        except Exception as e:
+            # An empty object cannot be requested with a range
+            if not self._is_invalid_range(e):
+                raise
+            response = self._check(
+                self.client.get_object(Bucket=bucket, Key=key), "download", key
+            )
+
+        content_range = response.get("ContentRange")
+        if content_range:
+            size = int(content_range.rsplit("/", 1)[1])
+        else:
+            size = int(response.get("ContentLength", 0))
+
+        return response, size
+
+    def _download_part(
+        self,
+        bucket: str,
+        key: str,
+        etag: str | None,
+        start: int,
+        end: int,
+        fd: int | None = None,
+        base: int = 0,
+    ) -> bytes:
+        """Download a range.  Write it to the file descriptor at base + start or return it"""
+        kwargs = {"Bucket": bucket, "Key": key, "Range": f"bytes={start}-{end}"}
+        if etag:
+            kwargs["IfMatch"] = etag
+        response = self._check(self.client.get_object(**kwargs), "download", key)
+
+        if fd is None:
+            data = self._read_body(response["Body"])
+            count = len(data)
+        else:
+            data = b""
+            count = self._pwrite_body(response["Body"], fd, base + start)
+
+        if count != end - start + 1:
+            raise TransferError(
+                "Expected {} bytes at offset {} of {} but received {}".format(
+                    end - start + 1, start, key, count
+                )
+            )
+        return data
+
+    @staticmethod
+    def _read_body(body: Any) -> bytes:
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    @staticmethod
+    def _pwrite_body(body: Any, fd: int, position: int) -> int:
+        """Stream the body to the file descriptor at the position and return the number of bytes written"""
+        written = 0
+        try:
+            while True:
+                chunk = body.read(BUFFER_SIZE)
+                if not chunk:
+                    break
+                view = memoryview(chunk)
+                while view:
+                    n = os.pwrite(fd, view, position + written)
+                    view = view[n:]
+                    written += n
+        finally:
+            body.close()
+        return written
+
+    @staticmethod
+    def _fileno(fileobj: Any) -> int | None:
+        """Return the file descriptor if the stream is a regular file that can be written in place"""
+        try:
+            fd = fileobj.fileno()
+            if stat.S_ISREG(os.fstat(fd).st_mode) and fileobj.seekable():
+                return fd
+        except (AttributeError, OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def _remaining(fileobj: Any) -> int | None:
+        """The number of bytes left in the stream or None if it is not a regular file"""
+        try:
+            return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _read(fileobj: Any, size: int) -> bytes:
+        """Read exactly size bytes unless the end of the stream is reached"""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = fileobj.read(remaining)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _is_invalid_range(e: Exception) -> bool:
+        """True if the error is the InvalidRange error of S3 (a ClientError) or of the Magic emulation"""
+        response = getattr(e, "response", None)
+        if isinstance(response, dict):
+            return response.get("Error", {}).get("Code") == INVALID_RANGE
+        return isinstance(e, TransferError) and f"{INVALID_RANGE}:" in str(e)
+
+    @staticmethod
+    def _check(response: Any, action: str, key: str) -> dict:
+        """
+        Return the response as a dictionary.  The Magic emulation reports errors in the response instead
+        of raising an exception like boto3.
+        """
+        if hasattr(response, "model_dump"):
+            # MagicS3Client.put_object() returns the MagicObject
+            rv = {"ETag": response.etag}
+            if response.error:
+                rv["Error"] = response.error
+            response = rv
+
+        if "Error" in response:
+            raise TransferError(
+                "Failed to {} {}: {}".format(action, key, response["Error"].strip())
+            )
+        return response
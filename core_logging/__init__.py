@@ -17,10 +17,17 @@ from .log_interface import (
     critical,
     info,
     getLevelName,
+    flush,
+    flush_on_exit,
 )
 from .log_classes import (
     CoreLogger,
     CoreLoggerHandler,
+    QueuedCoreLoggerHandler,
+    LogWriter,
+    get_log_writer,
+    LazyDetails,
+    truncate_details,
     MSG,
     STATUS,
     TRACE,
@@ -45,6 +52,11 @@ from logging import NOTSET, INFO, WARNING, ERROR, CRITICAL, DEBUG
 __all__ = [
     "CoreLogger",
     "CoreLoggerHandler",
+    "QueuedCoreLoggerHandler",
+    "LogWriter",
+    "get_log_writer",
+    "LazyDetails",
+    "truncate_details",
     "MSG",
     "STATUS",
     "TRACE",
@@ -89,4 +101,6 @@ __all__ = [
     "critical",
     "info",
     "getLevelName",
+    "flush",
+    "flush_on_exit",
 ]
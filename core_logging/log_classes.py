@@ -6,11 +6,19 @@ JSON objects, status messages, and trace messages.
 from typing import Any
 
 from datetime import datetime
+import atexit
 import io
 import json
 import logging
-from collections import OrderedDict
-from ruamel import yaml
+import math
+import os
+import re
+import sys
+import threading
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from functools import cached_property
 
 from logging import NOTSET, FATAL, WARN, CRITICAL, DEBUG, INFO, WARNING, ERROR
 
@@ -54,6 +62,28 @@ ENV_LOG_LEVEL = "LOG_LEVEL"
 """ \\- "LOG_LEVEL" """
 ENV_LOG_DIR = "LOG_DIR"
 """ \\- "LOG_DIR" """
+ENV_LOG_ASYNC = "LOG_ASYNC"
+""" \\- "LOG_ASYNC" """
+ENV_LOG_QUEUE_SIZE = "LOG_QUEUE_SIZE"
+""" \\- "LOG_QUEUE_SIZE" """
+ENV_LOG_QUEUE_POLICY = "LOG_QUEUE_POLICY"
+""" \\- "LOG_QUEUE_POLICY" """
+ENV_LOG_MAX_DETAIL_LENGTH = "LOG_MAX_DETAIL_LENGTH"
+""" \\- "LOG_MAX_DETAIL_LENGTH" """
+ENV_LOG_MAX_DETAIL_ITEMS = "LOG_MAX_DETAIL_ITEMS"
+""" \\- "LOG_MAX_DETAIL_ITEMS" """
+
+# What the queued handler does when the queue is full
+QUEUE_BLOCK = "block"
+""" \\- "block". Wait for the writer thread """
+QUEUE_DROP_OLDEST = "drop-oldest"
+""" \\- "drop-oldest". Drop the oldest queued record """
+QUEUE_DROP_BELOW_LEVEL = "drop-below-level"
+""" \\- "drop-below-level". Drop the record if it is below the drop level (WARNING), else wait """
+QUEUE_POLICIES = (QUEUE_BLOCK, QUEUE_DROP_OLDEST, QUEUE_DROP_BELOW_LEVEL)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 512
 
 # Attributes for the extra: Mapping[str, object] parameter when calling the log methods
 L_STATUS_LABEL = "status_label"
@@ -76,6 +106,251 @@ L_PRN = "prn"
 """ \\- "prn" """
 
 
+class LazyDetails:
+    """
+    Details that are only built if the record is written, e.g. when they are big or expensive to build and
+    only logged at the TRACE level.  The function is called at most once, with the arguments, on the thread
+    that logs.
+
+    .. code-block:: python
+
+        log.trace("Invoking Lambda", details=LazyDetails(build_details, arn, payload))
+
+    A function without arguments can also be used as the details:
+
+    .. code-block:: python
+
+        log.trace("Invoking Lambda", details=lambda: {"FunctionName": arn, "Payload": payload})
+
+    Args:
+        func (Callable): The function that returns the details
+        *args: The arguments of the function
+        **kwargs: The keyword arguments of the function
+    """
+
+    __slots__ = ("func", "args", "kwargs", "_value", "_resolved")
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._value: Any = None
+        self._resolved = False
+
+    def resolve(self) -> Any:
+        """
+        Build the details.
+
+        Returns:
+            Any: The result of the function
+        """
+        if not self._resolved:
+            self._value = self.func(*self.args, **self.kwargs)
+            self._resolved = True
+        return self._value
+
+    def __repr__(self) -> str:
+        return f"LazyDetails({getattr(self.func, '__qualname__', self.func)!r})"
+
+
+def resolve_details(details: Any) -> Any:
+    """
+    Build LazyDetails or details given as a function.
+
+    Args:
+        details (Any): The details of the record
+
+    Returns:
+        Any: The details.  An error message if the function failed, so the record is still written.
+    """
+    try:
+        if isinstance(details, LazyDetails):
+            return details.resolve()
+        if callable(details):
+            return details()
+    except Exception as e:
+        return {"Error": f"Failed to build the details: {e}"}
+    return details
+
+
+def truncate_details(details: Any, max_length: int = 0, max_items: int = 0) -> Any:
+    """
+    Limit the size of the details.  Strings longer than max_length are cut and lists and dictionaries with
+    more than max_items items keep only the first ones, with a note of what was left out.
+
+    The original is not modified.  The dictionaries and lists are copied (without recursion so deeply nested
+    details can't hit the recursion limit), anything else is kept as it is.  A dictionary or list that contains
+    itself is replaced by "(recursive reference)" where it repeats.
+
+    Args:
+        details (Any): The details
+        max_length (int, optional): The maximum length of a string.  Defaults to 0 (no limit).
+        max_items (int, optional): The maximum number of items of a list or dictionary. Defaults to 0 (no limit).
+
+    Returns:
+        Any: The truncated details
+    """
+
+    def truncate(value: Any) -> Any:
+        if isinstance(value, str):
+            if 0 < max_length < len(value):
+                return f"{value[:max_length]}... ({len(value) - max_length} more characters)"
+            return value
+        if isinstance(value, dict):
+            return {}
+        if isinstance(value, (list, tuple)):
+            return []
+        return value
+
+    if max_length <= 0 and max_items <= 0:
+        return details
+
+    result = truncate(details)
+    # Each entry has the ids of the containers above it to catch details that contain themselves
+    stack: list[tuple[Any, Any, frozenset[int]]] = []
+    if isinstance(result, (dict, list)):
+        stack.append((details, result, frozenset()))
+    while stack:
+        source, target, parents = stack.pop()
+        parents = parents | {id(source)}
+        is_dict = isinstance(source, dict)
+        items = list(source.items()) if is_dict else list(enumerate(source))
+        more = len(items) - max_items if max_items > 0 else 0
+        if more > 0:
+            items = items[:max_items]
+        for key, value in items:
+            if id(value) in parents:
+                item = "(recursive reference)"
+            else:
+                item = truncate(value)
+            if is_dict:
+                target[key] = item
+            else:
+                target.append(item)
+            if item is not value and isinstance(item, (dict, list)):
+                stack.append((value, item, parents))
+        if more > 0:
+            if is_dict:
+                target["..."] = f"{more} more items"
+            else:
+                target.append(f"... ({more} more items)")
+
+    return result
+
+
+# json.dumps(data, default=str) uses the same encoder and string encoding
+_json_encoder = json.JSONEncoder(default=str)
+_encode_json_string = json.encoder.encode_basestring_ascii
+
+
+# Strings the YAML dumper writes without quotes (a conservative subset, anything else goes to ruamel)
+_YAML_PLAIN = re.compile(
+    r"[A-Za-z_/][\w./@%+=,()?:'-]*(?: [\w./@%+=,()?:'-]+)*", re.ASCII
+)
+_YAML_PLAIN_FLOAT = re.compile(r"-?[0-9]+\.[0-9]+")
+_YAML_RESERVED = {"true", "false", "null", "yes", "no", "on", "off", "y", "n"}
+_YAML_WIDTH = 80  # Longer lines are folded by the dumper
+_YAML_MAX_DEPTH = 32
+
+
+def _yaml_scalar(value: Any, column: int) -> str | None:
+    """Return the YAML of a scalar that starts at the column or None if it isn't written as is"""
+    t = type(value)
+    if t is str:
+        text = value
+        if (
+            not _YAML_PLAIN.fullmatch(text)
+            or text.lower() in _YAML_RESERVED
+            or text.endswith(":")
+            or ": " in text
+        ):
+            return None
+    elif t is bool:
+        text = "true" if value else "false"
+    elif t is int:
+        text = int.__repr__(value)
+    elif t is float:
+        text = float.__repr__(value)
+        if not _YAML_PLAIN_FLOAT.fullmatch(text):
+            return None
+    else:
+        return None
+    return text if column + len(text) <= _YAML_WIDTH else None
+
+
+def _yaml_mapping(
+    data: dict, indent: int, lead: str, lines: list[str], depth: int
+) -> bool:
+    """Add the lines of a mapping at the indent.  The first line starts with lead (e.g. "- ")"""
+    if depth > _YAML_MAX_DEPTH:
+        return False
+    pad = " " * indent
+    for key, value in data.items():
+        if type(key) is not str or _yaml_scalar(key, indent) is None:
+            return False
+        line = lead + key + ":"
+        lead = pad
+        t = type(value)
+        if t is dict or t is OrderedDict:
+            if not value:
+                lines.append(line + " {}")
+                continue
+            lines.append(line)
+            if not _yaml_mapping(value, indent + 2, pad + "  ", lines, depth + 1):
+                return False
+        elif t is list:
+            if not value:
+                lines.append(line + " []")
+                continue
+            lines.append(line)
+            if not _yaml_sequence(value, indent, lines, depth + 1):
+                return False
+        elif value is None:
+            lines.append(line)
+        else:
+            text = _yaml_scalar(value, len(line) + 1)
+            if text is None:
+                return False
+            lines.append(line + " " + text)
+    return True
+
+
+def _yaml_sequence(data: list, indent: int, lines: list[str], depth: int) -> bool:
+    """Add the lines of a sequence below a mapping at the indent (the items are offset by 2)"""
+    if depth > _YAML_MAX_DEPTH:
+        return False
+    lead = " " * (indent + 2) + "- "
+    for item in data:
+        t = type(item)
+        if (t is dict or t is OrderedDict) and item:
+            if not _yaml_mapping(item, indent + 4, lead, lines, depth + 1):
+                return False
+        elif item is None:
+            lines.append(lead)
+        else:
+            text = _yaml_scalar(item, indent + 4)
+            if text is None:
+                return False
+            lines.append(lead + text)
+    return True
+
+
+def _dump_simple_yaml(data: Any) -> list[str] | None:
+    """
+    Return the lines the YAML dumper of CoreLogTextFormatter writes for details made of dictionaries, lists
+    and simple scalars, or None if the details need the dumper.
+    """
+    lines: list[str] = []
+    t = type(data)
+    if t is dict or t is OrderedDict:
+        ok = _yaml_mapping(data, 0, "", lines, 0)
+    elif t is list:
+        ok = _yaml_sequence(data, 0, lines, 0)
+    else:
+        ok = False
+    return lines if ok and lines else None
+
+
 class CoreLogFormatter(logging.Formatter):
     """Base Class for the CoreLogJsonFormatter and CoreLogTextFormatter classes."""
 
@@ -146,10 +421,16 @@ class CoreLogTextFormatter(CoreLogFormatter):
 
         super().__init__(text_format, datefmt)
 
-        self.yaml = yaml.YAML(typ="rt")
-        self.yaml.default_flow_style = False
-        self.yaml.indent(mapping=2, sequence=4, offset=2)
-        self.yaml.representer.add_representer(OrderedDict, self.represent_ordereddict)
+    @cached_property
+    def yaml(self) -> Any:
+        """The YAML dumper for the details.  Created on first use so ruamel is only imported if details are logged."""
+        from ruamel import yaml
+
+        dumper = yaml.YAML(typ="rt")
+        dumper.default_flow_style = False
+        dumper.indent(mapping=2, sequence=4, offset=2)
+        dumper.representer.add_representer(OrderedDict, self.represent_ordereddict)
+        return dumper
 
     @staticmethod
     def represent_ordereddict(dumper: Any, ordered: OrderedDict) -> Any:
@@ -161,36 +442,37 @@ class CoreLogTextFormatter(CoreLogFormatter):
         Formats the record object into a string.  record.details will be translated to YAML
         format and the generated string will be appended to the end of the.
 
+        The record is not changed (other than the message and asctime set by logging.Formatter), so it can be
+        formatted again, e.g. by a file handler.
+
         Args:
             record (logging.LogRecord): The logger record object
 
         Returns:
             str: A string to output to the log.
         """
-        if hasattr(record, L_SCOPE):
-            scope = getattr(record, L_SCOPE)
-            if scope:
-                record.msg = f"{record.msg} ({scope})"
+        scope = getattr(record, L_SCOPE, None)
+        if scope:
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = f"{record.msg} ({scope})"
 
         data = super().format(record)
 
-        if hasattr(record, L_DETAILS):
-            details = getattr(record, L_DETAILS)
-            if details and (
-                isinstance(details, dict)
-                or isinstance(details, OrderedDict)
-                or isinstance(details, list)
-            ):
-                data = data + "\n" + self._dump_ordered_yaml(details)
+        details = getattr(record, L_DETAILS, None)
+        if details and isinstance(details, (dict, list)):
+            data = data + "\n" + self._dump_ordered_yaml(details)
 
         return data
 
     def _dump_ordered_yaml(self, data: dict) -> str:
-        s = io.StringIO()
-        self.yaml.dump(data, s)
+        # Simple details (the usual case) are written without the dumper, the same way it would
+        lines = _dump_simple_yaml(data)
+        if lines is None:
+            s = io.StringIO()
+            self.yaml.dump(data, s)
+            lines = s.getvalue().splitlines()
         # Add additional indentation
-        indented_yaml = "\n".join("    " + line for line in s.getvalue().splitlines())
-        return indented_yaml
+        return "    " + "\n    ".join(lines) if lines else ""
 
     def details(self, record: logging.LogRecord, content: str) -> str:
         """
@@ -227,17 +509,36 @@ class CoreLogTextFormatter(CoreLogFormatter):
         # Remove empty lines from the end of the stream
         while lines and (lines[-1] == "" or lines[-1] is None):
             lines.pop()
-        data = ""
-        # Format each line and print it on the console
+        if not lines:
+            return ""
+
+        # Format each line with a copy of the record
+        line_record = logging.makeLogRecord(record.__dict__)
+        formatted = []
         for line in lines:
-            record.msg = line
-            data = data + "\n" + super().format(record)
-        return data
+            line_record.msg = line
+            formatted.append(super().format(line_record))
+        return "\n" + "\n".join(formatted)
 
 
 class CoreLogJsonFormatter(CoreLogFormatter):
     """JSON Formatter for the CoreLogger class that outputs a log message as a JSON object."""
 
+    JSON_FIELDS: tuple[tuple[str, str], ...] = (
+        ("log.logger", "name"),
+        ("log.level", "levelname"),
+        ("status", "status"),
+        ("reason", "reason"),
+        ("message", "msg"),
+        ("scope", "scope"),
+        ("file", "filename"),
+        ("line", "lineno"),
+        ("function", "funcName"),
+        ("context", "details"),
+    )
+    """ The fields after the "@timestamp", in order, with the attribute of the record tried first (then the
+    attribute named like the field).  Fields without a value are left out. """
+
     def __init__(self, text_format: str | None = None, datefmt: str | None = None):
         """
         Initializes the formatter with the specified format and date format.
@@ -254,6 +555,18 @@ class CoreLogJsonFormatter(CoreLogFormatter):
 
         super().__init__(text_format, datefmt)
 
+        # The encoded key of each field with the attribute to try first and the one to try next (or None)
+        self._json_plan = tuple(
+            (
+                _encode_json_string(key) + ": ",
+                None if key == alternate else key,
+                alternate,
+            )
+            for key, alternate in self.JSON_FIELDS
+        )
+        # The second of the last timestamp and its text up to the "."
+        self._json_second: tuple[float, str] | None = None
+
     @staticmethod
     def set_element(
         data: dict, record: logging.LogRecord, key: str, alternate: str | None = None
@@ -304,30 +617,57 @@ class CoreLogJsonFormatter(CoreLogFormatter):
 
         The Details field can be any arbitrary dictionary that is passed in the log message.
 
+        The output is the same as json.dumps() of the fields (with default=str) but the fields are encoded one by
+        one with a plan built once (see JSON_FIELDS) and the timestamp is only formatted once per second.
+
         Args:
             record (logging.LogRecord): The log record object.
 
         """
+        parts = ['{"@timestamp": "' + self.json_timestamp(record.created) + '"']
+        for prefix, key, alternate in self._json_plan:
+            value = getattr(record, alternate, None)
+            if value is None and key is not None:
+                value = getattr(record, key, None)
+            if value is None:
+                continue
+            if type(value) is str:
+                parts.append(prefix + _encode_json_string(value))
+            elif type(value) is int:
+                parts.append(prefix + int.__repr__(value))
+            else:
+                parts.append(prefix + _json_encoder.encode(value))
 
-        timestamp = datetime.fromtimestamp(record.created)
-        json_timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        return ", ".join(parts) + "}"
 
-        data: dict = OrderedDict([("@timestamp", json_timestamp)])
+    def json_timestamp(self, created: float) -> str:
+        """
+        Format the creation time of a record like datetime.fromtimestamp(created).strftime("%Y-%m-%dT%H:%M:%S.%f")
+        truncated to milliseconds and followed by "Z".  The part up to the seconds is cached.
 
-        self.set_element(data, record, "log.logger", "name")
-        self.set_element(data, record, "log.level", "levelname")
-        self.set_element(data, record, "status", "status")
-        self.set_element(data, record, "reason", "reason")
-        self.set_element(data, record, "message", "msg")
-        self.set_element(data, record, "scope", "scope")
-        self.set_element(data, record, "file", "filename")
-        self.set_element(data, record, "line", "lineno")
-        self.set_element(data, record, "function", "funcName")
-        self.set_element(data, record, "context", "details")
+        Args:
+            created (float): The creation time of the record (seconds since the epoch)
 
-        output = json.dumps(data, default=str)
+        Returns:
+            str: The timestamp
+        """
+        # Rounded to microseconds the same way as datetime.fromtimestamp()
+        fraction, seconds = math.modf(created)
+        us = round(fraction * 1e6)
+        if us >= 1000000:
+            seconds, us = seconds + 1, us - 1000000
+        elif us < 0:
+            seconds, us = seconds - 1, us + 1000000
 
-        return output
+        cached = self._json_second
+        if cached is None or cached[0] != seconds:
+            cached = (
+                seconds,
+                datetime.fromtimestamp(seconds).strftime("%Y-%m-%dT%H:%M:%S."),
+            )
+            self._json_second = cached
+
+        return f"{cached[1]}{us // 1000:03d}Z"
 
 
 class CoreLoggerHandler(logging.Handler):
@@ -339,6 +679,10 @@ class CoreLoggerHandler(logging.Handler):
     Which formatter is used is determined by the LOG_AS_JSON environment variable.  If it's set to 'true' (case insensitive),
     then the CoreLogJsonFormatter is used.
 
+    The details can be :class:`LazyDetails` or a function, built only if the record is written.  Their size is
+    limited by the LOG_MAX_DETAIL_LENGTH and LOG_MAX_DETAIL_ITEMS environment variables (see
+    :func:`truncate_details`).
+
     """
 
     formatter: CoreLogFormatter
@@ -356,11 +700,21 @@ class CoreLoggerHandler(logging.Handler):
         Args:
             name (str): The name of the handler.
             **kwargs: Additional keyword arguments to pass to the handler.
+                * max_detail_length: The maximum length of the strings of the details.  Defaults to the
+                  LOG_MAX_DETAIL_LENGTH environment variable or 0 (no limit).
+                * max_detail_items: The maximum number of items of the lists and dictionaries of the details.
+                  Defaults to the LOG_MAX_DETAIL_ITEMS environment variable or 0 (no limit).
         """
 
         super().__init__(level=kwargs.get("level", NOTSET))
 
         self.name = name
+        self.max_detail_length = kwargs.get(
+            "max_detail_length", int(os.getenv(ENV_LOG_MAX_DETAIL_LENGTH, "0"))
+        )
+        self.max_detail_items = kwargs.get(
+            "max_detail_items", int(os.getenv(ENV_LOG_MAX_DETAIL_ITEMS, "0"))
+        )
 
     def emit(self, record) -> None:
         """
@@ -372,33 +726,68 @@ class CoreLoggerHandler(logging.Handler):
             record (dict): The log record object.
         """
         try:
-            # If for some reason record.args is not a tuple, make it one.  This happens if the original
-            # tuple had only one element that is also a list (or dictionary)
-            if not isinstance(record.args, tuple):
-                record.args = (record.args,)
-
-            if record.levelno == STATUS:
-                record.msg = f"{record.status} {record.reason}"
-
-            # The user can send an list of replacement values if the "msg" contains "%s"
-            # place_holders.
-            record.msg, record.args = self.replace_holders(record.msg, record.args)
-
-            # The FIRST argument after the replacement values goes into "details".  But ONLY
-            # if it's a dictionary.  Else skip it.
-            if len(record.args) > 0 and isinstance(record.args[0], dict):
-                self.add_details(record, record.args[0])
-                record.args = record.args[1:]
-
-            # fix the message if it exists.  The "msg" was modified if it had replacement %s characters.
-            if self.formatter:
-                print(self.formatter.format(record))
-            else:
-                print(record.getMessage())
+            self.prepare(record)
+            print(self.format_record(record))
 
         except Exception as e:
             print(f"Error writing to log file: {str(e)}")
 
+    def prepare(self, record: logging.LogRecord) -> None:
+        """
+        Replace the place holders of the message, move the details out of the arguments, build lazy details
+        and limit their size.
+
+        Args:
+            record (logging.LogRecord): The log record object.
+        """
+        details = getattr(record, L_DETAILS, None)
+        if details is not None:
+            setattr(record, L_DETAILS, resolve_details(details))
+
+        # If for some reason record.args is not a tuple, make it one.  This happens if the original
+        # tuple had only one element that is also a list (or dictionary)
+        if not isinstance(record.args, tuple):
+            record.args = (record.args,)
+
+        if record.levelno == STATUS:
+            record.msg = f"{record.status} {record.reason}"
+
+        # The user can send an list of replacement values if the "msg" contains "%s"
+        # place_holders.
+        record.msg, record.args = self.replace_holders(record.msg, record.args)
+
+        # The FIRST argument after the replacement values goes into "details".  But ONLY
+        # if it's a dictionary.  Else skip it.
+        if len(record.args) > 0 and isinstance(record.args[0], dict):
+            self.add_details(record, record.args[0])
+            record.args = record.args[1:]
+
+        if self.max_detail_length > 0 or self.max_detail_items > 0:
+            details = getattr(record, L_DETAILS, None)
+            if details is not None:
+                setattr(
+                    record,
+                    L_DETAILS,
+                    truncate_details(
+                        details, self.max_detail_length, self.max_detail_items
+                    ),
+                )
+
+    def format_record(self, record: logging.LogRecord) -> str:
+        """
+        Format a prepared record.
+
+        Args:
+            record (logging.LogRecord): The log record object.
+
+        Returns:
+            str: The text to output
+        """
+        # fix the message if it exists.  The "msg" was modified if it had replacement %s characters.
+        if self.formatter:
+            return self.formatter.format(record)
+        return record.getMessage()
+
     @staticmethod
     def replace_holders(message: str, args: tuple[Any]) -> tuple[str, tuple]:
         """
@@ -448,6 +837,298 @@ class CoreLoggerHandler(logging.Handler):
         setattr(record, L_DETAILS, details)
 
 
+class LogWriter:
+    """
+    Writes the records of QueuedCoreLoggerHandlers from a background thread.
+
+    The records are put in a bounded queue.  The writer thread formats them (so YAML or JSON dumping the
+    details doesn't slow down the thread that logs) and writes them in batches, one write per batch.  When the
+    queue is full the policy decides:
+
+    * "block" - wait for the writer thread
+    * "drop-oldest" - drop the oldest queued record
+    * "drop-below-level" - drop the record if it is below drop_level, else wait
+
+    The queue is flushed at exit.  A Lambda handler should call :func:`core_logging.flush` (or use
+    :func:`core_logging.flush_on_exit`) before it returns because the execution environment is frozen, not
+    exited, between invocations.
+
+    Args:
+        max_size (int, optional): The maximum number of queued records. Defaults to DEFAULT_QUEUE_SIZE.
+        policy (str, optional): What to do when the queue is full. Defaults to "block".
+        drop_level (int, optional): The level below which records are dropped by "drop-below-level".
+            Defaults to WARNING.
+        batch_size (int, optional): The maximum number of records per write. Defaults to DEFAULT_BATCH_SIZE.
+        stream (Any, optional): Where the records are written. Defaults to sys.stdout at the time of the write.
+
+    Raises:
+        ValueError: If the policy is not one of QUEUE_POLICIES
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_QUEUE_SIZE,
+        policy: str = QUEUE_BLOCK,
+        drop_level: int = WARNING,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        stream: Any = None,
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                "Unknown queue policy '{}'.  Use one of {}".format(
+                    policy, ", ".join(QUEUE_POLICIES)
+                )
+            )
+        self.max_size = max(max_size, 1)
+        self.policy = policy
+        self.drop_level = drop_level
+        self.batch_size = max(batch_size, 1)
+        self.stream = stream
+
+        # Counters
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+
+        self._init_state()
+        _writers.add(self)
+
+    def _init_state(self) -> None:
+        self._queue: deque[tuple[CoreLoggerHandler, logging.LogRecord]] = deque()
+        self._condition = threading.Condition()
+        self._pending = 0  # Taken from the queue and not written yet
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def put(self, handler: "CoreLoggerHandler", record: logging.LogRecord) -> None:
+        """
+        Queue a prepared record.  Written straight away if called from the writer thread or after close().
+
+        Args:
+            handler (CoreLoggerHandler): The handler that formats the record
+            record (logging.LogRecord): The record
+        """
+        if self._closed or threading.current_thread() is self._thread:
+            self._write([(handler, record)])
+            return
+
+        with self._condition:
+            self._start()
+            while len(self._queue) >= self.max_size:
+                if self.policy == QUEUE_DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    break
+                if (
+                    self.policy == QUEUE_DROP_BELOW_LEVEL
+                    and record.levelno < self.drop_level
+                ):
+                    self.dropped += 1
+                    return
+                # Wake up now and then in case the writer thread died
+                self._condition.wait(0.1)
+                self._start()
+            self._queue.append((handler, record))
+            self.queued += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until the queued records are written.
+
+        Args:
+            timeout (float | None, optional): The maximum number of seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            bool: True if everything was written
+        """
+        if threading.current_thread() is self._thread:
+            return False
+        with self._condition:
+            if self._queue:
+                self._start()
+            return self._condition.wait_for(
+                lambda: not self._queue and self._pending == 0, timeout
+            )
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Write the queued records and stop the writer thread.  Records put after this are written straight away.
+
+        Args:
+            timeout (float | None, optional): The maximum number of seconds to wait. Defaults to None (no limit).
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the counters.
+
+        Returns:
+            dict[str, int]: The number of records queued, dropped and written since the start, and the number
+                waiting in the queue (size)
+        """
+        with self._condition:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "size": len(self._queue) + self._pending,
+                "max_size": self.max_size,
+            }
+
+    def _start(self) -> None:
+        # Started on first use and again if it died (e.g. in a forked child)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="core-logging", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+                self._pending = len(batch)
+                self._condition.notify_all()
+
+            self._write(batch)
+
+            with self._condition:
+                self._pending = 0
+                self._condition.notify_all()
+
+    def _write(
+        self, batch: list[tuple["CoreLoggerHandler", logging.LogRecord]]
+    ) -> None:
+        lines = []
+        for handler, record in batch:
+            try:
+                lines.append(handler.format_record(record))
+            except Exception as e:
+                lines.append(f"Error writing to log file: {str(e)}")
+        try:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:  # nosec B110 - nowhere left to report it
+            pass
+        with self._condition:
+            self.written += len(batch)
+
+
+# The writers to flush at exit
+_writers: "weakref.WeakSet[LogWriter]" = weakref.WeakSet()
+_default_writer: LogWriter | None = None
+_default_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """
+    Return the writer shared by the queued handlers.  Configured by the LOG_QUEUE_SIZE and LOG_QUEUE_POLICY
+    environment variables.
+
+    Returns:
+        LogWriter: The writer
+    """
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = LogWriter(
+                max_size=int(os.getenv(ENV_LOG_QUEUE_SIZE, str(DEFAULT_QUEUE_SIZE))),
+                policy=os.getenv(ENV_LOG_QUEUE_POLICY, QUEUE_BLOCK).lower(),
+            )
+        return _default_writer
+
+
+def flush_log_writers(timeout: float | None = None) -> None:
+    """
+    Wait until the records queued by all the writers are written.
+
+    Args:
+        timeout (float | None, optional): The maximum number of seconds to wait for each writer.
+            Defaults to None (no limit).
+    """
+    for writer in list(_writers):
+        writer.flush(timeout)
+
+
+def _close_log_writers() -> None:
+    for writer in list(_writers):
+        writer.close(5)
+
+
+def _reinit_log_writers() -> None:
+    # The lock and the thread of the parent are useless in a forked child
+    for writer in list(_writers):
+        writer._init_state()
+
+
+atexit.register(_close_log_writers)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_log_writers)
+
+
+class QueuedCoreLoggerHandler(CoreLoggerHandler):
+    """
+    A CoreLoggerHandler that doesn't write the records on the calling thread.  The records are prepared
+    (place holders replaced, details moved) on the calling thread and formatted and written by a LogWriter.
+
+    Used instead of CoreLoggerHandler if the LOG_ASYNC environment variable is "true".  All the handlers share
+    one writer by default so the records are written in order.
+
+    The details are formatted later, so a details dictionary is copied when the record is queued.  Only the
+    top level is copied: don't change nested values of the details after logging them.  LazyDetails are built
+    when the record is queued.
+
+    Args:
+        name (str): The name of the handler.
+        writer (LogWriter | None, optional): The writer. Defaults to the shared writer.
+        **kwargs: Additional keyword arguments to pass to the handler.
+    """
+
+    def __init__(self, name: str, writer: LogWriter | None = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.writer = writer or get_log_writer()
+
+    def emit(self, record) -> None:
+        try:
+            self.prepare(record)
+
+            details = getattr(record, L_DETAILS, None)
+            if isinstance(details, dict):
+                setattr(record, L_DETAILS, dict(details))
+
+            # The traceback keeps the frames alive until the record is written
+            if record.exc_info:
+                if not record.exc_text:
+                    record.exc_text = (
+                        self.formatter or logging.Formatter()
+                    ).formatException(record.exc_info)
+                record.exc_info = None
+
+            self.writer.put(self, record)
+
+        except Exception as e:
+            print(f"Error writing to log file: {str(e)}")
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+
 class CoreLogger(logging.Logger):
     """
     CoreLogger is a special logger that is designed to work with the standard python logger but provides some additional features.
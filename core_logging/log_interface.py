@@ -1,24 +1,36 @@
 """ This module provides the log helper functions for the core_logging library. Such as log.debug, log.error, log.warning, log.warn, log.fatal, log.critical, log.info, log.trace, log.message, etc.
 """
 
-import inspect
+import functools
 from threading import local
 import os
+import sys
 
 import logging
 
 from .log_classes import (
     CoreLogger,
     CoreLoggerHandler,
+    QueuedCoreLoggerHandler,
     CoreLogTextFormatter,
     CoreLogJsonFormatter,
-    L_IDENTITY,
     DEFAULT_DATE_FORMAT,
     DEFAULT_LOG_FORMAT,
     ENV_LOG_JSON,
     ENV_LOG_LEVEL,
     ENV_LOG_DIR,
+    ENV_LOG_ASYNC,
+    L_IDENTITY as _L_IDENTITY,
+    MSG,
+    STATUS,
+    TRACE,
+    DEBUG,
     INFO,
+    WARNING,
+    ERROR,
+    CRITICAL,
+    FATAL,
+    flush_log_writers,
 )
 
 # Our custom levels were added when the "core_logging.log_classes" module was loaded in the imports above
@@ -34,6 +46,16 @@ _thread_local = local()
 _thread_local.default_identity = None
 _thread_local.identity = None
 
+# The loggers by identity and the level version they were set up for (see __caller_logger)
+_loggers: dict[str, tuple[CoreLogger, int]] = {}
+_level_version = 0
+
+# The levels set with setLevelForLogger()
+_logger_levels: dict[str, int] = {}
+
+# Messages below this level are not logged by any logger so they are skipped before looking at the caller
+_min_level: int = _log_level
+
 
 def getLevelName(level: int) -> str:
     """
@@ -104,6 +126,15 @@ def setLevel(level: int | str):
         level = getLevelFromName(level.upper())
 
     _log_level = level
+    __levels_changed()
+
+
+def __levels_changed():
+    """The loggers pick up the new levels the next time they are used."""
+    global _level_version, _min_level
+
+    _min_level = min([_log_level, *_logger_levels.values()])
+    _level_version += 1
 
 
 def setLevelForLogger(name: str, level: int | str):
@@ -136,8 +167,9 @@ def setLevelForLogger(name: str, level: int | str):
     """
     if isinstance(level, str):
         level = getLevelFromName(level.upper())
-    logger = getLogger(name)
-    logger.setLevel(level)
+    _logger_levels[name] = level
+    __levels_changed()
+    getLogger(name)
 
 
 def setup(identity: str):
@@ -220,7 +252,7 @@ def get_logger_identity(**kwargs: dict) -> str:
     module = kwargs.get("module", None)
     function = kwargs.get("function", None)
     identity = get_identity() or f"{module}.{function}" or "unknown"
-    return str(kwargs.get(L_IDENTITY, identity))
+    return str(kwargs.get(_L_IDENTITY, identity))
 
 
 def __get_formatter() -> logging.Formatter:
@@ -242,9 +274,13 @@ def __get_handlers(name, **kwargs) -> list[logging.Handler]:
 
     formatter = __get_formatter()
 
-    # Add a console handler
+    # Add a console handler.  Written by a background thread if LOG_ASYNC is set to true
     if os.getenv("CONSOLE_LOG", "true").lower() == "true":
-        console_hdlr = CoreLoggerHandler(name or "core")
+        console_hdlr: CoreLoggerHandler
+        if os.getenv(ENV_LOG_ASYNC, "false").lower() == "true":
+            console_hdlr = QueuedCoreLoggerHandler(name or "core")
+        else:
+            console_hdlr = CoreLoggerHandler(name or "core")
         console_hdlr.setFormatter(formatter)
         handlers.append(console_hdlr)
 
@@ -290,16 +326,89 @@ def getLogger(name: str | None, **kwargs) -> CoreLogger:
         for handler in __get_handlers(name, **kwargs):
             logger.addHandler(handler)
 
-    logger.setLevel(getLevel())
+    logger.setLevel(_logger_levels.get(name, getLevel()))  # type: ignore[arg-type]
 
     return logger
 
 
+def __caller_logger(kwargs: dict) -> CoreLogger:
+    """
+    Return the logger for the identity in kwargs, the thread's identity or else the module and function of the
+    caller of the log function.
+
+    The loggers are kept by identity.  getLogger() sets the level of the logger (and of its handlers) which
+    clears the level caches of all the loggers, so it is only called again after the levels changed.
+
+    Args:
+        kwargs (dict): The arguments of the log function
+
+    Returns:
+        CoreLogger: The logger
+    """
+    if _L_IDENTITY in kwargs:
+        identity = str(kwargs[_L_IDENTITY])
+    else:
+        identity = get_identity()
+        if not identity:
+            # The caller of the log function.  Cheaper than inspect.getmodule()
+            frame = sys._getframe(2)
+            identity = "{}.{}".format(
+                frame.f_globals.get("__name__", "Unknown"), frame.f_code.co_name
+            )
+
+    entry = _loggers.get(identity)
+    if entry is not None and entry[1] == _level_version:
+        return entry[0]
+
+    version = _level_version
+    logger = getLogger(identity)
+    _loggers[identity] = (logger, version)
+    return logger
+
+
+def flush(timeout: float | None = None):
+    """
+    Wait until the log messages queued for the background writer (LOG_ASYNC=true) are written.
+
+    Call this before a Lambda handler returns.  The execution environment is frozen between invocations so the
+    queued messages would only be written on the next invocation (or never).
+
+    Args:
+        timeout (float | None, optional): The maximum number of seconds to wait. Defaults to None (no limit).
+    """
+    flush_log_writers(timeout)
+
+
+def flush_on_exit(func):
+    """
+    Decorator that flushes the queued log messages when the function returns or raises.
+
+    .. code-block:: python
+
+        @log.flush_on_exit
+        def handler(event, context):
+            ...
+
+    Args:
+        func (Callable): The function (e.g. a Lambda handler)
+
+    Returns:
+        Callable: The wrapped function
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flush()
+
+    return wrapper
+
+
 def get_caller_info():
-    frame = inspect.currentframe()
-    caller_frame = frame.f_back.f_back  # Go back two frames to get the caller
-    module = inspect.getmodule(caller_frame)
-    module_name = module.__name__ if module else "Unknown"
+    caller_frame = sys._getframe(2)  # Go back two frames to get the caller
+    module_name = caller_frame.f_globals.get("__name__", "Unknown")
     function_name = caller_frame.f_code.co_name
     filename = caller_frame.f_code.co_filename
     lineno = caller_frame.f_lineno
@@ -317,10 +426,9 @@ def log(level: int, message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if level < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.log(level, message, *args, **kwargs)
 
 
@@ -334,10 +442,9 @@ def msg(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if MSG < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.msg(message, *args, **kwargs)
 
 
@@ -351,10 +458,9 @@ def trace(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if TRACE < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.trace(message, *args, **kwargs)
 
 
@@ -368,10 +474,9 @@ def debug(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if DEBUG < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.debug(message, *args, **kwargs)
 
 
@@ -385,10 +490,9 @@ def critical(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if CRITICAL < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.critical(message, *args, **kwargs)
 
 
@@ -402,10 +506,9 @@ def fatal(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if FATAL < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.fatal(message, *args, **kwargs)
 
 
@@ -419,10 +522,9 @@ def error(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if ERROR < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.error(message, *args, **kwargs)
 
 
@@ -436,10 +538,9 @@ def info(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if INFO < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.info(message, *args, **kwargs)
 
 
@@ -453,10 +554,9 @@ def warn(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if WARNING < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.warning(message, *args, **kwargs)
 
 
@@ -470,10 +570,9 @@ def warning(message: str | dict | None = None, *args, **kwargs):
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if WARNING < _min_level:
+        return
+    logger = __caller_logger(kwargs)
     logger.warning(message, *args, **kwargs)
 
 
@@ -488,10 +587,9 @@ def status(code: str | int | None = None, reason: str | None = None, *args, **kw
         args (tuple): values used to replace the %s place holders in the message.
         kwargs: Name/Value pairs that will be added to the output. Defaults to None.
     """
-    module_name, function_name, _, _ = get_caller_info()
-    logger = getLogger(
-        get_logger_identity(module=module_name, function=function_name, **kwargs)
-    )
+    if STATUS < _min_level:
+        return
+    logger = __caller_logger(kwargs)
 
     reason = "" if reason is None else reason
 
@@ -4,6 +4,14 @@ General compiler framework for Jinja2.  Should be hable to handle CloudFormation
 """
 
 from .renderer import Jinja2Renderer
+from .incremental import RenderManifest, MANIFEST_FILE
+from .tracing import ContextTrace
 from .monkeypatch import patch_the_monkeys
 
-__all__ = ["Jinja2Renderer", "patch_the_monkeys"]
+__all__ = [
+    "Jinja2Renderer",
+    "RenderManifest",
+    "MANIFEST_FILE",
+    "ContextTrace",
+    "patch_the_monkeys",
+]
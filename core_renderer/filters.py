@@ -1,13 +1,12 @@
 from typing import Any
+from collections.abc import Mapping
 
 import copy
 import jinja2
-import jmespath
 import re
 import yaml
 import random
 import string
-import netaddr
 
 from datetime import date
 
@@ -136,6 +135,7 @@ def filter_ensure_list(object: Any) -> list[Any]:
 
 
 def filter_extract(object: Any, path: str, default: str = "_error_") -> str:
+    import jmespath
 
     value = (
         None
@@ -293,7 +293,7 @@ def filter_ip_rules(  # noqa C901
                 sources = [
                     o
                     for o in facts["SecurityAliases"][security_source]
-                    if isinstance(o, dict)
+                    if isinstance(o, Mapping)
                 ]
             elif security_source in app:
                 # Source is component
@@ -325,7 +325,7 @@ def filter_ip_rules(  # noqa C901
                 map(
                     lambda source: (
                         source
-                        if isinstance(source, dict)
+                        if isinstance(source, Mapping)
                         else {
                             "Type": ST_CIDR,
                             "Value": source,
@@ -637,7 +637,8 @@ def filter_split_cidr(
     cidr: str, allowed_prefix_lengths: list[int] = [8, 16, 24, 32]
 ) -> list[str]:
 
-    # Load the CIDR using netaddr
+    # Load the CIDR using netaddr.  Imported here as most templates never split a CIDR.
+    import netaddr
 
     try:
         ip = netaddr.IPNetwork(cidr)
@@ -797,6 +798,9 @@ def filter_to_yaml(data: Any) -> Any:
     if isinstance(data, jinja2.Undefined):
         return data
 
+    if isinstance(data, util.LayeredView):
+        data = data.to_dict()
+
     dumped = yaml.safe_dump(data, default_flow_style=False)
 
     dumped = re.sub(r"\n...\n$", "\n", dumped)
@@ -916,9 +920,21 @@ def load_filters(environment: Environment):
     environment.filters["to_yaml"] = filter_to_yaml
     environment.filters["policy_statements"] = filter_policy_statements
 
+    # The builtin tojson filter serializes the mappings that are not dicts (e.g. a LayeredView) as dicts
+    environment.policies["json.dumps_kwargs"] = {
+        "sort_keys": True,
+        "default": __json_default,
+    }
+
     # Globals
     environment.globals["raise"] = raise_exception
 
 
+def __json_default(o: Any) -> Any:
+    if isinstance(o, Mapping):
+        return dict(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
 def raise_exception(message):
     raise Exception(message)  # NOSONAR: python:S112
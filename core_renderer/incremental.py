@@ -0,0 +1,257 @@
+"""
+Incremental rendering.  Skip the files that would render the same as the last compile.
+
+For each rendered file the :class:`RenderManifest` records a fingerprint of the template source (and of the
+templates it includes, imports or extends) and a fingerprint of each context key path the template read while
+it was rendered (see :mod:`core_renderer.tracing`).  On the next compile a file is only rendered again if one
+of those changed.  The manifest is saved next to the rendered files (see :data:`MANIFEST_FILE`) and is used
+when the :attr:`PackageDetails.CompileMode` is "incremental":
+
+.. code-block:: python
+
+    manifest = None
+    if package_details.CompileMode == V_INCREMENTAL:
+        manifest = RenderManifest.load(os.path.join(output_dir, MANIFEST_FILE))
+
+    # Only the changed files are returned
+    files = renderer.render_files("files", context, manifest=manifest)
+
+    if manifest is not None:
+        manifest.save(os.path.join(output_dir, MANIFEST_FILE))
+
+Templates that use a filter or global that doesn't only depend on its arguments (e.g. format_date) or that
+include a template whose name is computed are always rendered.
+
+"""
+
+from typing import Any
+from collections.abc import Mapping
+
+import hashlib
+import os
+import tempfile
+
+import jinja2
+import jinja2.meta
+from jinja2 import nodes
+
+import core_framework as util
+
+from .tracing import ContextTrace, dependency_fingerprint
+
+MANIFEST_FILE = ".render-manifest.json"
+""" The name of the manifest file saved next to the rendered files """
+
+MANIFEST_VERSION = 2
+""" The format of the manifest.  A manifest with another version is ignored """
+
+VOLATILE_FILTERS = ("format_date",)
+""" Filters that can return something different for the same arguments """
+
+VOLATILE_GLOBALS = ("lipsum",)
+""" Globals that can return something different for the same arguments """
+
+
+class RenderManifest:
+    """
+    The fingerprints of the files rendered by the last compile.
+
+    Each entry is keyed by the path of the rendered file and has the fingerprint of the templates ("Template")
+    and the key path, kind and fingerprint of each dependency of the ContextTrace ("Context").
+
+    Args:
+        files (dict[str, dict] | None, optional): The entries. Defaults to None.
+    """
+
+    def __init__(self, files: dict[str, dict] | None = None):
+        self.files: dict[str, dict] = files or {}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RenderManifest":
+        """
+        Create the manifest from the result of to_dict().  A manifest written by another version of the
+        renderer is ignored, so every file is rendered.
+
+        Args:
+            data (dict[str, Any]): The manifest data
+
+        Returns:
+            RenderManifest: The manifest
+        """
+        if (
+            data.get("Version") != MANIFEST_VERSION
+            or data.get("Renderer") != util.get_version()
+        ):
+            return cls()
+        return cls(dict(data.get("Files") or {}))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "Version": MANIFEST_VERSION,
+            "Renderer": util.get_version(),
+            "Files": self.files,
+        }
+
+    @classmethod
+    def load(cls, fn: str) -> "RenderManifest":
+        """
+        Load the manifest saved by the last compile.
+
+        Args:
+            fn (str): The manifest file
+
+        Returns:
+            RenderManifest: The manifest or an empty one if the file doesn't exist or can't be read
+        """
+        try:
+            with open(fn, "r", encoding="utf-8") as f:
+                data = util.read_json(f, parse_dates=False)
+        except (OSError, ValueError):
+            return cls()
+        return cls.from_dict(data) if isinstance(data, dict) else cls()
+
+    def save(self, fn: str) -> None:
+        """
+        Save the manifest.  The file is replaced in one step so an interrupted compile can't leave half a
+        manifest (which would skip files that were not rendered).
+
+        Args:
+            fn (str): The manifest file
+        """
+        dirname = os.path.dirname(fn) or "."
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                util.write_json(self.to_dict(), f)
+            os.replace(tmp, fn)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def is_unchanged(
+        self,
+        short_path: str,
+        template_fingerprint: str | None,
+        context: Mapping[str, Any],
+        values: dict[tuple, str | None],
+    ) -> bool:
+        """
+        Check if the file would render the same as the last compile.
+
+        Args:
+            short_path (str): The path of the rendered file
+            template_fingerprint (str | None): The fingerprint of the templates or None if they must always
+                be rendered
+            context (Mapping[str, Any]): The variables
+            values (dict[tuple, str | None]): The fingerprints of the dependencies already calculated by
+                (path, kind).  Updated.
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        entry = self.files.get(short_path)
+        if (
+            entry is None
+            or template_fingerprint is None
+            or entry.get("Template") != template_fingerprint
+        ):
+            return False
+
+        for path, kind, fingerprint in entry.get("Context", []):
+            key = (tuple(path), kind)
+            if key not in values:
+                values[key] = dependency_fingerprint(context, key[0], kind)
+            if values[key] != fingerprint:
+                return False
+
+        return True
+
+    def record(
+        self,
+        short_path: str,
+        template_fingerprint: str | None,
+        context: Mapping[str, Any],
+        trace: ContextTrace,
+        values: dict[tuple, str | None],
+    ) -> None:
+        """
+        Record the fingerprints of a rendered file.
+
+        Args:
+            short_path (str): The path of the rendered file
+            template_fingerprint (str | None): The fingerprint of the templates
+            context (Mapping[str, Any]): The variables
+            trace (ContextTrace): What the template read from the context
+            values (dict[tuple, str | None]): The fingerprints of the dependencies already calculated by
+                (path, kind).  Updated.
+        """
+        if template_fingerprint is None:
+            self.files.pop(short_path, None)
+            return
+
+        dependencies = []
+        for key in trace.dependencies():
+            if key not in values:
+                values[key] = dependency_fingerprint(context, key[0], key[1])
+            dependencies.append([list(key[0]), key[1], values[key]])
+
+        self.files[short_path] = {
+            "Template": template_fingerprint,
+            "Context": dependencies,
+        }
+
+    def retain(self, short_paths: set[str]) -> None:
+        """
+        Forget the files that are no longer rendered.
+
+        Args:
+            short_paths (set[str]): The paths of the files that are rendered
+        """
+        for short_path in [p for p in self.files if p not in short_paths]:
+            del self.files[short_path]
+
+
+def template_fingerprint(
+    env: jinja2.Environment, name: str, parsed: dict[str, tuple[str, list, bool]]
+) -> str | None:
+    """
+    Return the fingerprint of a template and of the templates it includes, imports or extends.
+
+    Args:
+        env (jinja2.Environment): The environment of the renderer
+        name (str): The name of the template
+        parsed (dict[str, tuple[str, list, bool]]): The source, the referenced templates and if it is volatile
+            of the templates already parsed.  Updated.
+
+    Returns:
+        str | None: The fingerprint or None if the template must always be rendered
+    """
+    digest = hashlib.sha256()
+    seen: set[str] = set()
+    stack = [name]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+
+        if current not in parsed:
+            assert env.loader is not None
+            source, _, _ = env.loader.get_source(env, current)
+            ast = env.parse(source, current)
+            volatile = any(
+                n.name in VOLATILE_FILTERS for n in ast.find_all(nodes.Filter)
+            ) or any(n.name in VOLATILE_GLOBALS for n in ast.find_all(nodes.Name))
+            references = list(jinja2.meta.find_referenced_templates(ast))
+            parsed[current] = (source, references, volatile)
+
+        source, references, volatile = parsed[current]
+        if volatile or None in references:
+            return None
+
+        digest.update(current.encode("utf-8", "surrogatepass") + b"\0")
+        digest.update(source.encode("utf-8", "surrogatepass") + b"\0")
+        stack.extend(sorted(set(references), reverse=True))
+
+    return digest.hexdigest()
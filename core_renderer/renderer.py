@@ -2,16 +2,52 @@
 This module contains the Jinja2Renderer class which is used to render Jinja2 CloudFormation templates within the Core Automation context.
 """
 
-from typing import Any
+from typing import Any, Iterator
+from collections import ChainMap, OrderedDict
 from collections.abc import Mapping
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 
 import jinja2
 import core_logging as log
+import hashlib
 import os
 import pathlib
 import json
+import multiprocessing
+import threading
+
+from core_framework.constants import ENV_TEMPLATE_CACHE_DIR, ENV_RENDER_MAX_WORKERS
 
 from .filters import load_filters
+from .incremental import RenderManifest, template_fingerprint
+from .tracing import ContextTrace, TracingContext, tracing_environment
+
+TEMPLATE_CACHE_SIZE = (
+    256  # The number of compiled string templates kept by each renderer
+)
+
+
+class _BytecodeCache(jinja2.FileSystemBytecodeCache):
+    """A FileSystemBytecodeCache that counts the templates it had (hits) and didn't have (misses)"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def load_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
 
 
 class Jinja2Renderer:
@@ -32,11 +68,28 @@ class Jinja2Renderer:
     # If loading from filesystem
     template_path: str | None = None
 
+    # Compiled file templates kept between runs
+    bytecode_cache: _BytecodeCache | None = None
+
     def __init__(
         self,
         template_path: str | None = None,
         dictionary: Mapping[str, str] | None = None,
+        cache_size: int = TEMPLATE_CACHE_SIZE,
+        bytecode_cache_dir: str | None = None,
     ):
+        """
+        Create the renderer.
+
+        Args:
+            template_path (str | None, optional): The folder of the file templates. Defaults to None.
+            dictionary (Mapping[str, str] | None, optional): The file templates by name if there is no
+                template_path. Defaults to None.
+            cache_size (int, optional): The number of compiled string templates to keep.
+                Defaults to TEMPLATE_CACHE_SIZE.
+            bytecode_cache_dir (str | None, optional): The folder where the compiled file templates are kept
+                between runs.  Defaults to the TEMPLATE_CACHE_DIR environment variable or not kept.
+        """
         loader: jinja2.BaseLoader
         if template_path is not None:
             self.template_path = template_path
@@ -47,6 +100,10 @@ class Jinja2Renderer:
         else:
             loader = jinja2.DictLoader({})
 
+        bytecode_cache_dir = bytecode_cache_dir or os.getenv(ENV_TEMPLATE_CACHE_DIR)
+        if bytecode_cache_dir:
+            self.bytecode_cache = _BytecodeCache(bytecode_cache_dir)
+
         self.env = jinja2.Environment(
             autoescape=False,
             loader=loader,
@@ -54,29 +111,173 @@ class Jinja2Renderer:
             trim_blocks=True,
             lstrip_blocks=True,
             undefined=jinja2.StrictUndefined,
+            bytecode_cache=self.bytecode_cache,
         )
 
         load_filters(self.env)
 
-    def render_string(self, string: str, context: dict[str, Any]) -> str:
-        return self.env.from_string(string).render(context)
+        # Compiled string templates by the hash of their source (least recently used first)
+        self._templates: OrderedDict[bytes, jinja2.Template] = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        # Created for the first traced render
+        self._tracing_env: jinja2.Environment | None = None
+
+    def from_string(self, string: str) -> jinja2.Template:
+        """
+        Return the compiled template for the source.  Templates are only compiled the first time they are seen.
+
+        Args:
+            string (str): The template source
+
+        Returns:
+            jinja2.Template: The compiled template
+        """
+        key = hashlib.sha256(string.encode("utf-8", "surrogatepass")).digest()
+
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self._hits += 1
+                return template
+            self._misses += 1
+
+        template = self.env.from_string(string)
+
+        if self._cache_size > 0:
+            with self._lock:
+                self._templates[key] = template
+                while len(self._templates) > self._cache_size:
+                    self._templates.popitem(last=False)
+
+        return template
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return the template cache statistics.
 
-    def render_object(self, data: str, context: dict[str, Any]) -> dict | None:
+        Returns:
+            dict[str, Any]: The number of compiled string templates (size), the cache hits and misses, and the
+                bytecode cache directory and its hits and misses
+        """
+        with self._lock:
+            return {
+                "size": len(self._templates),
+                "max_size": self._cache_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bytecode_cache_dir": (
+                    self.bytecode_cache.directory if self.bytecode_cache else None
+                ),
+                "bytecode_hits": self.bytecode_cache.hits if self.bytecode_cache else 0,
+                "bytecode_misses": (
+                    self.bytecode_cache.misses if self.bytecode_cache else 0
+                ),
+            }
+
+    def render_string(self, string: str, context: Mapping[str, Any]) -> str:
+        return self._render(self.from_string(string), context)
+
+    def render_object(self, data: str, context: Mapping[str, Any]) -> dict | None:
         try:
             return json.loads(self.render_string(json.dumps(data), context))
         except json.JSONDecodeError:
             return None
 
-    def render_file(self, path: str, context: dict[str, Any]) -> str:
+    def render_file(self, path: str, context: Mapping[str, Any]) -> str:
         template = self.env.get_template(path)
-        return template.render(context)
+        return self._render(template, context)
+
+    def trace_string(
+        self, string: str, context: Mapping[str, Any]
+    ) -> tuple[str, ContextTrace]:
+        """
+        Render the template and record the key paths it read from the context.  See
+        :mod:`core_renderer.tracing`.
+
+        Args:
+            string (str): The template source
+            context (Mapping[str, Any]): The variables
+
+        Returns:
+            tuple[str, ContextTrace]: The rendered template (the same as render_string) and what it read
+        """
+        trace = ContextTrace()
+        template = self._tracing_environment().from_string(string)
+        return self._render(template, TracingContext(context, trace)), trace
+
+    def trace_file(
+        self, path: str, context: Mapping[str, Any]
+    ) -> tuple[str, ContextTrace]:
+        """
+        Render the file and record the key paths it read from the context.  See :mod:`core_renderer.tracing`.
+
+        Args:
+            path (str): The path of the template relative to the template folder
+            context (Mapping[str, Any]): The variables
+
+        Returns:
+            tuple[str, ContextTrace]: The rendered file (the same as render_file) and what it read
+        """
+        trace = ContextTrace()
+        template = self._tracing_environment().get_template(path)
+        return self._render(template, TracingContext(context, trace)), trace
+
+    def _tracing_environment(self) -> jinja2.Environment:
+        with self._lock:
+            if self._tracing_env is None:
+                self._tracing_env = tracing_environment(self.env)
+            return self._tracing_env
+
+    def _render(self, template: jinja2.Template, context: Mapping[str, Any]) -> str:
+        """
+        Render the template.
 
-    def render_files(self, path: str, context: dict[str, Any]) -> dict[str, str]:
+        The context can be any Mapping.  A lazy one like :class:`core_framework.merge.LayeredView` is used as it
+        is: Jinja2 only looks up the names the template uses, where template.render() would copy it into a dict.
+        Build the shared layers once and add the component layer for each render:
 
-        files: dict = {}
+        .. code-block:: python
+
+            base = LayeredView(client_facts, portfolio_facts, app_facts)
+            for component, facts in components.items():
+                files[component] = renderer.render_file(path, LayeredView(base, facts))
+
+        Args:
+            template (jinja2.Template): The template
+            context (Mapping[str, Any]): The variables
+
+        Returns:
+            str: The rendered template
+        """
+        if isinstance(context, dict):
+            return template.render(context)
+
+        # What template.render() does, without dict(context).  Jinja2 copies and writes to the first map
+        # when it rewrites the traceback of an error.
+        ctx = template.new_context(ChainMap({}, context, template.globals), shared=True)
+        try:
+            return template.environment.concat(template.root_render_func(ctx))  # type: ignore[attr-defined]
+        except Exception:
+            template.environment.handle_exception()
+
+    def list_files(self, path: str) -> list[tuple[str, str]]:
+        """
+        List the templates below the path of the template folder.
+
+        Args:
+            path (str): The path relative to the template folder
+
+        Returns:
+            list[tuple[str, str]]: The path of each file relative to the path and to the template folder, sorted
+        """
+        files: list[tuple[str, str]] = []
 
         if self.template_path is None:
-            log.warning("No template path set.  Cannot render files.")
             return files
 
         files_path = pathlib.Path(os.path.join(self.template_path, path))
@@ -95,14 +296,207 @@ class Jinja2Renderer:
             short_path = short_path.replace("\\", "/")
             renderer_path = renderer_path.replace("\\", "/")
 
-            # Load and render the files
+            files.append((short_path, renderer_path))
+
+        return sorted(files)
+
+    def iter_render_files(
+        self,
+        path: str,
+        context: Mapping[str, Any],
+        max_workers: int | None = None,
+        executor: str = "process",
+        ordered: bool = True,
+        manifest: RenderManifest | None = None,
+    ) -> Iterator[tuple[str, str]]:
+        """
+        Render the templates below the path and yield each one as soon as it is rendered, so uploading can
+        start before all the files are rendered.
+
+        With more than one worker the files are rendered by a pool:
+
+        * "process" - a process pool.  Each worker has its own renderer with the filters loaded.  The context
+          is sent to each worker once, so it must be picklable.  Lambda can't run a process pool (no /dev/shm).
+        * "thread" - a thread pool sharing this renderer.  Only helps if loading the templates is slow; the
+          rendering itself holds the GIL.
+
+        With a manifest (incremental compile) the files whose templates and context keys have the same
+        fingerprints as in the manifest are not rendered (or yielded), and the manifest is updated with the
+        fingerprints of the files that are.  See :mod:`core_renderer.incremental`.
+
+        Args:
+            path (str): The path relative to the template folder
+            context (Mapping[str, Any]): The variables
+            max_workers (int | None, optional): The number of files rendered at the same time.
+                Defaults to the RENDER_MAX_WORKERS environment variable or 1.
+            executor (str, optional): "process" or "thread". Defaults to "process".
+            ordered (bool, optional): Yield the files in the order of their path.  Otherwise in the order they
+                are rendered. Defaults to True.
+            manifest (RenderManifest | None, optional): The manifest of the last compile. Defaults to None
+                (render all the files).
+
+        Raises:
+            ValueError: If the executor is not "process" or "thread"
+
+        Returns:
+            Iterator[tuple[str, str]]: The path of each file relative to the path and the rendered file
+        """
+        if executor not in ("process", "thread"):
+            raise ValueError(
+                f"Unknown executor '{executor}'.  Use 'process' or 'thread'"
+            )
+
+        if self.template_path is None:
+            log.warning("No template path set.  Cannot render files.")
+            return
+
+        files = self.list_files(path)
+        max_workers = max_workers or int(os.getenv(ENV_RENDER_MAX_WORKERS, "1"))
+
+        # The fingerprints of the templates and of the context values, calculated once for all the files
+        fingerprints: dict[str, str | None] = {}
+        values: dict[tuple, str | None] = {}
+        if manifest is not None:
+            manifest.retain({short_path for short_path, _ in files})
+            parsed: dict[str, tuple[str, list, bool]] = {}
+            changed = []
+            for short_path, renderer_path in files:
+                fingerprints[short_path] = template_fingerprint(
+                    self.env, renderer_path, parsed
+                )
+                if manifest.is_unchanged(
+                    short_path, fingerprints[short_path], context, values
+                ):
+                    continue
+                # Forget the old fingerprints until the file is rendered
+                manifest.files.pop(short_path, None)
+                changed.append((short_path, renderer_path))
             log.debug(
-                "Rendering file '{}' with short_path '{}'", renderer_path, short_path
+                "Skipping {} unchanged files of {}",
+                len(files) - len(changed),
+                len(files),
+            )
+            files = changed
+
+        def result(short_path: str, rendered: Any) -> tuple[str, str]:
+            if manifest is None:
+                return short_path, rendered
+            text, trace = rendered
+            manifest.record(
+                short_path, fingerprints[short_path], context, trace, values
+            )
+            return short_path, text
+
+        trace = manifest is not None
+
+        if max_workers <= 1 or len(files) <= 1:
+            for short_path, renderer_path in files:
+                log.debug(
+                    "Rendering file '{}' with short_path '{}'",
+                    renderer_path,
+                    short_path,
+                )
+                if trace:
+                    rendered = self.trace_file(renderer_path, context)
+                else:
+                    rendered = self.render_file(renderer_path, context)
+                yield result(short_path, rendered)
+            return
+
+        pool: Executor
+        if executor == "process":
+            # Not fork.  Forking a process that has threads (logging, boto3) can deadlock the workers.
+            methods = multiprocessing.get_all_start_methods()
+            pool = ProcessPoolExecutor(
+                max_workers=min(max_workers, len(files)),
+                mp_context=multiprocessing.get_context(
+                    "forkserver" if "forkserver" in methods else "spawn"
+                ),
+                initializer=_init_worker,
+                initargs=(
+                    self.template_path,
+                    self.bytecode_cache.directory if self.bytecode_cache else None,
+                    context,
+                ),
             )
+        else:
+            pool = ThreadPoolExecutor(
+                max_workers=min(max_workers, len(files)), thread_name_prefix="render"
+            )
+
+        log.debug(
+            "Rendering {} files with {} {} workers",
+            len(files),
+            min(max_workers, len(files)),
+            executor,
+        )
+
+        try:
+            futures: dict[Future, str] = {}
+            for short_path, renderer_path in files:
+                if executor == "process":
+                    future = pool.submit(_render_in_worker, renderer_path, trace)
+                elif trace:
+                    future = pool.submit(self.trace_file, renderer_path, context)
+                else:
+                    future = pool.submit(self.render_file, renderer_path, context)
+                futures[future] = short_path
+
+            for future in futures if ordered else as_completed(futures):
+                yield result(futures[future], future.result())
+        finally:
+            # Don't render the rest if a file failed or the caller stopped
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def render_files(
+        self,
+        path: str,
+        context: Mapping[str, Any],
+        max_workers: int | None = None,
+        executor: str = "process",
+        manifest: RenderManifest | None = None,
+    ) -> dict[str, str]:
+        """
+        Render the templates below the path.
+
+        With a manifest only the files that changed since the last compile are rendered and returned.
+
+        Args:
+            path (str): The path relative to the template folder
+            context (Mapping[str, Any]): The variables
+            max_workers (int | None, optional): The number of files rendered at the same time.
+                Defaults to the RENDER_MAX_WORKERS environment variable or 1.
+            executor (str, optional): "process" or "thread".  See iter_render_files. Defaults to "process".
+            manifest (RenderManifest | None, optional): The manifest of the last compile.  Updated.
+                Defaults to None (render all the files).
+
+        Returns:
+            dict[str, str]: The rendered files by their path relative to the path, in order of the path
+        """
+        return dict(
+            self.iter_render_files(
+                path, context, max_workers, executor, manifest=manifest
+            )
+        )
+
+
+# The renderer of a process pool worker
+_worker_renderer: Jinja2Renderer | None = None
+_worker_context: Mapping[str, Any] = {}
+
 
-            rendered_template = self.render_file(renderer_path, context)
+def _init_worker(
+    template_path: str, bytecode_cache_dir: str | None, context: Mapping[str, Any]
+) -> None:
+    global _worker_renderer, _worker_context
+    _worker_renderer = Jinja2Renderer(
+        template_path, bytecode_cache_dir=bytecode_cache_dir
+    )
+    _worker_context = context
 
-            # Save the rendered file into our dictionary
-            files[short_path] = rendered_template
 
-        return files
+def _render_in_worker(renderer_path: str, trace: bool = False) -> Any:
+    assert _worker_renderer is not None
+    if trace:
+        return _worker_renderer.trace_file(renderer_path, _worker_context)
+    return _worker_renderer.render_file(renderer_path, _worker_context)
@@ -0,0 +1,330 @@
+"""
+Context access tracing.  Find out which parts of the context a template reads.
+
+:meth:`Jinja2Renderer.trace_file` and :meth:`Jinja2Renderer.trace_string` render the template with the context
+wrapped in a :class:`TracingContext`.  Every key path the template reads is recorded in a :class:`ContextTrace`,
+with what was used:
+
+* "present" - only if the key exists (``'Zone' in context`` or ``Zone is defined``)
+* "type" - a mapping that was looked into.  Its keys are recorded separately.
+* "keys" - the keys of a mapping, in order (``{% for key in Zone %}``)
+* "value" - the whole value
+
+.. code-block:: python
+
+    text, trace = renderer.trace_file("files/vpc.yaml.j2", context)
+    trace.report()  # {"App": "value", "Zone": "type", "Zone.Region": "value", ...}
+    key = trace.fingerprint(context)  # Changes only if something the template read changed
+
+Mappings are traced down to their keys.  Anything else (lists, strings...) is recorded as a whole.  The filters
+that understand traced mappings (:data:`TRACED_FILTERS`) get them, so the keys they read are recorded too.
+The other filters get the original values, recorded as a whole.
+
+"""
+
+from typing import Any, Iterator
+from collections.abc import Mapping
+
+import functools
+import hashlib
+
+import jinja2
+
+import core_framework as util
+
+PRESENT = "present"
+""" Only the presence of the key was checked """
+TYPE = "type"
+""" A mapping that was looked into """
+KEYS = "keys"
+""" The keys of a mapping """
+VALUE = "value"
+""" The whole value """
+
+# A kind includes the ones before it
+KINDS = (PRESENT, TYPE, KEYS, VALUE)
+
+TRACED_FILTERS = ("lookup", "tags", "ip_rules")
+""" Filters that read the context and their arguments the same way with traced mappings.  Not extract:
+JMESPath functions (keys(@), to_string(@)...) only work with dicts and lists. """
+
+
+def fingerprint_value(value: Any) -> str:
+    """
+    Return the fingerprint of a context value.
+
+    Args:
+        value (Any): The value
+
+    Returns:
+        str: The SHA256 of the JSON of the value (or of its repr if it can't be converted to JSON)
+    """
+    try:
+        data = util.to_json(value)
+    except (TypeError, ValueError):
+        data = repr(value)
+    return hashlib.sha256(data.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def format_path(path: tuple) -> str:
+    """
+    Format a key path for a report.
+
+    Args:
+        path (tuple): The keys
+
+    Returns:
+        str: The keys separated by dots or "*" for the keys of the context itself
+    """
+    return ".".join(str(key) for key in path) if path else "*"
+
+
+def resolve_path(context: Mapping[str, Any], path: tuple) -> tuple[bool, Any]:
+    """
+    Look up a key path in the context.
+
+    Args:
+        context (Mapping[str, Any]): The variables
+        path (tuple): The keys
+
+    Returns:
+        tuple[bool, Any]: True and the value or False and None if it is not in the context
+    """
+    value: Any = context
+    for key in path:
+        if not isinstance(value, Mapping) or key not in value:
+            return False, None
+        value = value[key]
+    return True, value
+
+
+def dependency_fingerprint(
+    context: Mapping[str, Any], path: tuple, kind: str
+) -> str | None:
+    """
+    Return the fingerprint of what was read at a key path.
+
+    Args:
+        context (Mapping[str, Any]): The variables
+        path (tuple): The keys
+        kind (str): What was read.  PRESENT, TYPE, KEYS or VALUE.
+
+    Returns:
+        str | None: The fingerprint or None if the path is not in the context
+    """
+    found, value = resolve_path(context, path)
+    if not found:
+        return None
+    if kind == PRESENT:
+        return PRESENT
+    if kind == TYPE and isinstance(value, Mapping):
+        return TYPE
+    if kind == KEYS and isinstance(value, Mapping):
+        return fingerprint_value(list(value))
+    return fingerprint_value(value)
+
+
+class ContextTrace:
+    """
+    The key paths a template read from the context.  See :mod:`core_renderer.tracing`.
+
+    Paths are tuples of keys.  The empty path is the context itself.
+    """
+
+    def __init__(self):
+        self.paths: dict[tuple, str] = {}
+
+    def record(self, path: tuple, kind: str) -> None:
+        current = self.paths.get(path)
+        if current is None or KINDS.index(kind) > KINDS.index(current):
+            self.paths[path] = kind
+
+    def dependencies(self) -> list[tuple[tuple, str]]:
+        """
+        Return the paths the output depends on, without the paths below a path read as a whole.
+
+        Returns:
+            list[tuple[tuple, str]]: The path and what was read, sorted by path
+        """
+        result = []
+        for path, kind in self.paths.items():
+            if any(self.paths.get(path[:i]) == VALUE for i in range(len(path))):
+                continue
+            result.append((path, kind))
+        return sorted(result, key=lambda item: [str(key) for key in item[0]])
+
+    def report(self) -> dict[str, str]:
+        """
+        Return the dependencies for a human.
+
+        Returns:
+            dict[str, str]: What was read by the dotted key path
+        """
+        return {format_path(path): kind for path, kind in self.dependencies()}
+
+    def fingerprint(self, context: Mapping[str, Any]) -> str:
+        """
+        Return a fingerprint of the parts of the context the template read, e.g. to use in a cache key.  It
+        is the same for any context that renders the template the same way.
+
+        Args:
+            context (Mapping[str, Any]): The variables
+
+        Returns:
+            str: The fingerprint
+        """
+        digest = hashlib.sha256()
+        for path, kind in self.dependencies():
+            fingerprint = dependency_fingerprint(context, path, kind)
+            digest.update(
+                util.to_json([list(path), kind, fingerprint]).encode(
+                    "utf-8", "surrogatepass"
+                )
+            )
+        return digest.hexdigest()
+
+
+class _TracedMapping(Mapping):
+    """A read-only view of a mapping of the context that records the keys that are read"""
+
+    # Not names a template would use as keys (Jinja2 tries the attribute first)
+    __slots__ = ("_traced_source", "_traced_path", "_traced_by")
+
+    def __init__(self, source: Mapping, path: tuple, trace: ContextTrace):
+        self._traced_source = source
+        self._traced_path = path
+        self._traced_by = trace
+
+    def __getitem__(self, key: Any) -> Any:
+        path = self._traced_path + (key,)
+        try:
+            value = self._traced_source[key]
+        except KeyError:
+            self._traced_by.record(path, VALUE)
+            raise
+        if isinstance(value, Mapping):
+            self._traced_by.record(path, TYPE)
+            return _TracedMapping(value, path, self._traced_by)
+        self._traced_by.record(path, VALUE)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        self._traced_by.record(self._traced_path + (key,), PRESENT)
+        return key in self._traced_source
+
+    def __iter__(self) -> Iterator:
+        self._traced_by.record(self._traced_path, KEYS)
+        return iter(self._traced_source)
+
+    def __len__(self) -> int:
+        self._traced_by.record(self._traced_path, KEYS)
+        return len(self._traced_source)
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. copy() or LayeredView.to_dict()
+        if name.startswith("_"):
+            raise AttributeError(name)
+        value = getattr(self._traced_source, name)
+        self._traced_by.record(self._traced_path, VALUE)
+        return value
+
+    def __repr__(self) -> str:
+        self._traced_by.record(self._traced_path, VALUE)
+        return repr(self._traced_source)
+
+
+class TracingContext(_TracedMapping):
+    """
+    The context of a traced render.  Records the keys read in the trace.
+
+    Args:
+        context (Mapping[str, Any]): The variables
+        trace (ContextTrace): Where the keys are recorded
+    """
+
+    __slots__ = ()
+
+    def __init__(self, context: Mapping[str, Any], trace: ContextTrace):
+        super().__init__(context, (), trace)
+
+
+def untrace(value: Any) -> Any:
+    """
+    Return the original of a traced mapping and record it was read as a whole.  Traced mappings in lists,
+    tuples and dicts (e.g. built by the template) are replaced too.
+
+    Args:
+        value (Any): The value
+
+    Returns:
+        Any: The original value
+    """
+    if isinstance(value, _TracedMapping):
+        value._traced_by.record(value._traced_path, VALUE)
+        return value._traced_source
+    if type(value) is list or type(value) is tuple:
+        items = [untrace(item) for item in value]
+        return (
+            value if all(a is b for a, b in zip(items, value)) else type(value)(items)
+        )
+    if type(value) is dict:
+        items = [untrace(item) for item in value.values()]
+        if all(a is b for a, b in zip(items, value.values())):
+            return value
+        return dict(zip(value.keys(), items))
+    return value
+
+
+class _UntracedContext:
+    """The render context given to a filter that doesn't understand traced mappings"""
+
+    def __init__(self, context: jinja2.runtime.Context):
+        self._context = context
+
+    def __getitem__(self, key: str) -> Any:
+        return untrace(self._context[key])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return untrace(self._context.get(key, default))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._context
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._context, name)
+
+
+def _untraced_filter(func: Any) -> Any:
+    """Wrap a filter so it gets the original values"""
+    pass_arg = getattr(func, "jinja_pass_arg", None)
+    pass_context = pass_arg is not None and pass_arg.name == "context"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if pass_context:
+            args = (_UntracedContext(args[0]), *(untrace(a) for a in args[1:]))
+        else:
+            args = tuple(untrace(a) for a in args)
+        return func(*args, **{k: untrace(v) for k, v in kwargs.items()})
+
+    return wrapper
+
+
+def tracing_environment(env: jinja2.Environment) -> jinja2.Environment:
+    """
+    Return an overlay of the environment for traced renders.  The filters that are not in TRACED_FILTERS are
+    wrapped so they get the original values, so tracing doesn't change the output.  The overlay has its own
+    template cache because the compiled templates are bound to their environment.
+
+    Args:
+        env (jinja2.Environment): The environment of the renderer
+
+    Returns:
+        jinja2.Environment: The overlay
+    """
+    overlay = env.overlay(cache_size=getattr(env.cache, "capacity", 400))
+    overlay.filters = {
+        name: func if name in TRACED_FILTERS else _untraced_filter(func)
+        for name, func in env.filters.items()
+    }
+    return overlay
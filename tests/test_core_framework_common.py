@@ -566,5 +566,52 @@ def test_is_local_mode():
     assert util.is_local_mode() is False
 
 
+def test_config_snapshot():
+
+    os.environ["CLIENT_REGION"] = "ap-southeast-1"
+    if "MASTER_REGION" in os.environ:
+        del os.environ["MASTER_REGION"]
+
+    config = util.get_config()
+    assert util.get_config() is config
+    assert util.get_config().master_region == "ap-southeast-1"
+
+    # Changing the environment automatically invalidates the snapshot
+    os.environ["MASTER_REGION"] = "eu-west-1"
+
+    assert util.get_config() is not config
+    assert util.get_config().master_region == "eu-west-1"
+
+    del os.environ["MASTER_REGION"]
+    del os.environ["CLIENT_REGION"]
+
+    config = util.get_config()
+    util.reset_config()
+    assert util.get_config() is not config
+
+
+def test_config_snapshot_creates_one_session():
+
+    util.reset_config()
+
+    with patch("boto3.session.Session") as mock_session:
+        mock_session.return_value.region_name = "us-east-1"
+
+        for _ in range(100):
+            TaskPayload.from_arguments(
+                task="deploy",
+                client="example_client",
+                portfolio="example_portfolio",
+                app="example_app",
+                branch="main_branch",
+                build="build-123",
+            )
+
+        # One session to validate the profile and one to read its region
+        assert mock_session.call_count <= 2
+
+    util.reset_config()
+
+
 if __name__ == "__main__":
     pytest.main()
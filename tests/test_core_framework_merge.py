@@ -0,0 +1,157 @@
+import pytest
+
+import core_framework as util
+from core_framework.merge import LayeredView
+
+
+@pytest.fixture
+def layers():
+    client = {
+        "Client": "my-client",
+        "Tags": {"Owner": "client", "CostCenter": "100"},
+        "Zone": {"Region": "us-east-1", "Subnets": ["a", "b"], "Kms": {"Key": "k1"}},
+        "Version": 1,
+    }
+    portfolio = {
+        "Tags": {"Owner": "portfolio"},
+        "Zone": {"Subnets": ["c"], "Kms": {"Alias": "alias/k"}},
+    }
+    app = {"Version": 2, "Zone": "not a dict", "App": {"Name": "my-app"}}
+    zone = {"Zone": {"Region": "ap-southeast-1"}, "Version": 2.0}
+    return client, portfolio, app, zone
+
+
+def test_deep_merge(layers):
+
+    client, portfolio, app, zone = layers
+
+    merged = util.deep_merge(client, portfolio)
+
+    assert merged == {
+        "Client": "my-client",
+        "Tags": {"Owner": "portfolio", "CostCenter": "100"},
+        "Zone": {
+            "Region": "us-east-1",
+            "Subnets": ["c"],
+            "Kms": {"Key": "k1", "Alias": "alias/k"},
+        },
+        "Version": 1,
+    }
+
+    # Nothing is shared with the layers
+    merged["Zone"]["Kms"]["Key"] = "k2"
+    merged["Tags"]["Owner"] = "me"
+    assert client["Zone"]["Kms"]["Key"] == "k1"
+    assert portfolio["Tags"]["Owner"] == "portfolio"
+
+    merged = util.deep_merge(client, portfolio, merge_lists=True)
+    assert merged["Zone"]["Subnets"] == ["a", "b", "c"]
+    merged["Zone"]["Subnets"].append("d")
+    assert client["Zone"]["Subnets"] == ["a", "b"]
+
+    merged = util.deep_merge(client, portfolio, should_merge=lambda key: key != "Owner")
+    assert merged["Tags"]["Owner"] == "client"
+
+    merged = util.deep_merge(client, portfolio, app, zone)
+    assert merged["Zone"] == {"Region": "ap-southeast-1"}
+    assert merged["Version"] == 2
+    assert type(merged["Version"]) is int
+
+    # Equal values are not replaced
+    assert type(util.deep_merge({"a": 1}, {"a": 1.0})["a"]) is int
+
+
+def test_deep_merge_shared(layers):
+
+    client, portfolio, app, zone = layers
+
+    for args in [(client, portfolio), (client, portfolio, app, zone)]:
+        for merge_lists in [True, False]:
+            assert util.deep_merge_shared(
+                *args, merge_lists=merge_lists
+            ) == util.deep_merge(*args, merge_lists=merge_lists)
+
+    before = util.deep_copy(layers)
+    merged = util.deep_merge_shared(client, portfolio)
+
+    # The layers are not modified and only the merged dictionaries are copied
+    assert layers == before
+    assert merged["Zone"] is not client["Zone"]
+    assert merged["Zone"]["Kms"] is not client["Zone"]["Kms"]
+    assert merged["Zone"]["Subnets"] is portfolio["Zone"]["Subnets"]
+
+    merged = util.deep_merge_shared(client, app)
+    assert merged["App"] is app["App"]
+    assert merged["Tags"] is client["Tags"]
+
+
+def test_layered_view(layers):
+
+    client, portfolio, app, zone = layers
+
+    for args in [(client, portfolio), (client, portfolio, app, zone)]:
+        for merge_lists in [True, False]:
+            view = LayeredView(*args, merge_lists=merge_lists)
+            expected = util.deep_merge(*args, merge_lists=merge_lists)
+            assert view == expected
+            assert list(view) == list(expected)
+            assert len(view) == len(expected)
+            assert view.to_dict() == expected
+            assert repr(view) == repr(expected)
+            assert str(view) == str(expected)
+
+    view = LayeredView(client, portfolio)
+
+    assert isinstance(view["Zone"], LayeredView)
+    assert view["Zone"]["Kms"]["Alias"] == "alias/k"
+    assert view["Zone"] is view["Zone"]
+    assert view["Tags"].get("CostCenter") == "100"
+    assert "Client" in view
+    assert "Nope" not in view
+    with pytest.raises(KeyError):
+        view["Nope"]
+
+    # Only one layer has it
+    assert LayeredView(client, app)["App"] is app["App"]
+
+    view = LayeredView(client, portfolio, should_merge=lambda key: key != "Owner")
+    assert view["Tags"]["Owner"] == "client"
+
+
+def test_deep_merge_references():
+
+    # Self-referential
+    layer: dict = {"Name": "layer", "Items": [1, 2]}
+    layer["Self"] = layer
+    layer["Items"].append(layer["Items"])
+
+    for merged in [util.deep_merge({"x": 1}, layer), util.deep_merge(layer)]:
+        assert merged["Self"] is not layer
+        assert merged["Self"]["Self"] is merged["Self"]
+        assert merged["Self"]["Items"][2] is merged["Self"]["Items"]
+        assert merged["Self"]["Items"] is not layer["Items"]
+
+    # Shared values are copied once
+    shared = {"Region": "us-east-1"}
+    merged = util.deep_merge({"x": 1}, {"A": shared, "B": {"C": shared}})
+    assert merged["A"] is merged["B"]["C"]
+    assert merged["A"] is not shared
+
+
+def test_deep_nesting():
+
+    depth = 5000
+
+    def nested(leaf):
+        d = {"leaf": leaf}
+        for i in range(depth):
+            d = {"level": d}
+        return d
+
+    merged = util.deep_merge(nested(1), nested(2))
+    shared = util.deep_merge_shared(nested(1), nested(2))
+    for _ in range(depth):
+        merged = merged["level"]
+        shared = shared["level"]
+    assert merged == {"leaf": 2}
+    assert shared == {"leaf": 2}
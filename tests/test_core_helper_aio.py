@@ -0,0 +1,102 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+import core_framework as util
+import core_helper.aio as aio
+import core_helper.aws as aws
+
+from core_framework.constants import TR_RESPONSE, TR_STATUS
+
+
+@pytest.fixture
+def mock_boto_session():
+    with patch("boto3.session.Session") as mock_boto_session:
+
+        mock_frozen_credentials = MagicMock()
+        mock_frozen_credentials.access_key = "mock_access_key"
+        mock_frozen_credentials.secret_key = "mock_secret_key"
+        mock_frozen_credentials.token = "mock_session_token"
+
+        mock_session_credentials = MagicMock()
+        mock_session_credentials.get_frozen_credentials.return_value = (
+            mock_frozen_credentials
+        )
+
+        mock_client = MagicMock()
+
+        mock_session = MagicMock()
+        mock_session.get_credentials.return_value = mock_session_credentials
+        mock_session.client.return_value = mock_client
+
+        mock_boto_session.return_value = mock_session
+
+        yield mock_boto_session, mock_client
+
+
+@pytest.fixture(autouse=True)
+def reset_aws_state():
+    aws.clear_client_cache()
+    util.reset_config()
+    yield
+    aws.clear_client_cache()
+    util.reset_config()
+
+
+@pytest.mark.asyncio
+async def test_get_client_shares_cache(mock_boto_session):
+
+    clients = await asyncio.gather(
+        *[aio.cfn_client(region="us-west-1") for _ in range(20)]
+    )
+
+    assert all(c is clients[0] for c in clients)
+    assert aws.get_client_cache_stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invoke_lambda(mock_boto_session):
+
+    mock_client = mock_boto_session[1]
+    mock_client.invoke.return_value = {
+        "StatusCode": 200,
+        "Payload": io.BytesIO(b'{"status": "success"}'),
+    }
+
+    arn = "arn:aws:lambda:us-east-1:123456789012:function:core-invoker"
+
+    result = await aio.invoke_lambda(arn, {"action": "example:action"})
+
+    assert result[TR_STATUS] == "ok"
+    assert result[TR_RESPONSE] == {"status": "success"}
+
+
+@pytest.mark.asyncio
+async def test_call_bounded_concurrency():
+
+    aio.set_max_concurrency(3)
+
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work(n):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return n
+
+    try:
+        results = await asyncio.gather(*[aio.call(work, n) for n in range(12)])
+    finally:
+        aio.set_max_concurrency(aio.DEFAULT_MAX_CONCURRENCY)
+
+    assert results == list(range(12))
+    assert peak[0] <= 3
@@ -2,9 +2,12 @@ from datetime import datetime, timezone
 import json
 import pytest
 from unittest.mock import patch, MagicMock
+import core_framework as util
 import core_helper.aws as aws
+from core_helper.cache import ClientCache
 import os
 import io
+import time
 
 from core_framework.constants import TR_RESPONSE, TR_STATUS
 
@@ -66,6 +69,12 @@ def reset_awshelper_state():
     # Reset the state of aws between tests
     aws.__session = None
     aws.__credentials = {}
+    aws.store.clear()
+    aws.clear_client_cache()
+    util.reset_config()
+    yield
+    # Don't leave values resolved from mocked sessions in the configuration snapshot
+    util.reset_config()
 
 
 @pytest.fixture
@@ -165,6 +174,48 @@ def test_invoke_lambda(mock_boto_session, real_aws):
     assert result[TR_RESPONSE]["code"] == 200
 
 
+def test_invoke_lambdas(mock_boto_session, real_aws):
+
+    if real_aws:
+        return
+
+    mock_client = mock_boto_session[1]
+
+    def invoke(FunctionName, Payload, InvocationType):
+        request = json.loads(Payload)
+        if request["n"] == 2:
+            raise Exception("boom")
+        data = json.dumps({"n": request["n"]}).encode("utf-8")
+        return {"StatusCode": 200, "Payload": io.BytesIO(data)}
+
+    mock_client.invoke.side_effect = invoke
+
+    arn = "arn:aws:lambda:us-east-1:123456789012:function:core-component-compiler"
+    invocations = [(arn, {"n": n}) for n in range(5)]
+
+    results = aws.invoke_lambdas(invocations, max_in_flight=2, timeout=30)
+
+    assert len(results) == 5
+    for n, result in enumerate(results):
+        if n == 2:
+            assert result[TR_STATUS] == "error"
+        else:
+            assert result[TR_STATUS] == "ok"
+            assert result[TR_RESPONSE] == {"n": n}
+
+    # Fire-and-forget invocations return 202 with an empty payload
+    mock_client.invoke.side_effect = None
+    mock_client.invoke.return_value = {"StatusCode": 202, "Payload": io.BytesIO(b"")}
+
+    results = aws.invoke_lambdas(invocations[:2], invocation_type="Event")
+
+    assert results == [
+        {TR_STATUS: "ok", TR_RESPONSE: None},
+        {TR_STATUS: "ok", TR_RESPONSE: None},
+    ]
+    assert mock_client.invoke.call_args.kwargs["InvocationType"] == "Event"
+
+
 def test_get_session_credentials(mock_boto_session, real_aws):
 
     credentials = aws.get_session_credentials()
@@ -217,6 +268,59 @@ def test_get_client(mock_boto_session, real_aws):
         assert mock_boto_session[0].called
 
 
+def test_get_client_cache(mock_boto_session, real_aws):
+
+    if real_aws:
+        return
+
+    client1 = aws.get_client("cloudformation", region="us-west-2")
+    client2 = aws.cfn_client(region="us-west-2")
+
+    assert client1 is client2
+
+    stats = aws.get_client_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_client_cache_eviction_and_expiry():
+
+    cache = ClientCache(max_size=2)
+
+    cache.get("a", lambda: "client-a")
+    cache.get("b", lambda: "client-b")
+    assert cache.get("a", lambda: "new-a") == "client-a"
+
+    # "b" is the least recently used and will be evicted
+    cache.get("c", lambda: "client-c")
+    assert cache.get("b", lambda: "new-b") == "new-b"
+
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+    # Credentials that have already expired are never served from the cache
+    cache.get("d", lambda: "client-d", expires_at=time.time() - 1)
+    assert cache.get("d", lambda: "new-d") == "new-d"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_get_credentials_expiration():
+
+    expiration = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    assert aws.get_credentials_expiration(None) is None
+    assert aws.get_credentials_expiration({"AccessKeyId": "a"}) is None
+    assert aws.get_credentials_expiration({"Expiration": expiration}) == (
+        expiration.timestamp()
+    )
+    assert aws.get_credentials_expiration({"Expiration": expiration.isoformat()}) == (
+        expiration.timestamp()
+    )
+
+
 def test_transform_stack_parameter_hash():
     keyvalues = {"Key1": "Value1", "Key2": "Value2"}
     result = aws.transform_stack_parameter_hash(keyvalues)
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from core_helper.cache import InsecureEnclave, ExpiringStorage
+from core_helper.enclave import SecureEnclave
+
+
+def test_expiring_storage_ttl():
+
+    storage = ExpiringStorage()
+
+    storage.set("a", "value-a", 0.05)
+    storage.set("b", "value-b", 60)
+
+    assert storage.get("a") == "value-a"
+
+    time.sleep(0.1)
+
+    assert storage.get("a") is None
+    assert storage.get("b") == "value-b"
+    assert len(storage) == 1
+
+
+def test_expiring_storage_overwrite_keeps_new_version():
+
+    storage = ExpiringStorage()
+
+    # The first version expires quickly.  Overwriting it must not let the old deadline delete the new value
+    storage.set("key", "old", 0.05)
+    storage.set("key", "new", 60)
+
+    time.sleep(0.1)
+
+    assert storage.get("key") == "new"
+
+
+def test_expiring_storage_lru_eviction():
+
+    storage = ExpiringStorage(max_entries=2)
+
+    storage.set("a", 1, 60)
+    storage.set("b", 2, 60)
+    assert storage.get("a") == 1
+
+    storage.set("c", 3, 60)
+
+    assert "b" not in storage
+    assert storage.get("a") == 1
+    assert storage.get("c") == 3
+
+
+def test_enclaves_do_not_create_threads():
+
+    insecure = InsecureEnclave()
+    secure = SecureEnclave()
+
+    thread_count = threading.active_count()
+
+    for i in range(100):
+        insecure.store_data(f"role-{i}", {"AccessKeyId": str(i)}, ttl=60)
+        secure.store_data(f"role-{i}", {"AccessKeyId": str(i)}, ttl=60)
+
+    assert threading.active_count() == thread_count
+
+    assert insecure.retrieve_data("role-42") == {"AccessKeyId": "42"}
+    assert secure.retrieve_data("role-42") == {"AccessKeyId": "42"}
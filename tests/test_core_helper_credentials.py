@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+from core_helper.cache import InsecureEnclave
+from core_helper.credentials import CredentialManager
+
+ROLE = "arn:aws:iam::123456789012:role/mock-role"
+
+
+def make_credentials(key: str, seconds: float) -> dict:
+    return {
+        "AccessKeyId": key,
+        "SecretAccessKey": "mock_secret_key",
+        "SessionToken": "mock_session_token",
+        "Expiration": datetime.now(timezone.utc) + timedelta(seconds=seconds),
+    }
+
+
+def test_credentials_served_until_refresh_margin():
+
+    manager = CredentialManager(InsecureEnclave(), refresh_margin=300)
+
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return make_credentials(f"key-{len(calls)}", 3600)
+
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+    assert len(calls) == 1
+
+
+def test_credentials_refreshed_in_background():
+
+    manager = CredentialManager(
+        InsecureEnclave(), refresh_margin=300, expiry_margin=0.1
+    )
+
+    refreshed = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            refreshed.set()
+        # Short lived credentials are refreshed half way through their life
+        return make_credentials(f"key-{len(calls)}", 1)
+
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+
+    time.sleep(0.6)
+
+    # The cached credentials are returned while the refresh runs in the background
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+
+    assert refreshed.wait(5)
+    time.sleep(0.05)
+
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-2"
+
+
+def test_failed_background_refresh_is_retried_later():
+
+    manager = CredentialManager(
+        InsecureEnclave(), refresh_margin=300, expiry_margin=0.1, retry_interval=0.5
+    )
+
+    calls = []
+    done = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            return make_credentials("key-1", 4)
+        done.set()
+        raise RuntimeError("Rate exceeded")
+
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+
+    # Inside the refresh margin: one background refresh, which fails
+    time.sleep(2.05)
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+    assert done.wait(5)
+    time.sleep(0.05)
+
+    # No new refresh until the retry interval passed
+    for _ in range(20):
+        assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+    assert len(calls) == 2
+
+    time.sleep(0.5)
+    done.clear()
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-1"
+    assert done.wait(5)
+    assert len(calls) == 3
+
+
+def test_concurrent_refresh_is_single_flight():
+
+    manager = CredentialManager(InsecureEnclave(), refresh_margin=300)
+
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return make_credentials("key", 3600)
+
+    results = []
+
+    def worker():
+        results.append(manager.get(ROLE, fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for t in threads:
+        t.start()
+
+    time.sleep(0.1)
+    release.set()
+
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 10
+    assert all(r["AccessKeyId"] == "key" for r in results)
+
+
+def test_invalidate():
+
+    manager = CredentialManager(InsecureEnclave(), refresh_margin=300)
+
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return make_credentials(f"key-{len(calls)}", 3600)
+
+    manager.get(ROLE, fetch)
+    manager.invalidate(ROLE)
+
+    assert manager.get(ROLE, fetch)["AccessKeyId"] == "key-2"
@@ -0,0 +1,381 @@
+import errno
+import hashlib
+import io
+import os
+import stat
+from unittest.mock import patch
+
+import pytest
+
+import core_helper.magic as magic
+from core_helper.magic import (
+    MagicS3Client,
+    MagicObject,
+    ETagIndex,
+    copy_stream,
+    atomic_write,
+    get_etag_index,
+    clear_etag_indexes,
+)
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def client(tmp_path):
+    yield MagicS3Client(Region="us-east-1", DataPath=str(tmp_path))
+    clear_etag_indexes()
+
+
+def test_put_object_and_download_fileobj(client, tmp_path):
+
+    data = os.urandom(3 * 1024 * 1024 + 17)
+
+    # bytes, str and file-like bodies
+    client.put_object(Bucket=BUCKET, Key="a/bytes.bin", Body=data)
+    client.put_object(Bucket=BUCKET, Key="a/text.txt", Body="hello world")
+    result = client.put_object(Bucket=BUCKET, Key="a/stream.bin", Body=io.BytesIO(data))
+    assert result.error is None
+    assert result.etag is not None
+
+    fn = tmp_path / "package.zip"
+    fn.write_bytes(data)
+    with open(fn, "rb") as f:
+        client.put_object(Bucket=BUCKET, Key="a/file.bin", Body=f)
+
+    for key in ["a/bytes.bin", "a/stream.bin", "a/file.bin"]:
+        assert (tmp_path / BUCKET / key).read_bytes() == data
+    assert (tmp_path / BUCKET / "a" / "text.txt").read_text() == "hello world"
+
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path / BUCKET / "a")) == [
+        "bytes.bin",
+        "file.bin",
+        "stream.bin",
+        "text.txt",
+    ]
+
+    # Download into memory and into a real file
+    buffer = io.BytesIO()
+    client.download_fileobj(Bucket=BUCKET, Key="a/file.bin", Fileobj=buffer)
+    assert buffer.tell() == 0
+    assert buffer.getvalue() == data
+
+    with open(tmp_path / "download.bin", "w+b") as f:
+        client.download_fileobj(Bucket=BUCKET, Key="a/file.bin", Fileobj=f)
+        assert f.tell() == 0
+        assert f.read() == data
+
+
+def test_put_object_failure_keeps_old_object(client, tmp_path):
+
+    client.put_object(Bucket=BUCKET, Key="keep.txt", Body="original")
+
+    class Broken(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, b):
+            raise IOError("connection reset")
+
+    result = client.put_object(Bucket=BUCKET, Key="keep.txt", Body=Broken())
+    assert "connection reset" in result.error
+
+    assert (tmp_path / BUCKET / "keep.txt").read_text() == "original"
+    assert os.listdir(tmp_path / BUCKET) == ["keep.txt"]
+
+
+def test_copy_from_and_mmap(client, tmp_path):
+
+    data = os.urandom(100000)
+    client.put_object(Bucket=BUCKET, Key="source.bin", Body=data)
+
+    target = MagicObject(Bucket=BUCKET, Key="target/copy.bin", DataPath=str(tmp_path))
+    result = target.copy_from(CopySource={"Bucket": BUCKET, "Key": "source.bin"})
+    assert "Error" not in result
+    assert (tmp_path / BUCKET / "target" / "copy.bin").read_bytes() == data
+
+    with target.open_mmap() as mapped:
+        assert len(mapped) == len(data)
+        assert mapped[5000:5010] == data[5000:5010]
+
+    client.put_object(Bucket=BUCKET, Key="empty.bin", Body=io.BytesIO(b""))
+    with client.Bucket(BUCKET).Object("empty.bin").open_mmap() as mapped:
+        assert mapped == b""
+
+
+def test_copy_stream(tmp_path):
+
+    data = os.urandom(2 * 1024 * 1024)
+    source_fn = tmp_path / "source.bin"
+    source_fn.write_bytes(data)
+
+    # file to file with an offset in both files
+    with open(source_fn, "rb") as source, open(tmp_path / "target.bin", "wb") as target:
+        source.seek(10)
+        target.write(b"header")
+        assert copy_stream(source, target) == len(data) - 10
+        assert source.tell() == len(data)
+        target.write(b"trailer")
+
+    assert (tmp_path / "target.bin").read_bytes() == b"header" + data[10:] + b"trailer"
+
+    # file to memory
+    target = io.BytesIO()
+    with open(source_fn, "rb") as source:
+        assert copy_stream(source, target) == len(data)
+    assert target.getvalue() == data
+
+    # Without the kernel copy (e.g. macOS) or when the kernel refuses to copy between the files
+    for kernel_copy, error in [(False, None), (True, OSError(errno.ENOTSOCK, "no"))]:
+        with patch.object(magic, "KERNEL_COPY", kernel_copy), patch.object(
+            os, "copy_file_range", side_effect=error, create=True
+        ), patch.object(os, "sendfile", side_effect=error, create=True):
+            with open(source_fn, "rb") as source, open(
+                tmp_path / "fallback.bin", "wb"
+            ) as target:
+                source.seek(10)
+                assert copy_stream(source, target) == len(data) - 10
+                assert source.tell() == len(data)
+        assert (tmp_path / "fallback.bin").read_bytes() == data[10:]
+
+    # atomic_write gives new files the default mode and keeps the mode of replaced files
+    umask = os.umask(0o022)
+    os.umask(umask)
+    with atomic_write(str(tmp_path / "mode.bin")) as f:
+        f.write(b"new")
+    assert stat.S_IMODE(os.stat(tmp_path / "mode.bin").st_mode) == 0o666 & ~umask
+    os.chmod(tmp_path / "mode.bin", 0o640)
+    with atomic_write(str(tmp_path / "mode.bin")) as f:
+        f.write(b"replaced")
+    assert stat.S_IMODE(os.stat(tmp_path / "mode.bin").st_mode) == 0o640
+
+    # atomic_write removes the temporary file on failure
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(tmp_path / "out" / "failed.bin")) as f:
+            f.write(b"partial")
+            raise RuntimeError("failed")
+    assert os.listdir(tmp_path / "out") == []
+
+
+def test_etag_index(client, tmp_path):
+
+    data = os.urandom(50000)
+    expected = hashlib.sha256(data).hexdigest()
+    index = get_etag_index(str(tmp_path))
+
+    # The hash is computed while writing.  head_object() does not read the file again.
+    client.put_object(Bucket=BUCKET, Key="object.bin", Body=data)
+    for _ in range(3):
+        assert client.head_object(Bucket=BUCKET, Key="object.bin")["etag"] == expected
+    assert index.stats()["misses"] == 0
+
+    # A file written behind our back is hashed once
+    fn = tmp_path / BUCKET / "outside.bin"
+    fn.write_bytes(data)
+    for _ in range(3):
+        assert client.head_object(Bucket=BUCKET, Key="outside.bin")["etag"] == expected
+    assert index.stats()["misses"] == 1
+
+    # Changing the file invalidates the ETag
+    fn.write_bytes(b"changed")
+    result = client.head_object(Bucket=BUCKET, Key="outside.bin")
+    assert result["etag"] == hashlib.sha256(b"changed").hexdigest()
+    assert index.stats()["misses"] == 2
+
+    # The copy has the ETag of the source without hashing it
+    target = client.Bucket(BUCKET).Object("copy.bin")
+    result = target.copy_from(CopySource={"Bucket": BUCKET, "Key": "object.bin"})
+    assert result["CopyObjectResult"]["ETag"] == expected
+    assert index.stats()["misses"] == 2
+
+
+def test_etag_index_sidecar(tmp_path):
+
+    fn = tmp_path / "bucket" / "file.txt"
+    fn.parent.mkdir()
+    fn.write_text("hello")
+    expected = hashlib.sha256(b"hello").hexdigest()
+
+    index = ETagIndex(str(tmp_path), sidecar=True)
+    assert index.get(str(fn)) == expected
+    assert index.stats()["misses"] == 1
+    index.db.close()
+
+    # A new index (e.g. the next Lambda invocation) finds the ETag in the database
+    index = ETagIndex(str(tmp_path), sidecar=True)
+    assert index.get(str(fn)) == expected
+    assert index.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+    index.invalidate(str(fn))
+    assert index.get(str(fn)) == expected
+    assert index.stats()["misses"] == 1
+    index.db.close()
+
+
+def test_list_objects_v2(client):
+
+    keys = [
+        "files/a.txt",
+        "files/b/1.txt",
+        "files/b/2.txt",
+        "files/c.txt",
+        "packages/x.zip",
+        "top.txt",
+    ]
+    for key in keys:
+        client.put_object(Bucket=BUCKET, Key=key, Body=key)
+
+    result = client.list_objects_v2(Bucket=BUCKET)
+    assert [item["Key"] for item in result["Contents"]] == keys
+    assert result["KeyCount"] == 6
+    assert result["IsTruncated"] is False
+    assert result["Contents"][0]["Size"] == len("files/a.txt")
+    assert result["Contents"][0]["ETag"] == hashlib.sha256(b"files/a.txt").hexdigest()
+
+    result = client.list_objects_v2(Bucket=BUCKET, Prefix="files/", Delimiter="/")
+    assert [item["Key"] for item in result["Contents"]] == [
+        "files/a.txt",
+        "files/c.txt",
+    ]
+    assert result["CommonPrefixes"] == [{"Prefix": "files/b/"}]
+
+    # Page through the keys and common prefixes
+    pages = list(
+        client.get_paginator("list_objects_v2").paginate(
+            Bucket=BUCKET, Delimiter="/", PaginationConfig={"PageSize": 1}
+        )
+    )
+    listed = [
+        item.get("Key") or item.get("Prefix")
+        for page in pages
+        for item in page.get("Contents", []) + page.get("CommonPrefixes", [])
+    ]
+    assert listed == ["files/", "packages/", "top.txt"]
+
+    pages = list(
+        client.get_paginator("list_objects_v2").paginate(
+            Bucket=BUCKET, Prefix="files/", PaginationConfig={"PageSize": 2}
+        )
+    )
+    assert [len(page["Contents"]) for page in pages] == [2, 2]
+
+    # Objects written behind our back are found
+    with open(os.path.join(client.data_path, BUCKET, "files", "z.txt"), "w") as f:
+        f.write("z")
+    result = client.list_objects_v2(Bucket=BUCKET, Prefix="files/z")
+    assert [item["Key"] for item in result["Contents"]] == ["files/z.txt"]
+
+    assert "Contents" not in client.list_objects_v2(Bucket="missing-bucket")
+
+
+def test_delete_objects(client, tmp_path):
+
+    for key in ["a/b/1.txt", "a/b/2.txt", "a/3.txt"]:
+        client.put_object(Bucket=BUCKET, Key=key, Body=key)
+
+    result = client.delete_objects(
+        Bucket=BUCKET,
+        Delete={
+            "Objects": [{"Key": "a/b/1.txt"}, {"Key": "a/b/2.txt"}, {"Key": "nope"}]
+        },
+    )
+    assert result["Deleted"] == [
+        {"Key": "a/b/1.txt"},
+        {"Key": "a/b/2.txt"},
+        {"Key": "nope"},
+    ]
+
+    # Empty folders are removed
+    assert not (tmp_path / BUCKET / "a" / "b").exists()
+
+    result = client.list_objects_v2(Bucket=BUCKET)
+    assert [item["Key"] for item in result["Contents"]] == ["a/3.txt"]
+
+
+def test_get_object_range(client):
+
+    data = bytes(range(256)) * 100
+    client.put_object(Bucket=BUCKET, Key="data.bin", Body=data)
+
+    result = client.get_object(Bucket=BUCKET, Key="data.bin")
+    with result["Body"] as body:
+        assert body.read() == data
+    assert result["ContentLength"] == len(data)
+
+    result = client.get_object(Bucket=BUCKET, Key="data.bin", Range="bytes=10-19")
+    assert result["ContentRange"] == f"bytes 10-19/{len(data)}"
+    with result["Body"] as body:
+        assert body.read(4) == data[10:14]
+        assert body.read() == data[14:20]
+        assert body.read() == b""
+
+    result = client.get_object(Bucket=BUCKET, Key="data.bin", Range="bytes=-5")
+    with result["Body"] as body:
+        assert b"".join(body.iter_chunks(2)) == data[-5:]
+
+    assert "Error" in client.get_object(
+        Bucket=BUCKET, Key="data.bin", Range="bytes=99999-"
+    )
+    assert "Error" in client.get_object(Bucket=BUCKET, Key="missing.bin")
+
+
+def test_multipart_upload(client, tmp_path):
+
+    parts = [os.urandom(1024 * 1024), os.urandom(1024 * 1024), os.urandom(100)]
+
+    upload = client.create_multipart_upload(Bucket=BUCKET, Key="big/package.zip")
+    upload_id = upload["UploadId"]
+
+    etags = []
+    # Upload the parts out of order
+    for number in [3, 1, 2]:
+        result = client.upload_part(
+            Bucket=BUCKET,
+            Key="big/package.zip",
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=io.BytesIO(parts[number - 1]),
+        )
+        etags.append((number, result["ETag"]))
+
+    result = client.complete_multipart_upload(
+        Bucket=BUCKET,
+        Key="big/package.zip",
+        UploadId=upload_id,
+        MultipartUpload={
+            "Parts": [{"PartNumber": n, "ETag": e} for n, e in sorted(etags)]
+        },
+    )
+    assert "Error" not in result
+    assert result["ETag"].endswith("-3")
+
+    assert (tmp_path / BUCKET / "big" / "package.zip").read_bytes() == b"".join(parts)
+    assert os.listdir(tmp_path / ".multipart") == []
+
+    # The multipart staging area is not a bucket and the upload is gone
+    result = client.upload_part(
+        Bucket=BUCKET,
+        Key="big/package.zip",
+        UploadId=upload_id,
+        PartNumber=1,
+        Body=b"x",
+    )
+    assert "does not exist" in result["Error"]
+
+    upload = client.create_multipart_upload(Bucket=BUCKET, Key="aborted.zip")
+    client.upload_part(
+        Bucket=BUCKET,
+        Key="aborted.zip",
+        UploadId=upload["UploadId"],
+        PartNumber=1,
+        Body=b"x",
+    )
+    assert (
+        client.abort_multipart_upload(
+            Bucket=BUCKET, Key="aborted.zip", UploadId=upload["UploadId"]
+        )
+        == {}
+    )
+    assert os.listdir(tmp_path / ".multipart") == []
+    assert not (tmp_path / BUCKET / "aborted.zip").exists()
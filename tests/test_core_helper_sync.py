@@ -0,0 +1,207 @@
+import hashlib
+import os
+
+import pytest
+
+from core_framework.constants import OBJ_FILES
+from core_framework.models import DeploymentDetails
+
+from core_helper.magic import MagicS3Client, clear_etag_indexes
+from core_helper.transfer import TransferManager
+from core_helper.sync import (
+    sync_directory,
+    sync_deployment,
+    get_local_etag,
+    get_local_manifest,
+)
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "build"
+    for name, content in [
+        ("index.html", "<html/>"),
+        ("css/site.css", "body {}"),
+        ("js/app.js", "let x = 1;"),
+        ("js/lib/big.bin", "x" * 300000),
+    ]:
+        fn = source / name
+        fn.parent.mkdir(parents=True, exist_ok=True)
+        fn.write_text(content)
+    yield source
+    clear_etag_indexes()
+
+
+def test_sync_directory(source, tmp_path, monkeypatch):
+
+    monkeypatch.setattr("core_helper.transfer.MIN_PART_SIZE", 1024)
+
+    client = MagicS3Client(Region="us-east-1", DataPath=str(tmp_path / "volume"))
+    transfer = TransferManager(client, part_size=64 * 1024)
+
+    summary = sync_directory(
+        client, str(source), BUCKET, "files/app", transfer=transfer
+    )
+    assert summary["Uploaded"] == [
+        "files/app/css/site.css",
+        "files/app/index.html",
+        "files/app/js/app.js",
+        "files/app/js/lib/big.bin",
+    ]
+    assert summary["Unchanged"] == 0
+    assert summary["Errors"] == []
+
+    # Nothing changed.  The multipart object is compared by its multipart ETag.
+    summary = sync_directory(
+        client, str(source), BUCKET, "files/app", transfer=transfer
+    )
+    assert summary["Uploaded"] == []
+    assert summary["Unchanged"] == 4
+    assert summary["BytesUploaded"] == 0
+
+    # Same size but different content, a new file and a removed file
+    (source / "js" / "app.js").write_text("let y = 1;")
+    (source / "new.txt").write_text("new")
+    os.unlink(source / "css" / "site.css")
+
+    summary = sync_directory(
+        client,
+        str(source),
+        BUCKET,
+        "files/app",
+        dry_run=True,
+        delete=True,
+        transfer=transfer,
+    )
+    assert summary["Uploaded"] == ["files/app/js/app.js", "files/app/new.txt"]
+    assert summary["Deleted"] == ["files/app/css/site.css"]
+
+    summary = sync_directory(
+        client, str(source), BUCKET, "files/app", delete=True, transfer=transfer
+    )
+    assert summary["Uploaded"] == ["files/app/js/app.js", "files/app/new.txt"]
+    assert summary["Deleted"] == ["files/app/css/site.css"]
+    assert summary["Unchanged"] == 2
+    assert summary["BytesUploaded"] == len("let y = 1;") + len("new")
+
+    result = client.list_objects_v2(Bucket=BUCKET, Prefix="files/app/")
+    assert [item["Key"] for item in result["Contents"]] == [
+        "files/app/index.html",
+        "files/app/js/app.js",
+        "files/app/js/lib/big.bin",
+        "files/app/new.txt",
+    ]
+
+
+def test_sync_directory_sidecar(source, tmp_path, monkeypatch):
+
+    monkeypatch.setenv("ETAG_SIDECAR", "true")
+    client = MagicS3Client(Region="us-east-1", DataPath=str(tmp_path / "volume"))
+
+    # A sidecar left in the build directory by an older version
+    (source / ".etag_index.db-wal").write_text("wal")
+    (source / ".etag_index.db-shm").write_text("shm")
+
+    for _ in range(3):
+        summary = sync_directory(client, str(source), BUCKET, "files/app")
+        assert summary["Errors"] == []
+
+    assert not (source / ".etag_index.db").exists()
+    result = client.list_objects_v2(Bucket=BUCKET, Prefix="files/app/")
+    assert [item["Key"] for item in result["Contents"]] == [
+        "files/app/css/site.css",
+        "files/app/index.html",
+        "files/app/js/app.js",
+        "files/app/js/lib/big.bin",
+    ]
+
+
+def test_sync_directory_bucket_root(source, tmp_path):
+
+    client = MagicS3Client(Region="us-east-1", DataPath=str(tmp_path / "volume"))
+
+    for prefix in ["", "/"]:
+        summary = sync_directory(client, str(source), BUCKET, prefix)
+        assert summary["Errors"] == []
+
+    assert summary["Unchanged"] == 4
+
+    os.unlink(source / "index.html")
+    summary = sync_directory(client, str(source), BUCKET, "", delete=True)
+    assert summary["Deleted"] == ["index.html"]
+    assert summary["Errors"] == []
+
+    result = client.list_objects_v2(Bucket=BUCKET)
+    assert [item["Key"] for item in result["Contents"]] == [
+        "css/site.css",
+        "js/app.js",
+        "js/lib/big.bin",
+    ]
+
+
+def test_get_local_manifest_symlinks(source, tmp_path):
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    (shared / "common.css").write_text("p {}")
+
+    # A linked directory is followed, a link to a parent directory is a loop
+    (source / "shared").symlink_to(shared, target_is_directory=True)
+    (source / "js" / "lib" / "up").symlink_to(source, target_is_directory=True)
+
+    assert sorted(get_local_manifest(str(source))) == [
+        "css/site.css",
+        "index.html",
+        "js/app.js",
+        "js/lib/big.bin",
+        "shared/common.css",
+    ]
+
+
+def test_get_local_etag(source):
+
+    data = (source / "index.html").read_bytes()
+
+    # S3 (MD5) and Magic (SHA256) ETags
+    md5 = hashlib.md5(data).hexdigest()
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert get_local_etag(str(source), "index.html", f'"{md5}"', 1024) == md5
+    assert get_local_etag(str(source), "index.html", sha256, 1024) == sha256
+
+    # Multipart ETags
+    data = (source / "js" / "lib" / "big.bin").read_bytes()
+    parts = [data[i : i + 100000] for i in range(0, len(data), 100000)]
+    expected = hashlib.md5(b"".join(hashlib.md5(p).digest() for p in parts))
+    etag = f"{expected.hexdigest()}-3"
+    assert get_local_etag(str(source), "js/lib/big.bin", etag, 100000) == etag
+
+    # Uploaded with another part size or an unknown ETag format (SSE-KMS)
+    assert get_local_etag(str(source), "js/lib/big.bin", etag, 64 * 1024) is None
+    assert get_local_etag(str(source), "index.html", "abc", 1024) is None
+
+
+def test_sync_deployment(source, tmp_path, monkeypatch):
+
+    monkeypatch.setenv("CLIENT", "example_client")
+    monkeypatch.setenv("LOCAL_MODE", "true")
+    monkeypatch.setenv("USE_S3", "false")
+
+    deployment_details = DeploymentDetails.from_arguments(
+        portfolio="Portfolio", app="App", branch="main", build="build-1"
+    )
+
+    summary = sync_deployment(
+        deployment_details,
+        OBJ_FILES,
+        str(source),
+        bucket=BUCKET,
+        region="us-east-1",
+        data_path=str(tmp_path / "volume"),
+    )
+
+    key = deployment_details.get_object_key(OBJ_FILES, s3=True)
+    assert summary["Prefix"] == key
+    assert len(summary["Uploaded"]) == 4
+    assert (tmp_path / "volume" / BUCKET / key / "index.html").exists()
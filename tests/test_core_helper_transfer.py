@@ -0,0 +1,155 @@
+from typing import ClassVar
+import hashlib
+import io
+import os
+
+import pytest
+
+from botocore.exceptions import ClientError
+
+import core_helper.transfer as transfer_module
+from core_helper.magic import MagicS3Client, clear_etag_indexes
+from core_helper.transfer import (
+    TransferManager,
+    TransferError,
+    sha256_checksum,
+    MIN_PART_SIZE,
+)
+
+BUCKET = "test-bucket"
+PART_SIZE = 64 * 1024
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    # Many small parts instead of MiBs of data
+    monkeypatch.setattr(transfer_module, "MIN_PART_SIZE", 1024)
+
+
+@pytest.fixture
+def client(tmp_path):
+    yield MagicS3Client(Region="us-east-1", DataPath=str(tmp_path))
+    clear_etag_indexes()
+
+
+def test_upload_and_download(client, tmp_path):
+
+    transfer = TransferManager(client, part_size=PART_SIZE, max_concurrency=4)
+
+    data = os.urandom(PART_SIZE * 10 + 123)
+    source = tmp_path / "package.zip"
+    source.write_bytes(data)
+
+    result = transfer.upload_file(str(source), BUCKET, "packages/package.zip")
+    assert result["Parts"] == 11
+    assert result["Size"] == len(data)
+    assert result["ETag"].endswith("-11")
+    assert (tmp_path / BUCKET / "packages" / "package.zip").read_bytes() == data
+
+    # To a file (written in place) and to a stream (written in order)
+    target = tmp_path / "download" / "package.zip"
+    result = transfer.download_file(BUCKET, "packages/package.zip", str(target))
+    assert result["Parts"] == 11
+    assert target.read_bytes() == data
+
+    buffer = io.BytesIO(b"header")
+    buffer.seek(0, io.SEEK_END)
+    transfer.download_fileobj(BUCKET, "packages/package.zip", buffer)
+    assert buffer.getvalue() == b"header" + data
+
+
+def test_small_and_empty_objects(client, tmp_path):
+
+    transfer = TransferManager(client, part_size=PART_SIZE)
+
+    result = transfer.upload_fileobj(io.BytesIO(b"small"), BUCKET, "small.txt")
+    assert result["Parts"] == 1
+    assert result["ETag"] == hashlib.sha256(b"small").hexdigest()
+
+    transfer.upload_fileobj(io.BytesIO(b""), BUCKET, "empty.txt")
+
+    for key, expected in [("small.txt", b"small"), ("empty.txt", b"")]:
+        target = tmp_path / key
+        result = transfer.download_file(BUCKET, key, str(target))
+        assert target.read_bytes() == expected
+        assert result["Size"] == len(expected)
+
+    with pytest.raises(TransferError):
+        transfer.download_file(BUCKET, "missing.txt", str(tmp_path / "missing.txt"))
+    assert not (tmp_path / "missing.txt").exists()
+
+
+def test_part_size_minimum(client, monkeypatch):
+
+    monkeypatch.setattr(transfer_module, "MIN_PART_SIZE", MIN_PART_SIZE)
+
+    assert TransferManager(client, part_size=1024).part_size == MIN_PART_SIZE
+    assert TransferManager(client, part_size=MIN_PART_SIZE * 2).part_size == (
+        MIN_PART_SIZE * 2
+    )
+
+
+class FailingRangeClient(MagicS3Client):
+    """Fails ranged GETs with the error of the class"""
+
+    error: ClassVar[Exception | None] = None
+    calls: ClassVar[list] = []
+
+    def get_object(self, **kwargs) -> dict:
+        self.calls.append(kwargs)
+        if "Range" in kwargs:
+            raise self.error
+        return super().get_object(**kwargs)
+
+
+def test_first_part_retried_only_for_invalid_range(tmp_path, monkeypatch):
+
+    client = FailingRangeClient(Region="us-east-1", DataPath=str(tmp_path))
+    client.put_object(Bucket=BUCKET, Key="empty.txt", Body=b"")
+    transfer = TransferManager(client, part_size=PART_SIZE)
+
+    monkeypatch.setattr(FailingRangeClient, "calls", [])
+    monkeypatch.setattr(
+        FailingRangeClient,
+        "error",
+        ClientError(
+            {"Error": {"Code": "InvalidRange", "Message": "Not satisfiable"}},
+            "GetObject",
+        ),
+    )
+    transfer.download_file(BUCKET, "empty.txt", str(tmp_path / "empty.txt"))
+    assert len(FailingRangeClient.calls) == 2
+
+    monkeypatch.setattr(FailingRangeClient, "calls", [])
+    monkeypatch.setattr(
+        FailingRangeClient,
+        "error",
+        ClientError({"Error": {"Code": "SlowDown", "Message": "Slow"}}, "GetObject"),
+    )
+    with pytest.raises(ClientError, match="SlowDown"):
+        transfer.download_file(BUCKET, "empty.txt", str(tmp_path / "other.txt"))
+    assert len(FailingRangeClient.calls) == 1
+
+
+class CorruptingClient(MagicS3Client):
+    """Sends a wrong checksum for the second part"""
+
+    def upload_part(self, **kwargs) -> dict:
+        if kwargs["PartNumber"] == 2:
+            kwargs["ChecksumSHA256"] = sha256_checksum(b"something else")
+        return super().upload_part(**kwargs)
+
+
+def test_failed_part_aborts_upload(tmp_path):
+
+    client = CorruptingClient(Region="us-east-1", DataPath=str(tmp_path))
+    transfer = TransferManager(client, part_size=PART_SIZE, max_concurrency=2)
+
+    with pytest.raises(TransferError, match="BadDigest"):
+        transfer.upload_fileobj(
+            io.BytesIO(os.urandom(PART_SIZE * 3)), BUCKET, "corrupt.zip"
+        )
+
+    assert not (tmp_path / BUCKET / "corrupt.zip").exists()
+    assert os.listdir(tmp_path / ".multipart") == []
+    clear_etag_indexes()
@@ -1,4 +1,10 @@
 from unittest.mock import patch
+from collections import OrderedDict
+from datetime import datetime
+import io
+import json
+import logging
+import threading
 import pytest
 import core_logging as log
 
@@ -171,5 +177,346 @@ def test_level_change(capsys, mock_format_time):
     )
 
 
+def test_logger_cache_and_fast_path(capsys, mock_format_time):
+
+    mock_format_time.return_value = "2021-07-01 12:00:00"
+    log.setLevel("INFO")
+
+    with patch(
+        "core_logging.log_interface.getLogger", wraps=log.log_interface.getLogger
+    ) as get_logger:
+        # Disabled levels return before looking up the logger
+        log.debug("Skipped", identity="cached")
+        log.trace("Skipped", identity="cached")
+        assert get_logger.call_count == 0
+
+        log.info("One", identity="cached")
+        log.info("Two", identity="cached")
+        assert get_logger.call_count == 1
+
+        # Loggers are set up again after a level change
+        log.setLevel("INFO")
+        log.info("Three", identity="cached")
+        assert get_logger.call_count == 2
+
+    assert capsys.readouterr().out == (
+        "2021-07-01 12:00:00 [cached] [INFO] One\n"
+        "2021-07-01 12:00:00 [cached] [INFO] Two\n"
+        "2021-07-01 12:00:00 [cached] [INFO] Three\n"
+    )
+
+
+def test_set_level_for_logger(capsys, mock_format_time):
+
+    mock_format_time.return_value = "2021-07-01 12:00:00"
+    log.setLevel("WARN")
+    log.log_interface.setLevelForLogger("verbose", "DEBUG")
+
+    try:
+        log.debug("This is a debug message", identity="verbose")
+        log.debug("This is skipped", identity="quiet")
+        log.warning("This is a warning", identity="quiet")
+    finally:
+        log.log_interface._logger_levels.clear()
+        log.setLevel("INFO")
+
+    assert capsys.readouterr().out == (
+        "2021-07-01 12:00:00 [verbose] [DEBUG] This is a debug message\n"
+        "2021-07-01 12:00:00 [quiet] [WARN] This is a warning\n"
+    )
+
+
+def test_caller_identity(capsys, mock_format_time):
+
+    mock_format_time.return_value = "2021-07-01 12:00:00"
+    log.log_interface.clear_identity()
+
+    log.info("From the caller")
+    assert capsys.readouterr().out == (
+        "2021-07-01 12:00:00 [tests.test_core_logging.test_caller_identity] [INFO] From the caller\n"
+    )
+
+
+def test_lazy_details(capsys, mock_format_time):
+
+    mock_format_time.return_value = "2021-07-01 12:00:00"
+    calls = []
+
+    def build(name, count=1):
+        calls.append(name)
+        return {"Name": name, "Items": ["a"] * count}
+
+    log.debug("Not written", details=log.LazyDetails(build, "debug"))
+    log.debug("Not written", details=lambda: build("lambda"))
+    assert calls == []
+
+    log.info("Written", details=log.LazyDetails(build, "info", count=2))
+    log.info("Failed", details=lambda: 1 / 0)
+    assert calls == ["info"]
+
+    assert capsys.readouterr().out == (
+        "2021-07-01 12:00:00 [prn:core:network:master:1] [INFO] Written\n"
+        "    Name: info\n"
+        "    Items:\n"
+        "      - a\n"
+        "      - a\n"
+        "2021-07-01 12:00:00 [prn:core:network:master:1] [INFO] Failed\n"
+        "    Error: 'Failed to build the details: division by zero'\n"
+    )
+
+
+def test_truncate_details():
+
+    details = {
+        "Payload": "x" * 10,
+        "Items": [1, 2, 3, {"Nested": "y" * 3}],
+        "Keys": {"a": 1, "b": 2, "c": 3, "d": 4},
+    }
+
+    assert log.truncate_details(details) is details
+    assert log.truncate_details(details, max_length=4, max_items=3) == {
+        "Payload": "xxxx... (6 more characters)",
+        "Items": [1, 2, 3, "... (1 more items)"],
+        "Keys": {"a": 1, "b": 2, "c": 3, "...": "1 more items"},
+    }
+    assert log.truncate_details(details, max_length=2)["Items"][3] == {
+        "Nested": "yy... (1 more characters)"
+    }
+    assert details["Payload"] == "x" * 10
+    assert log.truncate_details("abc", max_length=1) == "a... (2 more characters)"
+
+    # Details that contain themselves
+    recursive = {"Name": "a"}
+    recursive["Self"] = recursive
+    recursive["List"] = [recursive, {"Inner": recursive["Name"]}]
+    shared = {"x": 1}
+    assert log.truncate_details(recursive, max_items=5) == {
+        "Name": "a",
+        "Self": "(recursive reference)",
+        "List": ["(recursive reference)", {"Inner": "a"}],
+    }
+    assert log.truncate_details([shared, shared], max_items=5) == [{"x": 1}, {"x": 1}]
+
+    stream = io.StringIO()
+    writer = log.LogWriter(stream=stream)
+    logger = queued_logger("truncated", writer)
+    logger.handlers[0].max_detail_length = 5
+    logger.handlers[0].setFormatter(logging.Formatter("%(message)s %(details)s"))
+    logger.info("Big", details=lambda: {"Payload": "z" * 100})
+    writer.close(5)
+    assert stream.getvalue() == "Big {'Payload': 'zzzzz... (95 more characters)'}\n"
+
+
+def legacy_json_format(formatter, record):
+    timestamp = datetime.fromtimestamp(record.created)
+    data = OrderedDict(
+        [("@timestamp", timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z")]
+    )
+    for key, alternate in log.log_classes.CoreLogJsonFormatter.JSON_FIELDS:
+        formatter.set_element(data, record, key, alternate)
+    return json.dumps(data, default=str)
+
+
+@pytest.mark.parametrize(
+    "created",
+    [1719835200.0, 1719835200.0005, 1719835200.9999996, 1719835201.123456, -1.25],
+)
+def test_json_formatter(created):
+
+    formatter = log.log_classes.CoreLogJsonFormatter()
+    records = []
+    for i, (msg, details) in enumerate(
+        [
+            ("Plain", None),
+            (
+                'Unicode \u00e9\u2603 "quoted"\n',
+                {"Key": "caf\u00e9", "When": datetime(2024, 1, 1)},
+            ),
+            ({"not": "a string"}, ["a", 1, 2.5, True, None]),
+            (42, {"Nested": {"Deep": [ValueError("bad")]}}),
+        ]
+    ):
+        record = logging.LogRecord("json", logging.INFO, "file.py", i, msg, (), None)
+        record.created = created + i
+        if details is not None:
+            record.details = details
+        if i == 3:
+            record.status = "COMPILE_COMPLETE"
+            record.reason = True
+            record.scope = "build"
+        records.append(record)
+
+    for record in records:
+        assert formatter.format(record) == legacy_json_format(formatter, record)
+
+
+def test_text_formatter(mock_format_time):
+
+    mock_format_time.return_value = "2021-07-01 12:00:00"
+    formatter = log.log_classes.CoreLogTextFormatter()
+    record = logging.LogRecord("text", logging.INFO, "file.py", 1, "Line", (), None)
+    record.scope = "build"
+    record.details = {"Item": "a", "List": ["boo1", None], "Empty": {}}
+
+    expected = (
+        "2021-07-01 12:00:00 [text] [INFO] Line (build)\n"
+        "    Item: a\n"
+        "    List:\n"
+        "      - boo1\n"
+        "      - \n"
+        "    Empty: {}"
+    )
+    assert formatter.format(record) == expected
+    assert formatter.format(record) == expected
+    assert record.msg == "Line"
+
+    assert formatter.details(record, "first\nsecond\n\n") == (
+        "\n2021-07-01 12:00:00 [text] [INFO] first"
+        "\n2021-07-01 12:00:00 [text] [INFO] second"
+    )
+    assert record.msg == "Line"
+
+
+@pytest.mark.parametrize(
+    "details, simple",
+    [
+        (
+            {
+                "FunctionName": "arn:aws:lambda:us-east-1:123456789012:function:fn",
+                "Count": 3,
+            },
+            True,
+        ),
+        (
+            {"Outputs": [{"Key": "Arn", "Value": 1.5, "Enabled": True}], "Tags": []},
+            True,
+        ),
+        (["a", {"b": {"c": None}}, -10], True),
+        # Written by ruamel
+        (
+            {
+                "Quoted": "true",
+                "Colon": "a: b",
+                "Long": "word " * 20,
+                "Unicode": "caf\u00e9",
+            },
+            False,
+        ),
+        ({"Nested": [["a"]], "Number": 1e20, "Key": {1: "int key"}}, False),
+    ],
+)
+def test_text_formatter_yaml(details, simple):
+
+    formatter = log.log_classes.CoreLogTextFormatter()
+    stream = io.StringIO()
+    formatter.yaml.dump(details, stream)
+    expected = "\n".join("    " + line for line in stream.getvalue().splitlines())
+
+    assert (log.log_classes._dump_simple_yaml(details) is not None) == simple
+    assert formatter._dump_ordered_yaml(details) == expected
+
+
+class BlockingStream(io.StringIO):
+    """A stream that holds the writer thread in the first write until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, s):
+        self.writing.set()
+        self.release.wait(5)
+        return super().write(s)
+
+
+def queued_logger(name, writer):
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    handler = log.QueuedCoreLoggerHandler(name, writer=writer)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(log.DEBUG)
+    return logger
+
+
+def test_queued_handler():
+
+    stream = io.StringIO()
+    writer = log.LogWriter(stream=stream)
+    logger = queued_logger("queued-test", writer)
+
+    details = {"key": "value"}
+    logger.info("Message {} of {}", 1, 2, details=details)
+    details["key"] = "changed"
+    logger.debug("Second")
+
+    assert writer.flush(5)
+    assert stream.getvalue() == "INFO Message 1 of 2\nDEBUG Second\n"
+    assert writer.stats() == {
+        "queued": 2,
+        "dropped": 0,
+        "written": 2,
+        "size": 0,
+        "max_size": log.log_classes.DEFAULT_QUEUE_SIZE,
+    }
+
+    writer.close(5)
+    logger.info("After close")
+    assert stream.getvalue().endswith("INFO After close\n")
+
+    with pytest.raises(ValueError):
+        log.LogWriter(policy="unknown")
+
+
+@pytest.mark.parametrize(
+    "policy, expected, dropped",
+    [
+        ("drop-oldest", ["first", "third", "error"], 1),
+        ("drop-below-level", ["first", "second", "third"], 1),
+    ],
+)
+def test_queued_handler_full(policy, expected, dropped):
+
+    stream = BlockingStream()
+    writer = log.LogWriter(max_size=2, policy=policy, stream=stream)
+    logger = queued_logger(f"queued-{policy}", writer)
+
+    logger.info("first")
+    assert stream.writing.wait(5)
+
+    # The writer thread is busy with the first record
+    logger.info("second")
+    logger.info("third")
+    if policy == "drop-oldest":
+        logger.error("error")
+    else:
+        logger.debug("debug")
+
+    stream.release.set()
+    assert writer.flush(5)
+    writer.close(5)
+
+    assert [line.split()[-1] for line in stream.getvalue().splitlines()] == expected
+    assert writer.dropped == dropped
+    assert writer.written == 3
+
+
+def test_flush_on_exit():
+
+    stream = io.StringIO()
+    writer = log.LogWriter(stream=stream)
+    logger = queued_logger("queued-exit", writer)
+
+    @log.flush_on_exit
+    def handler(event, context):
+        logger.info("Handled {}", event)
+        return "done"
+
+    assert handler("event", None) == "done"
+    assert stream.getvalue() == "INFO Handled event\n"
+    writer.close(5)
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -2,6 +2,8 @@ from datetime import date
 from unittest.mock import patch
 import pytest
 import jinja2
+from core_framework.merge import LayeredView
+from core_renderer import Jinja2Renderer
 from core_renderer.filters import (
     filter_aws_tags,
     filter_docker_image,
@@ -546,6 +548,33 @@ def test_filter_ip_rules(render_context):
 
     assert result == rules
 
+    # The same rules from layered facts, and aliases that are mappings but not dicts
+    context = dict(render_context)
+    aliases = context[CTX_CONTEXT]["SecurityAliases"]["some-other-app"]
+    context[CTX_CONTEXT] = LayeredView(
+        {
+            k: v
+            for k, v in render_context[CTX_CONTEXT].items()
+            if k != "SecurityAliases"
+        },
+        {
+            "SecurityAliases": {
+                "some-other-app": [
+                    LayeredView(a) if isinstance(a, dict) else a for a in aliases
+                ]
+            }
+        },
+    )
+    assert filter_ip_rules(context, resource, source_types=source_types) == rules
+
+    renderer = Jinja2Renderer()
+    template = "{{ resource | ip_rules(source_types=source_types) | tojson }}"
+    assert renderer.render_string(
+        template, {**context, "resource": resource, "source_types": source_types}
+    ) == renderer.render_string(
+        template, {**render_context, "resource": resource, "source_types": source_types}
+    )
+
 
 def test_filter_lookup(render_context):
 
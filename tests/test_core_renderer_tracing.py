@@ -0,0 +1,148 @@
+import os
+import pytest
+
+from core_framework.constants import CTX_APP, CTX_COMPONENT_NAME, CTX_CONTEXT
+from core_framework.merge import LayeredView
+from core_renderer import Jinja2Renderer
+from core_renderer.tracing import ContextTrace
+
+from .test_core_renderer_filters import render_context  # noqa: F401
+from .test_renderer import get_sample_facts
+
+
+def test_trace_sample_template():
+
+    template_path = os.path.join(os.path.dirname(__file__), "templates")
+    renderer = Jinja2Renderer(template_path)
+    context = get_sample_facts()
+
+    text, trace = renderer.trace_file("test_render.yaml.j2", context)
+    assert text == renderer.render_file("test_render.yaml.j2", context)
+
+    report = trace.report()
+    assert report["Kms"] == "type"
+    assert report["Kms.KmsKeyArn"] == "value"
+    assert report["Client"] == "value"
+    # items() reads the keys and then each value
+    assert report["Tags"] == "keys"
+
+    assert trace.fingerprint(context) == trace.fingerprint(dict(context))
+    assert trace.fingerprint(context) != trace.fingerprint(
+        {**context, "Client": "other"}
+    )
+    assert trace.fingerprint(context) == trace.fingerprint({**context, "Unused": 1})
+
+
+def test_trace_dependencies():
+
+    renderer = Jinja2Renderer()
+    context = {
+        "Zone": {"Region": "us-east-1", "Subnets": ["a", "b"], "Kms": {"Key": "k"}},
+        "App": "web",
+    }
+
+    template = (
+        "{{ Zone.Region }} {{ Zone.Subnets | join(',') }} {{ Zone.Kms }} "
+        "{{ Zone.Missing | default('-') }} {{ 'App' in Zone }} {% for key in Zone %}{{ key }} {% endfor %}"
+    )
+    text, trace = renderer.trace_string(template, context)
+    assert text == renderer.render_string(template, context)
+    assert text == "us-east-1 a,b {'Key': 'k'} - False Region Subnets Kms "
+
+    # Nothing below Zone.Kms because it was printed as a whole
+    assert trace.report() == {
+        "Zone": "keys",
+        "Zone.App": "present",
+        "Zone.Kms": "value",
+        "Zone.Missing": "value",
+        "Zone.Region": "value",
+        "Zone.Subnets": "value",
+    }
+
+    # The same output for a layered context
+    layered = LayeredView({"Zone": {"Region": "x"}}, context)
+    assert renderer.trace_string(template, layered)[0] == renderer.render_string(
+        template, layered
+    )
+
+
+def test_trace_filters(render_context):  # noqa: F811
+
+    renderer = Jinja2Renderer()
+    resource = {
+        "Pipeline::Security": [
+            {"Source": "some-other-app", "Allow": "TCP:443"},
+            {"Source": "myapp", "Allow": "TCP:80"},
+        ]
+    }
+    context = {**render_context, "resource": resource, "Path": "resource"}
+
+    template = (
+        "{{ 'Path' | lookup }}|{{ resource | extract('\"Pipeline::Security\"') | length }}|"
+        "{{ 'build' | tags | length }}|{{ resource | ip_rules | length }}"
+    )
+    text, trace = renderer.trace_string(template, context)
+    assert text == renderer.render_string(template, context)
+
+    report = trace.report()
+
+    # lookup
+    assert report["Path"] == "value"
+    # extract gets the whole value
+    assert report["resource"] == "value"
+    # tags
+    assert report[f"{CTX_CONTEXT}.Portfolio"] == "value"
+    assert report[f"{CTX_CONTEXT}.Tags"] == "keys"
+    assert report[CTX_COMPONENT_NAME] == "value"
+    # ip_rules
+    assert report[f"{CTX_CONTEXT}.SecurityAliases.some-other-app"] == "value"
+    assert report[f"{CTX_CONTEXT}.SecurityAliases.myapp"] == "present"
+    assert report[f"{CTX_APP}.myapp"] == "present"
+
+    # Only the keys that were read
+    assert f"{CTX_CONTEXT}.AwsRegion" not in report
+    assert f"{CTX_APP}.some-other-app" not in report
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["keys(@)", "length(@)", "values(@)", "to_string(@)", "a.b", "a.c[0]"],
+)
+def test_trace_extract(expression):
+
+    renderer = Jinja2Renderer()
+    context = {"d": {"a": {"b": "x", "c": [1, 2]}, "e": True}}
+    template = "{{ d | extract('%s') }}" % expression
+
+    text, trace = renderer.trace_string(template, context)
+    assert text == renderer.render_string(template, context)
+    assert trace.report() == {"d": "value"}
+
+
+def test_trace_other_filters(render_context):  # noqa: F811
+
+    renderer = Jinja2Renderer()
+
+    # Filters that don't know about tracing read the values as a whole
+    template = "{{ context | to_yaml }}{{ 'build' | aws_tags | length }}"
+    text, trace = renderer.trace_string(template, render_context)
+    assert text == renderer.render_string(template, render_context)
+    assert trace.report()[CTX_CONTEXT] == "value"
+
+
+def test_trace_record():
+
+    trace = ContextTrace()
+    trace.record(("A",), "value")
+    trace.record(("A",), "present")
+    trace.record(("A", "B"), "value")
+    trace.record(("C",), "type")
+    trace.record(("C", "D"), "keys")
+    assert trace.dependencies() == [
+        (("A",), "value"),
+        (("C",), "type"),
+        (("C", "D"), "keys"),
+    ]
+
+    with pytest.raises(Exception):
+        Jinja2Renderer().trace_string("{{ Missing }}", {})
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import pytest
+
+import core_framework as util
+
+
+@pytest.mark.parametrize(
+    "package,modules",
+    [
+        ("core_logging", ["ruamel.yaml", "boto3", "pydantic"]),
+        ("core_framework", ["boto3", "botocore.config", "pydantic", "ruamel.yaml"]),
+        ("core_helper.aws", ["boto3", "botocore.config", "pydantic", "ruamel.yaml"]),
+        ("core_renderer", ["jmespath", "netaddr", "boto3"]),
+    ],
+)
+def test_lazy_imports(package, modules):
+
+    # Use a new interpreter.  The test session has already imported everything.
+    code = f"import sys, {package}; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_lazy_model_helpers():
+
+    assert "get_artefacts_path" in util.__all__
+    assert "get_artefacts_path" in dir(util)
+
+    from core_framework.models import get_artefacts_path
+
+    assert util.get_artefacts_path is get_artefacts_path
+
+    with pytest.raises(AttributeError):
+        util.does_not_exist
@@ -2,7 +2,10 @@ import os
 import yaml
 import pytest
 from unittest.mock import patch, MagicMock
-from core_renderer import Jinja2Renderer
+import jinja2
+import core_framework as util
+from core_framework.merge import LayeredView
+from core_renderer import Jinja2Renderer, RenderManifest, MANIFEST_FILE
 
 
 @pytest.fixture
@@ -61,3 +64,223 @@ async def test_render():
 
     except Exception as e:
         assert False, str(e)
+
+
+def test_render_layered_context():
+
+    current_path = os.path.dirname(os.path.realpath(__file__))
+    renderer = Jinja2Renderer(os.path.join(current_path, "templates"))
+
+    facts = get_sample_facts()
+    base = {k: v for k, v in facts.items() if k != "Tags"}
+    components = [
+        {"Tags": facts["Tags"]},
+        {"Tags": {"AppGroup": "Other"}, "Kms": {"KmsKey": "OTHERKEY"}},
+    ]
+
+    shared = LayeredView(base)
+    for component in components:
+        expected = renderer.render_file(
+            "test_render.yaml.j2", util.deep_merge(base, component)
+        )
+        context = LayeredView(shared, component)
+        assert renderer.render_file("test_render.yaml.j2", context) == expected
+
+    context = LayeredView(base, components[1])
+    assert renderer.render_string("{{ range(2) | list }}", context) == "[0, 1]"
+    assert renderer.render_string("{{ Kms.KmsKey }}", context) == "OTHERKEY"
+    assert util.from_json(renderer.render_string("{{ Kms | to_json }}", context)) == (
+        util.deep_merge(base, components[1])["Kms"]
+    )
+    assert "KmsKey: OTHERKEY" in renderer.render_string("{{ Kms | to_yaml }}", context)
+
+    # The same text as the merged dictionary
+    merged = util.deep_merge(base, components[1])
+    for template in [
+        "{{ Kms }}",
+        "{{ Tags }}",
+        "{{ Kms | tojson }}",
+        "{{ Tags | tojson(indent=2) }}",
+        "{{ Kms | to_json }}",
+        "{{ Tags | to_yaml }}",
+        "{{ Kms | string }}",
+    ]:
+        expected = renderer.render_string(template, merged)
+        assert renderer.render_string(template, context) == expected
+
+    with pytest.raises(jinja2.exceptions.UndefinedError):
+        renderer.render_string("{{ DoesNotExist }}", context)
+
+
+def test_template_cache():
+
+    renderer = Jinja2Renderer(cache_size=2)
+
+    assert renderer.render_string("{{ a }}", {"a": 1}) == "1"
+    assert renderer.render_string("{{ a }}", {"a": 2}) == "2"
+    assert renderer.from_string("{{ a }}") is renderer.from_string("{{ a }}")
+
+    stats = renderer.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["bytecode_cache_dir"] is None
+
+    # Least recently used first
+    renderer.from_string("{{ b }}")
+    renderer.from_string("{{ a }}")
+    renderer.from_string("{{ c }}")
+    assert renderer.stats()["size"] == 2
+    misses = renderer.stats()["misses"]
+    renderer.from_string("{{ a }}")
+    assert renderer.stats()["misses"] == misses
+    renderer.from_string("{{ b }}")
+    assert renderer.stats()["misses"] == misses + 1
+
+    assert renderer.render_object({"a": "{{ a }}"}, {"a": "x"}) == {"a": "x"}
+
+
+def test_bytecode_cache(tmp_path, monkeypatch):
+
+    template_path = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "templates"
+    )
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setenv("TEMPLATE_CACHE_DIR", cache_dir)
+
+    context = get_sample_facts()
+
+    renderer = Jinja2Renderer(template_path)
+    expected = renderer.render_file("test_render.yaml.j2", context)
+    assert renderer.stats()["bytecode_cache_dir"] == cache_dir
+    assert renderer.stats()["bytecode_misses"] == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    # A new renderer (a new Lambda container or CI run) doesn't compile it again
+    renderer = Jinja2Renderer(template_path)
+    assert renderer.render_file("test_render.yaml.j2", context) == expected
+    assert renderer.stats()["bytecode_hits"] == 1
+    assert renderer.stats()["bytecode_misses"] == 0
+
+
+@pytest.fixture
+def files_tree(tmp_path):
+    for i in range(6):
+        folder = tmp_path / "files" / f"dir{i % 2}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"file{i}.yaml.j2").write_text(
+            f"Name: {{{{ Client }}}}-{i}\nKms: {{{{ Kms | to_json }}}}\nList: {{{{ Client | ensure_list }}}}\n"
+        )
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_render_files_parallel(files_tree, executor):
+
+    renderer = Jinja2Renderer(files_tree)
+    context = get_sample_facts()
+
+    expected = renderer.render_files("files", context)
+    assert list(expected) == sorted(expected)
+    assert len(expected) == 6
+    assert expected["dir1/file3.yaml.j2"].startswith("Name: sample-3\n")
+
+    result = renderer.render_files("files", context, max_workers=3, executor=executor)
+    assert list(result.items()) == list(expected.items())
+
+    streamed = dict(
+        renderer.iter_render_files(
+            "files", context, max_workers=3, executor=executor, ordered=False
+        )
+    )
+    assert streamed == expected
+
+    with pytest.raises(jinja2.exceptions.UndefinedError):
+        renderer.render_files("files", {"Kms": {}}, max_workers=3, executor=executor)
+
+
+def test_render_files_workers_from_environment(files_tree, monkeypatch):
+
+    monkeypatch.setenv("RENDER_MAX_WORKERS", "2")
+
+    renderer = Jinja2Renderer(files_tree)
+    context = get_sample_facts()
+
+    result = renderer.render_files("files", context, executor="thread")
+    assert len(result) == 6
+
+    with pytest.raises(ValueError):
+        renderer.render_files("files", context, executor="fibers")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_render_files_incremental(tmp_path, executor):
+
+    (tmp_path / "files").mkdir()
+    (tmp_path / "macros").mkdir()
+    (tmp_path / "macros" / "name.j2").write_text(
+        "{% macro name(x) %}{{ x }}-app{% endmacro %}"
+    )
+    (tmp_path / "files" / "app.yaml").write_text(
+        "{% from 'macros/name.j2' import name %}App: {{ name(App) }}\n"
+    )
+    (tmp_path / "files" / "zone.yaml").write_text(
+        "Zone: {{ Zone.Region }}{{ Other | default('') }}\n"
+    )
+    (tmp_path / "files" / "lookup.yaml").write_text("Lookup: {{ 'Zone' | lookup }}\n")
+    (tmp_path / "files" / "date.yaml").write_text("Date: {{ '%Y' | format_date }}\n")
+
+    renderer = Jinja2Renderer(str(tmp_path))
+    context = {"App": "web", "Zone": {"Region": "us-east-1"}, "Unused": 1}
+    fn = str(tmp_path / "out" / MANIFEST_FILE)
+
+    manifest = RenderManifest.load(fn)
+    files = renderer.render_files(
+        "files", context, max_workers=2, executor=executor, manifest=manifest
+    )
+    assert files == renderer.render_files("files", context)
+    dependencies = {
+        tuple(path): fingerprint
+        for path, _, fingerprint in manifest.files["zone.yaml"]["Context"]
+    }
+    assert dependencies.keys() == {("Zone", "Region"), ("Zone",), ("Other",)}
+    assert dependencies[("Other",)] is None
+    assert "date.yaml" not in manifest.files
+    manifest.save(fn)
+
+    # Only the file that always renders
+    manifest = RenderManifest.load(fn)
+    context["Unused"] = 2
+    files = renderer.render_files("files", context, manifest=manifest)
+    assert list(files) == ["date.yaml"]
+
+    # The files that read the key
+    context["Zone"] = {"Region": "us-west-2"}
+    files = renderer.render_files("files", context, manifest=manifest)
+    assert list(files) == ["date.yaml", "lookup.yaml", "zone.yaml"]
+    assert files["zone.yaml"] == "Zone: us-west-2\n"
+
+    # A key that was missing
+    context["Other"] = "!"
+    assert list(renderer.render_files("files", context, manifest=manifest)) == [
+        "date.yaml",
+        "zone.yaml",
+    ]
+
+    # An imported template
+    (tmp_path / "macros" / "name.j2").write_text(
+        "{% macro name(x) %}{{ x }}-v2{% endmacro %}"
+    )
+    files = renderer.render_files("files", context, manifest=manifest)
+    assert files == {"app.yaml": "App: web-v2\n", "date.yaml": files["date.yaml"]}
+
+    # Deleted files are forgotten
+    os.remove(tmp_path / "files" / "app.yaml")
+    renderer.render_files("files", context, manifest=manifest)
+    assert sorted(manifest.files) == ["lookup.yaml", "zone.yaml"]
+
+    # A manifest of another version is ignored
+    data = manifest.to_dict()
+    data["Version"] = -1
+    assert RenderManifest.from_dict(data).files == {}
+    assert RenderManifest.load(str(tmp_path / "missing.json")).files == {}
@@ -2,6 +2,8 @@ import pytest
 
 import io
 from datetime import datetime, timezone
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 
 import core_framework as util
 
@@ -137,3 +139,120 @@ def test_read_write_json(data_for_testing: dict):
     assert data["date2"] == date2
     assert data["now"] == now
     assert data["then"] == then
+
+
+def test_from_json_dates():
+
+    json_string = (
+        '{"a": {"b": ["2021-01-01", "not a date", "20210101", "2021W01"]}, "c": 2021,'
+        ' "d": "2021-13-01", "e": "12345678 apples", "f": [{"g": "2021-01-02T01:30:20Z"}]}'
+    )
+
+    data = util.from_json(json_string)
+
+    assert data["a"]["b"] == [
+        datetime(2021, 1, 1),
+        "not a date",
+        datetime(2021, 1, 1),
+        datetime(2021, 1, 4),
+    ]
+    assert data["c"] == 2021
+    assert data["d"] == "2021-13-01"
+    assert data["e"] == "12345678 apples"
+    assert data["f"][0]["g"] == datetime(2021, 1, 2, 1, 30, 20, tzinfo=timezone.utc)
+
+    # Strings that are not inside an object are left alone
+    assert util.from_json('["2021-01-01", ["2021-01-01"]]') == [
+        "2021-01-01",
+        ["2021-01-01"],
+    ]
+    assert util.from_json('"2021-01-01"') == "2021-01-01"
+
+    data = util.from_json(json_string, parse_dates=False)
+    assert data["a"]["b"][0] == "2021-01-01"
+    assert data["f"][0]["g"] == "2021-01-02T01:30:20Z"
+
+    data = util.read_json(io.StringIO(json_string), parse_dates=False)
+    assert data["a"]["b"][0] == "2021-01-01"
+
+    assert util.from_json(json_string.encode()) == util.from_json(json_string)
+
+
+def test_json_engine(monkeypatch):
+
+    try:
+        monkeypatch.setenv("JSON_ENGINE", "json")
+        assert util.set_json_engine() == "json"
+        assert util.get_json_engine() == "json"
+
+        assert (
+            util.to_json({"a": [1, 2]}, pretty=2)
+            == '{\n  "a": [\n    1,\n    2\n  ]\n}'
+        )
+        assert util.to_json({1: Decimal("1.5")}) == '{"1": 1.5}'
+
+        with pytest.raises(ValueError):
+            util.set_json_engine("simplejson")
+    finally:
+        monkeypatch.delenv("JSON_ENGINE")
+        util.set_json_engine()
+
+
+def test_from_yaml_safe(data_for_testing: dict):
+
+    yaml_string = util.to_yaml(data_for_testing)
+
+    data = util.from_yaml(yaml_string, typ="safe")
+
+    assert type(data) is dict
+    assert data == util.from_yaml(yaml_string)
+    assert data["date2"] == datetime(2021, 1, 2, 1, 30, 20, tzinfo=timezone.utc)
+    assert data["client"] == "my-client"
+
+    assert util.read_yaml(io.StringIO(yaml_string), typ="safe") == data
+
+    with pytest.raises(ValueError):
+        util.from_yaml(yaml_string, typ="unsafe")
+
+
+def test_yaml_reuse():
+
+    data = {"Label": "not quoted", "values": ["000001", None, 1], "nested": {"a": "b"}}
+    expected = (
+        'Label: not quoted\nvalues:\n  - "000001"\n  - \n  - 1\nnested:\n  a: "b"\n'
+    )
+
+    assert util.to_yaml(data) == expected
+
+    # A failed dump doesn't break the next one
+    with pytest.raises(Exception):
+        util.to_yaml({"a": object()})
+    assert util.to_yaml(data) == expected
+
+    # Each thread has its own parser and dumper
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: util.to_yaml(data), range(50)))
+        loaded = list(pool.map(util.from_yaml, results))
+
+    assert all(result == results[0] for result in results)
+    assert all(item == loaded[0] for item in loaded)
+    assert loaded[0]["values"] == ["000001", None, 1]
+
+
+def test_read_write_yaml_all(data_for_testing: dict):
+
+    def documents():
+        for i in range(3):
+            yield {"index": i, **data_for_testing}
+
+    stream = io.StringIO()
+    util.write_yaml_all(documents(), stream)
+    yaml_string = stream.getvalue()
+
+    assert yaml_string.startswith(util.to_yaml({"index": 0, **data_for_testing}))
+    assert yaml_string.count("---\n") == 2
+
+    for typ in ["rt", "safe"]:
+        data = list(util.read_yaml_all(io.StringIO(yaml_string), typ=typ))
+        assert [item["index"] for item in data] == [0, 1, 2]
+        assert data[2]["then"] == datetime(2025, 1, 4, 13, 30, 57, 921837)